@@ -3,12 +3,24 @@
 API Flask para o Gerador de Descrição de Conversão de Moeda
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from datetime import datetime, timedelta
 import logging
+import os
+import time
 
-from invoice_description_generator import generate_conversion_text, get_bb_dollar_rate
+from invoice_description_generator import build_conversion, build_conversions, get_ptax_rate, is_stale
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics
+from rate_prefetch import start_from_env as start_prefetch
+import timing
+from timing import (
+    PROFILE_REQUEST_HEADER, finish_profile, should_profile, span, start_profile, start_timer, stop_timer
+)
+from api_core import (
+    JSON_MIMETYPE, RequestError, batch_body, convert_body, error_body, etag_matches, get_response_cache,
+    health_body, info_body, parse_batch_request, parse_convert_request, parse_rate_request,
+    rate_cache_key, rate_response
+)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -17,14 +29,49 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Permite CORS para aplicações frontend
 
+# Pré-carga das cotações após a publicação da PTAX (PTAX_PREFETCH=1)
+start_prefetch()
+
+
+@app.before_request
+def start_request_timer():
+    """Marca o início da requisição (métricas e Server-Timing) e inicia o perfil, se sorteado"""
+    g.request_started = time.perf_counter()
+    if timing.ENABLED:
+        g.timer, g.timer_token = start_timer()
+    if should_profile(request.headers.get(PROFILE_REQUEST_HEADER)):
+        g.profiler = start_profile()
+
+@app.after_request
+def observe_request(response):
+    """Registra a latência da requisição por rota (o padrão da rota, não a URL) e envia o Server-Timing"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        get_metrics().observe_request(route, request.method, response.status_code,
+                                      time.perf_counter() - started)
+    
+    timer = g.get('timer')
+    profiler = g.pop('profiler', None)
+    server_timing = timer.header() if timer is not None else None
+    if profiler is not None:
+        path = finish_profile(profiler, f"{request.method} {request.path}")
+        server_timing = ", ".join(filter(None, (server_timing, f'profile;desc="{os.path.basename(path)}"')))
+    if server_timing:
+        response.headers['Server-Timing'] = server_timing
+    return response
+
+@app.teardown_request
+def stop_request_timer(error=None):
+    """Encerra a medição das etapas da requisição"""
+    token = g.pop('timer_token', None)
+    if token is not None:
+        stop_timer(token)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de health check"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'invoice_description_generator',
-        'version': '1.0.0'
-    })
+    return jsonify(health_body())
 
 @app.route('/api/convert', methods=['POST'])
 def convert_currency():
@@ -34,8 +81,11 @@ def convert_currency():
     Request Body:
     {
         "usd_amount": 6774.00,
+        "currency": "USD",   # opcional, USD, EUR ou GBP
         "date": "07082025",  # opcional, formato DDMMYYYY
-        "show_url": false     # opcional, se deve incluir URL dos dados
+        "show_url": false,    # opcional, se deve incluir URL dos dados
+        "exact": false,       # opcional, cálculo em centavos exatos
+        "template": "padrao"  # opcional, modelo do texto (ver /api/info)
     }
     
     Response:
@@ -44,6 +94,7 @@ def convert_currency():
         "text": "Valor recebido em moeda estrangeira...",
         "data": {
             "usd_amount": 6774.00,
+            "currency": "USD",
             "brl_amount": 37011.78,
             "rate": 5.4638,
             "date": "07/08/2025",
@@ -52,199 +103,168 @@ def convert_currency():
     }
     """
     try:
-        # Validação dos dados de entrada
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'Dados não fornecidos'
-            }), 400
+        try:
+            with span('json'):
+                data = request.get_json(silent=True)
+            with span('validate'):
+                params = parse_convert_request(data)
+        except RequestError as e:
+            return jsonify(error_body(str(e))), 400
         
-        # Validação do valor em USD
-        usd_amount = data.get('usd_amount')
-        if not usd_amount or not isinstance(usd_amount, (int, float)) or usd_amount <= 0:
-            return jsonify({
-                'success': False,
-                'error': 'usd_amount deve ser um número positivo'
-            }), 400
+        # Gera o texto e os dados da conversão com uma única busca de cotação
+        conversion = build_conversion(params.usd_amount, params.date, params.show_url, fallback=True,
+                                      exact=params.exact, template=params.template.name,
+                                      currency=params.currency.code)
         
-        # Processamento da data
-        date_str = data.get('date')
-        date_obj = None
-        
-        if date_str:
-            # Valida formato DDMMYYYY
-            if len(date_str) != 8 or not date_str.isdigit():
-                return jsonify({
-                    'success': False,
-                    'error': 'date deve estar no formato DDMMYYYY (ex: 07082025)'
-                }), 400
-            
-            try:
-                # Converte DDMMYYYY para datetime
-                day = date_str[:2]
-                month = date_str[2:4]
-                year = date_str[4:8]
-                
-                # Data de referência (data fornecida)
-                reference_date = datetime(int(year), int(month), int(day))
-                
-                # Data para buscar cotação (dia anterior)
-                date_obj = reference_date - timedelta(days=1)
-                
-            except ValueError as e:
-                return jsonify({
-                    'success': False,
-                    'error': f'Data inválida: {str(e)}'
-                }), 400
+        logger.info(f"Conversão realizada: {params.currency.code} {params.usd_amount} -> BRL {conversion['brl_amount']}")
         
-        # Flag para mostrar URL
-        show_url = data.get('show_url', False)
+        with span('serialize'):
+            response = jsonify(convert_body(params, conversion))
+        return response, 200
         
-        # Gera o texto de conversão
-        text = generate_conversion_text(usd_amount, date_obj, show_url)
+    except Exception as e:
+        logger.error(f"Erro na conversão: {str(e)}")
+        return jsonify(error_body(f'Erro interno: {str(e)}')), 500
+
+@app.route('/api/convert/batch', methods=['POST'])
+def convert_currency_batch():
+    """
+    Endpoint para gerar vários textos de conversão em uma única requisição.
+    A cotação de cada moeda e data distinta é buscada uma única vez.
+    
+    Request Body:
+    {
+        "items": [
+            {"usd_amount": 6774.00, "date": "07082025"},
+            {"usd_amount": 1000.00, "currency": "EUR"}
+        ],
+        "currency": "USD",    # opcional, moeda dos itens sem currency
+        "show_url": false,    # opcional, se deve incluir URL dos dados
+        "exact": false,       # opcional, cálculo em centavos exatos
+        "template": "padrao"  # opcional, modelo do texto (ver /api/info)
+    }
+    
+    Response:
+    {
+        "success": true,
+        "results": [
+            {"success": true, "text": "...", "data": {...}},
+            {"success": false, "error": "..."}
+        ],
+        "summary": {"total": 2, "succeeded": 1, "failed": 1,
+                    "usd_total": 6774.00, "brl_total": 37122.87,
+                    "currency_totals": {"USD": 6774.00}}
+    }
+    """
+    try:
+        try:
+            with span('json'):
+                data = request.get_json(silent=True)
+            with span('validate'):
+                batch = parse_batch_request(data)
+        except RequestError as e:
+            return jsonify(error_body(str(e))), 400
         
-        # Busca dados adicionais para a resposta
-        rate, date_str, url = get_bb_dollar_rate(date_obj)
-        brl_amount = usd_amount * rate
+        get_metrics().observe_batch(batch.total)
         
-        # Monta a resposta
-        response_data = {
-            'success': True,
-            'text': text,
-            'data': {
-                'usd_amount': usd_amount,
-                'brl_amount': round(brl_amount, 2),
-                'rate': rate,
-                'date': date_str,
-                'source': 'SGS - Banco Central do Brasil'
-            }
+        # Converte os itens válidos agrupando por moeda (uma consulta por
+        # intervalo de datas de cada moeda) e por data de cotação
+        conversions = {
+            code: build_conversions(
+                [(usd_amount, date_obj) for _, usd_amount, date_obj, _ in group],
+                batch.show_url,
+                fallback=True,
+                exact=batch.exact,
+                template=batch.template.name,
+                currency=code
+            )
+            for code, group in batch.groups.items()
         }
         
-        # Adiciona URL se solicitado
-        if show_url:
-            response_data['data']['source_url'] = url
+        with span('serialize'):
+            body = batch_body(batch, conversions)
+            response = jsonify(body)
         
-        logger.info(f"Conversão realizada: USD {usd_amount} -> BRL {brl_amount}")
+        logger.info(f"Conversão em lote realizada: {body['summary']['succeeded']}/{batch.total} itens")
         
-        return jsonify(response_data), 200
+        return response, 200
         
     except Exception as e:
-        logger.error(f"Erro na conversão: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': f'Erro interno: {str(e)}'
-        }), 500
+        logger.error(f"Erro na conversão em lote: {str(e)}")
+        return jsonify(error_body(f'Erro interno: {str(e)}')), 500
 
 @app.route('/api/rate', methods=['GET'])
 def get_rate():
     """
-    Endpoint para buscar apenas a cotação do dólar
+    Endpoint para buscar apenas a cotação de uma moeda (padrão: dólar)
     
     Query Parameters:
     - date: DDMMYYYY (opcional)
+    - currency: USD, EUR ou GBP (opcional, padrão: USD)
     
     Response:
     {
         "success": true,
         "data": {
+            "currency": "USD",
             "rate": 5.4638,
             "date": "07/08/2025",
             "source_url": "https://api.bcb.gov.br/..."
         }
     }
+    
+    Responde com ETag e Cache-Control; com If-None-Match igual ao ETag
+    atual, responde 304 Not Modified sem corpo.
     """
     try:
-        # Processamento da data
-        date_str = request.args.get('date')
-        date_obj = None
+        try:
+            with span('validate'):
+                date_obj, currency = parse_rate_request(request.args)
+        except RequestError as e:
+            return jsonify(error_body(str(e))), 400
         
-        if date_str:
-            # Valida formato DDMMYYYY
-            if len(date_str) != 8 or not date_str.isdigit():
-                return jsonify({
-                    'success': False,
-                    'error': 'date deve estar no formato DDMMYYYY (ex: 07082025)'
-                }), 400
+        # Respostas repetidas saem do cache já serializadas
+        key = rate_cache_key(date_obj, currency)
+        cached = get_response_cache().get(key)
+        if cached is None:
+            quote = get_ptax_rate(date_obj, fallback=True, currency=currency.code)
             
-            try:
-                # Converte DDMMYYYY para datetime
-                day = date_str[:2]
-                month = date_str[2:4]
-                year = date_str[4:8]
-                
-                # Data de referência (data fornecida)
-                reference_date = datetime(int(year), int(month), int(day))
-                
-                # Data para buscar cotação (dia anterior)
-                date_obj = reference_date - timedelta(days=1)
-                
-            except ValueError as e:
-                return jsonify({
-                    'success': False,
-                    'error': f'Data inválida: {str(e)}'
-                }), 400
-        
-        # Busca a cotação
-        rate, date_str, url = get_bb_dollar_rate(date_obj)
-        
-        response_data = {
-            'success': True,
-            'data': {
-                'rate': rate,
-                'date': date_str,
-                'source': 'SGS - Banco Central do Brasil',
-                'source_url': url
-            }
-        }
-        
-        logger.info(f"Cotação buscada: {rate} em {date_str}")
+            logger.info(f"Cotação buscada: {currency.code} {quote[0]} em {quote[1]}")
+            
+            # Cotações antigas (SGS fora do ar) saem sem ficar no cache
+            with span('serialize'):
+                response = rate_response(key, currency, *quote, stale=is_stale(quote))
+            cached = get_response_cache().set(key, response)
         
-        return jsonify(response_data), 200
+        headers = {'ETag': cached.etag, 'Cache-Control': cached.cache_control}
+        if etag_matches(request.headers.get('If-None-Match'), cached.etag):
+            return Response(status=304, headers=headers)
+        return Response(cached.body, 200, headers=headers, mimetype=JSON_MIMETYPE)
         
     except Exception as e:
         logger.error(f"Erro ao buscar cotação: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': f'Erro interno: {str(e)}'
-        }), 500
+        return jsonify(error_body(f'Erro interno: {str(e)}')), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics_text():
+    """Endpoint de métricas no formato de exposição do Prometheus"""
+    return Response(get_metrics().render(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/api/info', methods=['GET'])
 def get_info():
     """Endpoint para informações sobre a API"""
-    return jsonify({
-        'name': 'Invoice Description Generator API',
-        'version': '1.0.0',
-        'description': 'API para geração de descrições de conversão de moeda',
-        'endpoints': {
-            'POST /api/convert': 'Gerar texto de conversão',
-            'GET /api/rate': 'Buscar cotação do dólar',
-            'GET /api/info': 'Informações da API',
-            'GET /health': 'Health check'
-        },
-        'source': 'SGS - Banco Central do Brasil',
-        'format': 'DDMMYYYY para datas'
-    })
+    return jsonify(info_body())
 
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({
-        'success': False,
-        'error': 'Endpoint não encontrado'
-    }), 404
+    return jsonify(error_body('Endpoint não encontrado')), 404
 
 @app.errorhandler(500)
 def internal_error(error):
-    return jsonify({
-        'success': False,
-        'error': 'Erro interno do servidor'
-    }), 500
+    return jsonify(error_body('Erro interno do servidor')), 500
 
 if __name__ == '__main__':
     # Configuração do servidor
-    import os
-    
     port = int(os.environ.get('PORT', 5001))
     app.run(
         host='0.0.0.0',
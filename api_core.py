@@ -0,0 +1,547 @@
+"""
+Regras das rotas da API, independentes do servidor web
+
+Validação das requisições e montagem das respostas JSON compartilhadas pela
+API Flask (api.py) e pela aplicação ASGI (asgi.py), para que as duas
+respondam exatamente no mesmo formato. A busca das cotações fica com cada
+servidor (síncrona no Flask, assíncrona no ASGI).
+
+As respostas de GET /api/rate são guardadas já serializadas (ResponseCache)
+e levam ETag e Cache-Control: datas definitivas podem ficar em cache por
+muito tempo; as de hoje e ontem, que ainda podem mudar, por pouco tempo.
+
+Configuração por variáveis de ambiente:
+
+- PTAX_RATE_MAX_AGE: Cache-Control max-age, em segundos, de cotações definitivas (padrão: 31536000)
+- PTAX_RATE_RECENT_MAX_AGE: max-age, em segundos, de cotações de hoje e ontem (padrão: 300)
+- PTAX_RESPONSE_CACHE_SIZE: respostas de /api/rate mantidas em memória por processo (padrão: 1024)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from currencies import CURRENCIES, get_currency
+from description_templates import get_template, get_template_registry
+from money import cents_to_decimal, sum_conversions, to_cents
+from rate_cache import date_key, is_settled
+from validation import default_quote_date, is_valid_amount, parse_quote_date
+
+
+API_NAME = 'Invoice Description Generator API'
+API_VERSION = '1.0.0'
+SOURCE = 'SGS - Banco Central do Brasil'
+
+# Limite de itens por requisição em POST /api/convert/batch
+MAX_BATCH_SIZE = 10000
+
+JSON_MIMETYPE = 'application/json'
+
+RATE_MAX_AGE = int(os.environ.get('PTAX_RATE_MAX_AGE', 365 * 24 * 3600))
+RATE_RECENT_MAX_AGE = int(os.environ.get('PTAX_RATE_RECENT_MAX_AGE', 300))
+
+ConvertRequest = namedtuple("ConvertRequest", ["usd_amount", "date", "show_url", "exact", "template", "currency"])
+ConvertRequest.__doc__ = "Parâmetros validados de POST /api/convert."
+
+BatchRequest = namedtuple("BatchRequest", ["total", "results", "groups", "show_url", "exact", "template"])
+BatchRequest.__doc__ = (
+    "Parâmetros validados de POST /api/convert/batch: resultados com os erros de validação "
+    "por item e os itens válidos agrupados por moeda."
+)
+
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag", "cache_control", "expires_at"])
+CachedResponse.__doc__ = "Resposta serializada com ETag, Cache-Control e validade no servidor (None: permanente)."
+
+
+class RequestError(ValueError):
+    """Dados inválidos na requisição (resposta 400 com a mensagem)."""
+
+
+def serialize_json(body):
+    """
+    Serializa uma resposta como o jsonify do Flask (chaves ordenadas, compacta, com \n no final).
+
+    Returns:
+        bytes: Corpo da resposta
+    """
+    return (json.dumps(body, sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+
+def error_body(message):
+    """Corpo das respostas de erro."""
+    return {
+        'success': False,
+        'error': message
+    }
+
+
+def health_body():
+    """Corpo de GET /health."""
+    return {
+        'status': 'healthy',
+        'service': 'invoice_description_generator',
+        'version': API_VERSION
+    }
+
+
+def info_body():
+    """Corpo de GET /api/info."""
+    return {
+        'name': API_NAME,
+        'version': API_VERSION,
+        'description': 'API para geração de descrições de conversão de moeda',
+        'endpoints': {
+            'POST /api/convert': 'Gerar texto de conversão',
+            'POST /api/convert/batch': 'Gerar textos de conversão em lote',
+            'GET /api/rate': 'Buscar cotação de uma moeda',
+            'GET /api/info': 'Informações da API',
+            'GET /metrics': 'Métricas no formato do Prometheus',
+            'GET /health': 'Health check'
+        },
+        'source': SOURCE,
+        'format': 'DDMMYYYY para datas',
+        'templates': get_template_registry().names(),
+        'currencies': sorted(CURRENCIES)
+    }
+
+
+def _parse_date(date_str):
+    try:
+        return parse_quote_date(date_str) if date_str else None
+    except ValueError as e:
+        raise RequestError(str(e))
+
+
+def _parse_choices(template_name, currency_code):
+    try:
+        return get_template(template_name), get_currency(currency_code)
+    except ValueError as e:
+        raise RequestError(str(e))
+
+
+def parse_convert_request(data):
+    """
+    Valida o corpo de POST /api/convert.
+
+    Args:
+        data (dict): JSON da requisição
+
+    Returns:
+        ConvertRequest: Parâmetros validados
+
+    Raises:
+        RequestError: Se os dados forem inválidos
+    """
+    if not data:
+        raise RequestError('Dados não fornecidos')
+
+    usd_amount = data.get('usd_amount')
+    if not is_valid_amount(usd_amount):
+        raise RequestError('usd_amount deve ser um número positivo')
+
+    date = _parse_date(data.get('date'))
+    template, currency = _parse_choices(data.get('template'), data.get('currency'))
+
+    return ConvertRequest(usd_amount, date, data.get('show_url', False), bool(data.get('exact', False)),
+                          template, currency)
+
+
+def _conversion_data(usd_amount, currency, conversion, show_url, exact):
+    item_data = {
+        'usd_amount': usd_amount,
+        'currency': currency.code,
+        'brl_amount': float(conversion['brl_amount']) if exact else round(conversion['brl_amount'], 2),
+        'rate': conversion['rate'],
+        'date': conversion['date'],
+        'source': SOURCE
+    }
+    if show_url:
+        item_data['source_url'] = conversion['source_url']
+    if conversion.get('stale'):
+        item_data['stale'] = True
+    return item_data
+
+
+def convert_body(params, conversion):
+    """
+    Corpo de POST /api/convert.
+
+    Args:
+        params (ConvertRequest): Parâmetros da requisição
+        conversion (dict): Resultado de build_conversion
+
+    Returns:
+        dict: Resposta JSON
+    """
+    return {
+        'success': True,
+        'text': conversion['text'],
+        'data': _conversion_data(params.usd_amount, params.currency, conversion, params.show_url, params.exact)
+    }
+
+
+def parse_rate_request(args):
+    """
+    Valida os parâmetros de GET /api/rate.
+
+    Args:
+        args (Mapping): Parâmetros da consulta (date e currency)
+
+    Returns:
+        tuple: (data da cotação ou None, Currency)
+
+    Raises:
+        RequestError: Se os parâmetros forem inválidos
+    """
+    date = _parse_date(args.get('date'))
+    try:
+        currency = get_currency(args.get('currency'))
+    except ValueError as e:
+        raise RequestError(str(e))
+    return date, currency
+
+
+def rate_body(currency, rate, date_str, url, stale=False):
+    """Corpo de GET /api/rate (data.stale=True se a cotação veio do cache com o SGS fora do ar)."""
+    data = {
+        'currency': currency.code,
+        'rate': rate,
+        'date': date_str,
+        'source': SOURCE,
+        'source_url': url
+    }
+    if stale:
+        data['stale'] = True
+    return {
+        'success': True,
+        'data': data
+    }
+
+
+def rate_cache_key(date, currency):
+    """
+    Chave de uma resposta de GET /api/rate no ResponseCache.
+
+    Args:
+        date (datetime): Data da cotação pedida (None para ontem)
+        currency (Currency): Moeda
+
+    Returns:
+        tuple: (código da moeda, data pedida YYYY-MM-DD)
+    """
+    if date is None:
+        date = default_quote_date()
+    return currency.code, date_key(date)
+
+
+def rate_response(key, currency, rate, date_str, url, stale=False):
+    """
+    Serializa a resposta de GET /api/rate com os cabeçalhos de cache.
+
+    A resposta de uma data pedida anterior a ontem não muda mais (a
+    cotação usada é dela ou de um dia útil anterior), então pode ser
+    guardada por muito tempo; as demais expiram em RATE_RECENT_MAX_AGE.
+    Uma cotação antiga (SGS fora do ar) não deve ser guardada: sai com
+    Cache-Control no-cache e já expirada.
+
+    Args:
+        key (tuple): Chave de rate_cache_key
+        currency (Currency): Moeda
+        rate (float): Cotação
+        date_str (str): Data da cotação (DD/MM/YYYY)
+        url (str): URL da consulta ao SGS
+        stale (bool): Se a cotação veio do cache com o SGS fora do ar
+
+    Returns:
+        CachedResponse: Corpo serializado, ETag, Cache-Control e validade
+    """
+    # ETag forte: o corpo depende só da moeda, da data da cotação, do valor e de ser antiga
+    etag = f'{currency.code}-{date_str[6:]}{date_str[3:5]}{date_str[:2]}-{rate!r}'
+    body = serialize_json(rate_body(currency, rate, date_str, url, stale))
+
+    if stale:
+        return CachedResponse(body, f'"{etag}-stale"', "no-cache", 0)
+    etag = f'"{etag}"'
+    if is_settled(key[1]):
+        return CachedResponse(body, etag, f"public, max-age={RATE_MAX_AGE}, immutable", None)
+    return CachedResponse(body, etag, f"public, max-age={RATE_RECENT_MAX_AGE}",
+                          time.time() + RATE_RECENT_MAX_AGE)
+
+
+def is_json_content_type(content_type):
+    """
+    Verifica se o Content-Type indica um corpo JSON (mesma regra do Flask).
+
+    Args:
+        content_type (str): Valor do cabeçalho Content-Type (opcional)
+
+    Returns:
+        bool: True para application/json e application/*+json
+    """
+    mimetype = (content_type or "").split(";", 1)[0].strip().lower()
+    return mimetype == JSON_MIMETYPE or (mimetype.startswith("application/") and mimetype.endswith("+json"))
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Verifica o cabeçalho If-None-Match (comparação fraca, como pede o GET condicional).
+
+    Args:
+        if_none_match (str): Valor do cabeçalho (opcional)
+        etag (str): ETag da resposta atual
+
+    Returns:
+        bool: True se a resposta pode ser 304 Not Modified
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Cache LRU de respostas serializadas, com validade por entrada.
+
+    Thread-safe: pode ser compartilhado entre as threads de um worker.
+    """
+
+    def __init__(self, max_entries=1024):
+        """
+        Args:
+            max_entries (int): Máximo de respostas mantidas em memória
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries deve ser maior que zero")
+
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Busca uma resposta.
+
+        Returns:
+            CachedResponse: Resposta ou None se ausente ou expirada
+        """
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                if response.expires_at is None or response.expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, response):
+        """
+        Armazena uma resposta (respostas já expiradas não são guardadas).
+
+        Returns:
+            CachedResponse: A própria resposta
+        """
+        if response.expires_at is not None and response.expires_at <= time.time():
+            return response
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return response
+
+    def clear(self):
+        """Remove todas as respostas e zera as estatísticas."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: Acertos, falhas e ocupação
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+_default_response_cache = None
+_default_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Retorna o cache de respostas padrão do processo, criando-o na primeira
+    chamada a partir das variáveis de ambiente.
+
+    Returns:
+        ResponseCache: Cache compartilhado
+    """
+    global _default_response_cache
+
+    if _default_response_cache is None:
+        with _default_response_cache_lock:
+            if _default_response_cache is None:
+                _default_response_cache = ResponseCache(
+                    max_entries=int(os.environ.get('PTAX_RESPONSE_CACHE_SIZE', 1024))
+                )
+    return _default_response_cache
+
+
+def configure_response_cache(max_entries=1024):
+    """
+    Substitui o cache de respostas padrão do processo.
+
+    Args:
+        max_entries (int): Máximo de respostas mantidas em memória
+
+    Returns:
+        ResponseCache: Novo cache padrão
+    """
+    global _default_response_cache
+
+    with _default_response_cache_lock:
+        _default_response_cache = ResponseCache(max_entries)
+    return _default_response_cache
+
+
+def parse_batch_request(data):
+    """
+    Valida o corpo de POST /api/convert/batch.
+
+    Erros de validação de um item não invalidam a requisição: ficam no
+    resultado do item e os demais são convertidos.
+
+    Args:
+        data (dict | list): JSON da requisição ({"items": [...]} ou a lista diretamente)
+
+    Returns:
+        BatchRequest: Itens válidos agrupados por moeda, como
+            {código: [(posição, valor, data, Currency)]}
+
+    Raises:
+        RequestError: Se a requisição como um todo for inválida
+    """
+    # Aceita tanto {"items": [...]} quanto a lista diretamente
+    if isinstance(data, dict):
+        items = data.get('items')
+        show_url = data.get('show_url', False)
+        exact = bool(data.get('exact', False))
+        template_name = data.get('template')
+        currency_code = data.get('currency')
+    else:
+        items = data
+        show_url = False
+        exact = False
+        template_name = None
+        currency_code = None
+
+    template, default_currency = _parse_choices(template_name, currency_code)
+
+    if not isinstance(items, list) or not items:
+        raise RequestError('items deve ser uma lista não vazia')
+
+    if len(items) > MAX_BATCH_SIZE:
+        raise RequestError(f'items deve ter no máximo {MAX_BATCH_SIZE} elementos')
+
+    results = [None] * len(items)
+    groups = {}
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = error_body('item deve ser um objeto')
+            continue
+
+        usd_amount = item.get('usd_amount')
+        if not is_valid_amount(usd_amount):
+            results[index] = error_body('usd_amount deve ser um número positivo')
+            continue
+
+        try:
+            date = _parse_date(item.get('date'))
+            currency = get_currency(item['currency']) if item.get('currency') else default_currency
+        except ValueError as e:
+            results[index] = error_body(str(e))
+            continue
+
+        groups.setdefault(currency.code, []).append((index, usd_amount, date, currency))
+
+    return BatchRequest(len(items), results, groups, show_url, exact, template)
+
+
+def batch_body(batch, conversions):
+    """
+    Corpo de POST /api/convert/batch.
+
+    Args:
+        batch (BatchRequest): Requisição validada
+        conversions (dict): Código da moeda -> lista de resultados de
+            build_conversions (dict ou Exception), na ordem de batch.groups
+
+    Returns:
+        dict: Resposta JSON
+    """
+    results = list(batch.results)
+    totals = {}
+
+    for code, group in batch.groups.items():
+        group_conversions = conversions[code]
+
+        # Totais somados em centavos inteiros, sem erro acumulado
+        totals[code] = sum_conversions(
+            (usd_amount, conversion['rate'])
+            for (_, usd_amount, _, _), conversion in zip(group, group_conversions)
+            if not isinstance(conversion, Exception)
+        )
+        if not batch.exact:
+            # Cada item mostra brl_amount arredondado em float: o total soma os
+            # valores exibidos, para bater com a soma dos itens
+            totals[code]['brl_total'] = cents_to_decimal(sum(
+                to_cents(round(conversion['brl_amount'], 2))
+                for conversion in group_conversions
+                if not isinstance(conversion, Exception)
+            ))
+
+        for (index, usd_amount, _, currency), conversion in zip(group, group_conversions):
+            if isinstance(conversion, Exception):
+                results[index] = error_body(str(conversion))
+                continue
+
+            results[index] = {
+                'success': True,
+                'text': conversion['text'],
+                'data': _conversion_data(usd_amount, currency, conversion, batch.show_url, batch.exact)
+            }
+
+    succeeded = sum(1 for result in results if result['success'])
+
+    return {
+        'success': True,
+        'results': results,
+        'summary': {
+            'total': batch.total,
+            'succeeded': succeeded,
+            'failed': batch.total - succeeded,
+            'usd_total': float(totals['USD']['usd_total']) if 'USD' in totals else 0.0,
+            'brl_total': float(sum(total['brl_total'] for total in totals.values())),
+            'currency_totals': {code: float(total['usd_total']) for code, total in totals.items()}
+        }
+    }
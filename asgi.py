@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Aplicação ASGI para o Gerador de Descrição de Conversão de Moeda
+
+Mesmas rotas e respostas da API Flask (api.py), sem framework, sobre a busca
+assíncrona de cotações (AsyncRateEngine). Uma requisição esperando o SGS não
+ocupa um worker nem uma thread: só as buscas ao SGS vão para o pool, com
+limite de concorrência, e requisições simultâneas para a mesma moeda e data
+compartilham uma única busca.
+
+Uso (requer um servidor ASGI, ex: pip install uvicorn):
+    uvicorn asgi:app --port 5001
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+Configuração por variáveis de ambiente:
+
+- PTAX_ASYNC_CONCURRENCY: buscas simultâneas ao SGS por processo (padrão: 10)
+- PTAX_PREFETCH: "1" para pré-carregar as cotações após a publicação (ver rate_prefetch)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qsl
+
+from async_rates import DEFAULT_CONCURRENCY, AsyncRateEngine
+from api_core import (
+    JSON_MIMETYPE, RequestError, batch_body, convert_body, error_body, etag_matches, get_response_cache,
+    health_body, info_body, is_json_content_type, parse_batch_request, parse_convert_request, parse_rate_request,
+    rate_cache_key, rate_response, serialize_json
+)
+from invoice_description_generator import _render_conversion, is_stale
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics
+from rate_prefetch import start_from_env as start_prefetch
+from rate_cache import date_key
+from validation import default_quote_date
+import timing
+from timing import (
+    PROFILE_REQUEST_HEADER, finish_profile, should_profile, span, start_profile, start_timer, stop_timer
+)
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo do corpo das requisições (lotes com MAX_BATCH_SIZE itens cabem com folga)
+MAX_BODY_SIZE = 8 * 1024 * 1024
+
+# Mesmos cabeçalhos enviados pelo flask-cors com a configuração padrão
+CORS_ALLOW_METHODS = "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+
+def _json(status, body):
+    # Handlers retornam (status, corpo, content-type, cabeçalhos extras)
+    with span('serialize'):
+        payload = serialize_json(body)
+    return status, payload, JSON_MIMETYPE, ()
+
+
+class ASGIApp:
+    """
+    Aplicação ASGI com as rotas da API.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Args:
+            concurrency (int): Máximo de buscas simultâneas ao SGS
+        """
+        self.concurrency = concurrency
+        self._engine = None
+        self._prefetcher = None
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/api/info'): self.info,
+            ('GET', '/api/rate'): self.rate,
+            ('POST', '/api/convert'): self.convert,
+            ('POST', '/api/convert/batch'): self.convert_batch,
+            ('GET', '/metrics'): self.metrics,
+        }
+        self._paths = {path for _, path in self.routes}
+
+    @property
+    def engine(self):
+        """AsyncRateEngine da aplicação, criado na primeira utilização."""
+        if self._engine is None:
+            self._engine = AsyncRateEngine(self.concurrency)
+        return self._engine
+
+    def close(self):
+        """Encerra o pool de buscas ao SGS."""
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        started = time.perf_counter()
+        method = scope['method']
+        path = scope['path']
+        headers = dict(scope.get('headers') or ())
+
+        timer = token = None
+        if timing.ENABLED:
+            timer, token = start_timer()
+        profile_header = headers.get(PROFILE_REQUEST_HEADER.lower().encode())
+        profiler = start_profile() if should_profile(profile_header and profile_header.decode("latin-1")) else None
+
+        try:
+            status, body, content_type, extra_headers = await self._dispatch(scope, receive, method, path)
+        finally:
+            if token is not None:
+                stop_timer(token)
+
+        response_headers = [(b"access-control-allow-origin", b"*")]
+        if method == 'OPTIONS':
+            response_headers.append((b"access-control-allow-methods", CORS_ALLOW_METHODS.encode()))
+            requested = headers.get(b"access-control-request-headers")
+            if requested:
+                response_headers.append((b"access-control-allow-headers", requested))
+        if content_type is not None:
+            response_headers.append((b"content-type", content_type.encode()))
+        response_headers.extend(extra_headers)
+        server_timing = timer.header() if timer is not None else None
+        if profiler is not None:
+            profile_path = finish_profile(profiler, f"{method} {path}")
+            server_timing = ", ".join(filter(None, (server_timing, f'profile;desc="{os.path.basename(profile_path)}"')))
+        if server_timing:
+            response_headers.append((b"server-timing", server_timing.encode()))
+        if status != 304:
+            response_headers.append((b"content-length", str(len(body)).encode()))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b"" if method == 'HEAD' else body})
+
+        route = path if path in self._paths else '<unmatched>'
+        get_metrics().observe_request(route, method, status, time.perf_counter() - started)
+
+    async def _dispatch(self, scope, receive, method, path):
+        # Retorna (status, corpo, content-type, cabeçalhos extras) da rota
+        handler = self.routes.get(('GET' if method == 'HEAD' else method, path))
+        if handler is not None:
+            try:
+                return await handler(scope, receive)
+            except Exception as e:
+                logger.error(f"Erro não tratado em {path}: {str(e)}")
+                return _json(500, error_body('Erro interno do servidor'))
+        if method == 'OPTIONS' and path in self._paths:
+            return 200, b"", None, ()
+        if path in self._paths:
+            return _json(405, error_body('Método não permitido'))
+        return _json(404, error_body('Endpoint não encontrado'))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Cria o pool de buscas antes da primeira requisição
+                self.engine
+                self._prefetcher = start_prefetch()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._prefetcher is not None:
+                    self._prefetcher.stop()
+                    self._prefetcher = None
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_json(self, scope, receive):
+        # Corpo inválido, vazio ou sem Content-Type JSON equivale a dados não
+        # fornecidos (como request.get_json(silent=True) na API Flask)
+        content_type = dict(scope.get('headers') or ()).get(b"content-type", b"")
+        if not is_json_content_type(content_type.decode('latin-1')):
+            return None
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b"")
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                raise RequestError(f'Corpo da requisição maior que {MAX_BODY_SIZE} bytes')
+            chunks.append(chunk)
+            more_body = message.get('more_body', False)
+
+        try:
+            return json.loads(b"".join(chunks))
+        except ValueError:
+            return None
+
+    async def health(self, scope, receive):
+        """GET /health"""
+        return _json(200, health_body())
+
+    async def info(self, scope, receive):
+        """GET /api/info"""
+        return _json(200, info_body())
+
+    async def metrics(self, scope, receive):
+        """GET /metrics"""
+        return 200, get_metrics().render().encode(), METRICS_CONTENT_TYPE, ()
+
+    async def rate(self, scope, receive):
+        """GET /api/rate (mesmos parâmetros e cabeçalhos de cache de api.get_rate)"""
+        args = {}
+        for name, value in parse_qsl(scope.get('query_string', b"").decode("latin-1")):
+            args.setdefault(name, value)
+
+        try:
+            try:
+                with span('validate'):
+                    date_obj, currency = parse_rate_request(args)
+            except RequestError as e:
+                return _json(400, error_body(str(e)))
+
+            key = rate_cache_key(date_obj, currency)
+            cached = get_response_cache().get(key)
+            if cached is None:
+                quote = await self.engine.get_rate(date_obj, currency.code, fallback=True)
+
+                logger.info(f"Cotação buscada: {currency.code} {quote[0]} em {quote[1]}")
+
+                # Cotações antigas (SGS fora do ar) saem sem ficar no cache
+                with span('serialize'):
+                    response = rate_response(key, currency, *quote, stale=is_stale(quote))
+                cached = get_response_cache().set(key, response)
+
+            headers = ((b"etag", cached.etag.encode()), (b"cache-control", cached.cache_control.encode()))
+            if_none_match = dict(scope.get('headers') or ()).get(b"if-none-match")
+            if if_none_match and etag_matches(if_none_match.decode("latin-1"), cached.etag):
+                return 304, b"", None, headers
+            return 200, cached.body, JSON_MIMETYPE, headers
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar cotação: {str(e)}")
+            return _json(500, error_body(f'Erro interno: {str(e)}'))
+
+    async def convert(self, scope, receive):
+        """POST /api/convert (mesmo corpo de api.convert_currency)"""
+        try:
+            try:
+                with span('json'):
+                    data = await self._read_json(scope, receive)
+                with span('validate'):
+                    params = parse_convert_request(data)
+            except RequestError as e:
+                return _json(400, error_body(str(e)))
+
+            quote = await self.engine.get_rate(params.date, params.currency.code, fallback=True)
+            with span('render'):
+                conversion = _render_conversion(params.usd_amount, *quote, params.show_url, params.exact,
+                                                params.template, params.currency, is_stale(quote))
+
+            logger.info(f"Conversão realizada: {params.currency.code} {params.usd_amount} -> BRL {conversion['brl_amount']}")
+
+            return _json(200, convert_body(params, conversion))
+
+        except Exception as e:
+            logger.error(f"Erro na conversão: {str(e)}")
+            return _json(500, error_body(f'Erro interno: {str(e)}'))
+
+    async def _convert_group(self, batch, code, group):
+        # Equivalente assíncrono de build_conversions para os itens de uma moeda
+        default_date = default_quote_date()
+        dates = [default_date if date_obj is None else date_obj for _, _, date_obj, _ in group]
+        quotes = await self.engine.get_rates(dates, code, fallback=True, preload=True)
+
+        conversions = []
+        with span('render'):
+            for (_, usd_amount, _, currency), quote_date in zip(group, dates):
+                quote = quotes[date_key(quote_date)]
+                if isinstance(quote, Exception):
+                    conversions.append(quote)
+                else:
+                    conversions.append(_render_conversion(usd_amount, *quote, batch.show_url, batch.exact,
+                                                          batch.template, currency, is_stale(quote)))
+        return conversions
+
+    async def convert_batch(self, scope, receive):
+        """POST /api/convert/batch (mesmo corpo de api.convert_currency_batch)"""
+        try:
+            try:
+                with span('json'):
+                    data = await self._read_json(scope, receive)
+                with span('validate'):
+                    batch = parse_batch_request(data)
+            except RequestError as e:
+                return _json(400, error_body(str(e)))
+
+            get_metrics().observe_batch(batch.total)
+
+            # Moedas diferentes são resolvidas em paralelo
+            codes = list(batch.groups)
+            results = await asyncio.gather(
+                *(self._convert_group(batch, code, batch.groups[code]) for code in codes)
+            )
+            with span('serialize'):
+                body = batch_body(batch, dict(zip(codes, results)))
+
+            logger.info(f"Conversão em lote realizada: {body['summary']['succeeded']}/{batch.total} itens")
+
+            return _json(200, body)
+
+        except Exception as e:
+            logger.error(f"Erro na conversão em lote: {str(e)}")
+            return _json(500, error_body(f'Erro interno: {str(e)}'))
+
+
+app = ASGIApp(concurrency=int(os.environ.get('PTAX_ASYNC_CONCURRENCY', DEFAULT_CONCURRENCY)))
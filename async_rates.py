@@ -0,0 +1,167 @@
+"""
+Busca assíncrona de cotações PTAX para o Gerador de Descrição de Conversão de Moeda
+
+Permite resolver muitas datas em paralelo a partir de código asyncio. As
+requisições ao SGS continuam sendo feitas por get_ptax_rate (com cache
+e sessão HTTP compartilhada), executadas em um pool de threads com limite de
+concorrência. Pedidos simultâneos para a mesma moeda e data compartilham
+uma única busca.
+
+Esperar pela cotação não ocupa uma thread: só as buscas ao SGS vão para o
+pool, então um processo pode manter centenas de conversões em andamento
+(ver asgi.py).
+
+Exemplo:
+
+    import asyncio
+    from async_rates import get_rates
+
+    rates = asyncio.run(get_rates([datetime(2025, 8, 5), datetime(2025, 8, 6)]))
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from currencies import DEFAULT_CURRENCY, get_currency
+from invoice_description_generator import _is_cached, get_ptax_rate, get_ptax_rates
+from ptax_calendar import latest_business_day
+from rate_cache import date_key, get_rate_cache
+from validation import default_quote_date
+
+
+DEFAULT_CONCURRENCY = 10
+
+
+class AsyncRateEngine:
+    """
+    Resolve cotações de forma assíncrona, com limite de concorrência e
+    agrupamento de pedidos simultâneos para a mesma data.
+
+    Cada instância deve ser usada a partir de um único event loop.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, executor=None):
+        """
+        Args:
+            concurrency (int): Máximo de buscas simultâneas ao SGS
+            executor (Executor): Pool de threads (opcional)
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency deve ser maior que zero")
+
+        self.concurrency = concurrency
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="sgs"
+        )
+        self._semaphore = None
+        self._in_flight = {}
+
+    async def _run(self, fn, *args):
+        # Executa uma busca bloqueante no pool, respeitando o limite de concorrência
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            # Como asyncio.to_thread: a thread enxerga o contexto da requisição (Server-Timing)
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, context.run, fn, *args)
+
+    @staticmethod
+    def _in_memory(date, fallback, currency):
+        # Com fallback, a data provável é o último dia útil
+        cached_date = latest_business_day(date) if fallback else date
+        return get_rate_cache().contains(cached_date, currency.series, memory_only=True)
+
+    async def get_rate(self, date=None, currency=DEFAULT_CURRENCY, fallback=False):
+        """
+        Busca a cotação de uma data.
+
+        Args:
+            date (datetime): Data da cotação (opcional, padrão: ontem)
+            currency (str): Código da moeda (USD, EUR ou GBP)
+            fallback (bool): Se deve usar a última cotação publicada em ou antes da data
+
+        Returns:
+            tuple: (cotação, data_formatada, url_completa)
+        """
+        currency = get_currency(currency)
+        if date is None:
+            date = default_quote_date()
+
+        # Acertos na memória não precisam de thread; o snapshot e o
+        # armazenamento (SQLite ou Redis) são consultados no pool
+        if self._in_memory(date, fallback, currency):
+            return get_ptax_rate(date, fallback, currency.code)
+
+        key = (currency.series, date_key(date), fallback)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(get_ptax_rate, date, fallback, currency.code))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # shield: o cancelamento de um chamador não cancela a busca compartilhada
+        return await asyncio.shield(task)
+
+    async def get_rates(self, dates, currency=DEFAULT_CURRENCY, fallback=False, preload=False):
+        """
+        Busca as cotações de várias datas em paralelo.
+
+        Args:
+            dates (iterable): Datas de cotação
+            currency (str): Código da moeda (USD, EUR ou GBP)
+            fallback (bool): Se deve usar a última cotação publicada em ou antes de cada data
+            preload (bool): Se deve carregar antes, com uma única consulta, o
+                intervalo das datas fora do cache (como resolve_rates)
+
+        Returns:
+            dict: Mapeamento YYYY-MM-DD -> (cotação, data_formatada, url_completa) ou Exception
+        """
+        currency = get_currency(currency)
+        distinct = {}
+        for date in dates:
+            distinct.setdefault(date_key(date), date)
+
+        if preload:
+            missing = [date for date in distinct.values() if not self._in_memory(date, fallback, currency)]
+            if len(missing) > 1:
+                missing = await self._run(
+                    lambda: [date for date in missing if not _is_cached(date, fallback, currency)]
+                )
+            if len(missing) > 1:
+                try:
+                    await self._run(get_ptax_rates, min(missing), max(missing), currency.code)
+                except Exception:
+                    # Sem a carga por intervalo, cada data é buscada individualmente
+                    pass
+
+        results = await asyncio.gather(
+            *(self.get_rate(date, currency, fallback) for date in distinct.values()),
+            return_exceptions=True
+        )
+        return dict(zip(distinct.keys(), results))
+
+    def close(self):
+        """Encerra o pool de threads."""
+        self._executor.shutdown(wait=False)
+
+
+async def get_rates(dates, concurrency=DEFAULT_CONCURRENCY, currency=DEFAULT_CURRENCY):
+    """
+    Busca as cotações de várias datas em paralelo.
+
+    Args:
+        dates (iterable): Datas de cotação
+        concurrency (int): Máximo de buscas simultâneas ao SGS
+        currency (str): Código da moeda (USD, EUR ou GBP)
+
+    Returns:
+        dict: Mapeamento YYYY-MM-DD -> (cotação, data_formatada, url_completa) ou Exception
+    """
+    engine = AsyncRateEngine(concurrency)
+    try:
+        return await engine.get_rates(dates, currency)
+    finally:
+        engine.close()
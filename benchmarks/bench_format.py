@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da formatação de valores no padrão brasileiro
+
+Compara, por valor formatado, a implementação anterior de format_currency
+(f-string com três str.replace) com br_format (escalar e format_many).
+
+Uso:
+    python benchmarks/bench_format.py --count 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from br_format import BRL, format_many, format_rate  # noqa: E402
+
+
+def legacy_format(value):
+    """Implementação anterior de format_currency(value, "BRL")."""
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def legacy_rate(rate):
+    """Implementação anterior da formatação da cotação em generate_conversion_text."""
+    return f"R$ {rate:.4f}".replace(".", ",")
+
+
+def measure(label, fn, count, repeat):
+    """Executa fn e retorna o melhor tempo por valor, em nanossegundos."""
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    per_value = best / count * 1e9
+    print(f"{label:<32} {per_value:8.1f} ns/valor")
+    return per_value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de formatação pt-BR")
+    parser.add_argument("--count", type=int, default=100000, help="Valores por rodada")
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas (usa a melhor)")
+    args = parser.parse_args()
+
+    random.seed(1312)
+    values = [round(random.uniform(0, 1_000_000), 2) for _ in range(args.count)]
+    decimals = [Decimal(str(value)) for value in values]
+    # Lotes reais têm poucas cotações distintas (uma por data)
+    rates = [round(random.uniform(4.5, 6.5), 4) for _ in range(250)] * (args.count // 250 + 1)
+    rates = rates[:args.count]
+
+    assert format_many(values, BRL) == [legacy_format(value) for value in values]
+    assert [BRL(value) for value in values] == [legacy_format(value) for value in values]
+
+    print(f"Formatando {args.count} valores (melhor de {args.repeat} rodadas)")
+    print("-" * 50)
+    legacy = measure("format_currency anterior", lambda: [legacy_format(v) for v in values], args.count, args.repeat)
+    scalar = measure("br_format.BRL (escalar)", lambda: [BRL(v) for v in values], args.count, args.repeat)
+    vector = measure("br_format.format_many", lambda: format_many(values, BRL), args.count, args.repeat)
+    measure("br_format.BRL (Decimal)", lambda: [BRL(v) for v in decimals], args.count, args.repeat)
+    legacy_rates = measure("cotação anterior", lambda: [legacy_rate(r) for r in rates], args.count, args.repeat)
+    cached_rates = measure("br_format.format_rate", lambda: [format_rate(r) for r in rates], args.count, args.repeat)
+    print("-" * 50)
+    print(f"Ganho escalar: {legacy / scalar:.2f}x | ganho format_many: {legacy / vector:.2f}x | "
+          f"ganho cotação: {legacy_rates / cached_rates:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo de inicialização (importação dos módulos e CLI)
+
+Mede, em processos novos:
+
+- o tempo acumulado de importação de cada módulo (python -X importtime)
+- o tempo total de uma execução da CLI respondida pelo snapshot, sem rede
+- quais dependências pesadas (requests, sqlite3, ...) foram carregadas
+
+Com --compare-ref, a mesma medição é feita em outra versão do repositório
+(extraída com git archive) para comparação.
+
+Uso:
+    python benchmarks/bench_import.py --repeat 20
+    python benchmarks/bench_import.py --compare-ref HEAD~1
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+MODULES = ("invoice_description_generator", "api")
+
+# Dependências que só devem ser carregadas quando forem usadas
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "sqlite3", "argparse", "tempfile")
+
+CLI_PROBE = """
+import sys
+sys.argv = ["invoice-generator", "--input", "6774", "--date", "07082025"]
+import invoice_description_generator
+invoice_description_generator.main()
+print("LOADED", ",".join(name for name in {heavy!r} if name in sys.modules), file=sys.stderr)
+"""
+
+
+def import_time_us(root, module):
+    """Tempo acumulado de importação do módulo, em microssegundos, em um processo novo."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise RuntimeError(f"{module} não encontrado na saída de -X importtime")
+
+
+def write_probe_snapshot(root, path):
+    """Grava um snapshot com a cotação usada pela execução da CLI."""
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys; from rate_snapshot import write_snapshot; "
+         "write_snapshot(sys.argv[1], {1: {'2025-08-06': 5.4802}})", path],
+        cwd=root, check=True
+    )
+
+
+def cli_run(root, env):
+    """Executa a CLI (resposta vinda do snapshot) e retorna (segundos, módulos pesados carregados)."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CLI_PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=root, env=env, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    loaded = [line for line in completed.stderr.splitlines() if line.startswith("LOADED")]
+    return elapsed, loaded[-1][len("LOADED "):] if loaded else "?"
+
+
+def measure(root, repeat, snapshot_path):
+    """Mede importação e CLI em um diretório do projeto."""
+    results = {}
+    for module in MODULES:
+        samples = [import_time_us(root, module) for _ in range(repeat)]
+        results[module] = statistics.median(samples) / 1000
+
+    env = dict(os.environ, SGS_OFFLINE="1", PTAX_SNAPSHOT_PATH=snapshot_path)
+    env.pop("PTAX_CACHE_PATH", None)
+    env.pop("PTAX_CACHE_REDIS_URL", None)
+    runs = [cli_run(root, env) for _ in range(repeat)]
+    results["cli (snapshot)"] = statistics.median(elapsed for elapsed, _ in runs) * 1000
+    return results, runs[-1][1]
+
+
+def report(label, results, loaded):
+    print(label)
+    print("-" * 60)
+    for name, milliseconds in results.items():
+        kind = "execução" if name.startswith("cli") else "importação"
+        print(f"{name:<32} {milliseconds:8.1f} ms ({kind})")
+    print(f"{'dependências carregadas na CLI':<32} {loaded or '(nenhuma)'}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do custo de inicialização")
+    parser.add_argument("--repeat", type=int, default=10, help="Processos por medição (usa a mediana)")
+    parser.add_argument("--compare-ref", help="Versão do git para comparação (ex: HEAD~1)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        snapshot_path = os.path.join(workdir, "ptax.snap")
+        write_probe_snapshot(ROOT_DIR, snapshot_path)
+
+        current, loaded = measure(ROOT_DIR, args.repeat, snapshot_path)
+        report(f"Árvore atual (mediana de {args.repeat} processos)", current, loaded)
+
+        if args.compare_ref:
+            ref_dir = os.path.join(workdir, "ref")
+            os.mkdir(ref_dir)
+            archive = subprocess.run(["git", "archive", args.compare_ref], cwd=ROOT_DIR,
+                                     capture_output=True, check=True).stdout
+            subprocess.run(["tar", "-x", "-C", ref_dir], input=archive, check=True)
+
+            previous, loaded = measure(ref_dir, args.repeat, snapshot_path)
+            report(f"{args.compare_ref} (mediana de {args.repeat} processos)", previous, loaded)
+
+            for name, milliseconds in current.items():
+                if name in previous:
+                    print(f"{name:<32} {previous[name] / milliseconds:6.2f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
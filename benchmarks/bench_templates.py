@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da renderização das descrições
+
+Compara, por descrição, o texto montado com f-string (implementação
+anterior de _render_conversion) com os modelos compilados de
+description_templates, com valores já formatados e na conversão completa.
+
+Uso:
+    python benchmarks/bench_templates.py --count 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from description_templates import get_template  # noqa: E402
+from invoice_description_generator import _render_conversion  # noqa: E402
+
+
+def legacy_text(usd, rate, date, brl):
+    """Texto montado pela implementação anterior."""
+    return f"Valor recebido em moeda estrangeira ({usd}), convertido conforme PTAX de venda de {date} ({rate}), conforme IN RFB nº 1.312/2012. Valor total em reais: {brl}."
+
+
+def measure(label, fn, count, repeat):
+    """Executa fn e retorna o melhor tempo por descrição, em nanossegundos."""
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    per_item = best / count * 1e9
+    print(f"{label:<36} {per_item:8.1f} ns/descrição")
+    return per_item
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark dos modelos de descrição")
+    parser.add_argument("--count", type=int, default=100000, help="Descrições por rodada")
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas (usa a melhor)")
+    args = parser.parse_args()
+
+    random.seed(1312)
+    amounts = [round(random.uniform(0, 100_000), 2) for _ in range(args.count)]
+    formatted = [("USD 6.774,00", "R$ 5,4802", "06/08/2025", f"R$ {amount}") for amount in amounts]
+    template = get_template()
+
+    assert all(template.render(*values) == legacy_text(*values) for values in formatted[:1000])
+
+    print(f"Renderizando {args.count} descrições (melhor de {args.repeat} rodadas)")
+    print("-" * 60)
+    legacy = measure("f-string anterior", lambda: [legacy_text(*v) for v in formatted], args.count, args.repeat)
+    compiled = measure("modelo compilado", lambda: [template.render(*v) for v in formatted], args.count, args.repeat)
+    measure("_render_conversion completo", lambda: [
+        _render_conversion(amount, 5.4802, "06/08/2025", "https://example", template=template)
+        for amount in amounts
+    ], args.count, args.repeat)
+    print("-" * 60)
+    print(f"Modelo compilado / f-string: {compiled / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a API do SGS para benchmarks sem rede
+
+Responde GET /dados/serie/bcdata.sgs.{série}/dados?dataInicial=...&dataFinal=...
+no mesmo formato do SGS, com cotações determinísticas por série e data. Fins
+de semana (e, opcionalmente, uma fração dos dias úteis) não têm cotação; uma
+consulta sem nenhum dia com cotação responde 404, como o SGS.
+
+A latência e a taxa de erros (503) são configuráveis, para medir o efeito
+do cache, das novas tentativas e do paralelismo com um SGS lento ou instável.
+
+Uso direto:
+    python benchmarks/fake_sgs.py --port 8099 --latency 0.05 --error-rate 0.01
+    SGS_BASE_URL=http://127.0.0.1:8099 python invoice_description_generator.py --input 100
+
+Uso como módulo:
+    with FakeSGS(latency=0.05) as sgs:
+        os.environ["SGS_BASE_URL"] = sgs.url
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+PATH_PATTERN = re.compile(r"^/dados/serie/bcdata\.sgs\.(\d+)/dados$")
+
+
+def fake_rate(series, day):
+    """
+    Cotação determinística de uma série em uma data.
+
+    Args:
+        series (int): Código da série SGS
+        day (date): Data da cotação
+
+    Returns:
+        float: Cotação com 4 casas decimais
+    """
+    base = 5.0 + (series % 7) * 0.5
+    return round(base + (zlib.crc32(f"{series}:{day.isoformat()}".encode()) % 10000) / 10000, 4)
+
+
+class FakeSGS:
+    """
+    Servidor HTTP do SGS simulado, executado em uma thread.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, empty_rate=0.0, seed=1312):
+        """
+        Args:
+            host (str): Endereço de escuta
+            port (int): Porta (0 escolhe uma porta livre)
+            latency (float): Atraso de cada resposta, em segundos
+            error_rate (float): Fração das requisições respondidas com 503
+            empty_rate (float): Fração dos dias úteis sem cotação (feriados simulados)
+            seed (int): Semente dos erros aleatórios
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """str: Endereço base para SGS_BASE_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def has_rate(self, day):
+        """
+        Verifica se a data tem cotação publicada no servidor simulado.
+
+        Returns:
+            bool: False para fins de semana e feriados simulados
+        """
+        if day.weekday() >= 5:
+            return False
+        return zlib.crc32(day.isoformat().encode()) % 10000 >= self.empty_rate * 10000
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return True
+        return False
+
+    def _make_handler(self):
+        sgs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeçalhos e corpo são escritos separadamente: sem isso, o
+            # algoritmo de Nagle soma ~40 ms a cada resposta keep-alive
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if sgs.latency:
+                    time.sleep(sgs.latency)
+
+                parts = urlsplit(self.path)
+                match = PATH_PATTERN.match(parts.path)
+                if match is None:
+                    self._send(404, {"error": "série não encontrada"})
+                    return
+
+                if sgs._should_fail():
+                    self._send(503, {"error": "serviço indisponível"})
+                    return
+
+                query = parse_qs(parts.query)
+                try:
+                    start = datetime.strptime(query["dataInicial"][0], "%d/%m/%Y").date()
+                    end = datetime.strptime(query["dataFinal"][0], "%d/%m/%Y").date()
+                except (KeyError, ValueError):
+                    self._send(400, {"error": "datas inválidas"})
+                    return
+
+                series = int(match.group(1))
+                data = []
+                day = start
+                while day <= end:
+                    if sgs.has_rate(day):
+                        data.append({"data": day.strftime("%d/%m/%Y"), "valor": f"{fake_rate(series, day):.4f}"})
+                    day += timedelta(days=1)
+
+                if not data:
+                    self._send(404, {"error": "Value(s) not found"})
+                    return
+                self._send(200, data)
+
+        return Handler
+
+    def start(self):
+        """Inicia o servidor em uma thread de fundo."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerra o servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do SGS")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta")
+    parser.add_argument("--port", type=int, default=8099, help="Porta")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso de cada resposta, em segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração das requisições com 503")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="Fração dos dias úteis sem cotação")
+    args = parser.parse_args()
+
+    sgs = FakeSGS(args.host, args.port, args.latency, args.error_rate, args.empty_rate)
+    print(f"SGS simulado em {sgs.url} (Ctrl+C para encerrar)")
+    try:
+        sgs._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sgs._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
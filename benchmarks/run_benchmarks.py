@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Benchmarks reproduzíveis sem rede, com o SGS simulado (fake_sgs)
+
+Mede, contra um SGS local com latência e taxa de erros configuráveis:
+
+- format: formatação de valores e renderização das descrições (ns/item)
+- cli_stream: conversão de um CSV com process_stream, cache frio (linhas/s)
+- cli_process: o mesmo CSV pela linha de comando, incluindo a inicialização (s)
+- api_convert: POST /api/convert com clientes simultâneos (req/s, p50, p99)
+- api_batch: POST /api/convert/batch, cache frio e quente (ms por lote)
+
+Os resultados são gravados em JSON para comparação entre versões; com
+--compare, as variações em relação a um resultado anterior são mostradas e
+o código de saída é 1 se alguma piorar mais que --threshold.
+
+Uso:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --sgs-latency 0.05 --compare results.json
+    python benchmarks/run_benchmarks.py --only format api_convert --quick
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_sgs import FakeSGS  # noqa: E402
+
+
+BENCHMARKS = ("format", "cli_stream", "cli_process", "api_convert", "api_batch")
+
+
+def result(value, unit, higher_is_better, **extra):
+    """Resultado de uma medição no formato gravado em JSON."""
+    return dict(value=round(value, 6), unit=unit, higher_is_better=higher_is_better, **extra)
+
+
+def percentile(values, fraction):
+    """Percentil por posição em uma lista já ordenada."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def business_dates(count, seed):
+    """Datas de cotação (DDMMYYYY) sorteadas nos últimos anos."""
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    return [(start + timedelta(days=rng.randrange(365 * 5))).strftime("%d%m%Y") for _ in range(count)]
+
+
+def reset_cache():
+    """Descarta as cotações em cache, para medições com cache frio."""
+    import rate_cache
+
+    rate_cache.configure_rate_cache()
+
+
+def bench_format(args):
+    from br_format import BRL, format_many
+    from description_templates import get_template
+
+    rng = random.Random(args.seed)
+    count = args.format_count
+    values = [round(rng.uniform(0, 100_000), 2) for _ in range(count)]
+    formatted = [("USD 6.774,00", "R$ 5,4802", "06/08/2025", BRL(value)) for value in values]
+    template = get_template()
+
+    def ns_per_item(fn):
+        return min(timeit.repeat(fn, number=1, repeat=args.repeat)) / count * 1e9
+
+    return {
+        "format.brl_scalar": result(ns_per_item(lambda: [BRL(v) for v in values]), "ns/item", False),
+        "format.brl_many": result(ns_per_item(lambda: format_many(values, BRL)), "ns/item", False),
+        "format.template_render": result(ns_per_item(lambda: [template.render(*v) for v in formatted]),
+                                         "ns/item", False),
+    }
+
+
+def write_csv(path, rows, seed, distinct_dates):
+    dates = business_dates(distinct_dates, seed)
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["usd_amount", "date"])
+        for _ in range(rows):
+            writer.writerow([f"{rng.uniform(1, 50_000):.2f}", rng.choice(dates)])
+
+
+def bench_cli_stream(args, workdir):
+    from invoice_description_generator import process_stream
+
+    input_path = os.path.join(workdir, "stream.csv")
+    write_csv(input_path, args.rows, args.seed, args.distinct_dates)
+
+    reset_cache()
+    count, elapsed = process_stream(input_path, os.path.join(workdir, "stream.out.csv"), fallback=True)
+    return {"cli_stream.rows_per_second": result(count / elapsed, "rows/s", True, rows=count)}
+
+
+def bench_cli_process(args, workdir, env):
+    input_path = os.path.join(workdir, "process.csv")
+    write_csv(input_path, args.rows, args.seed, args.distinct_dates)
+
+    command = [sys.executable, os.path.join(ROOT_DIR, "invoice_description_generator.py"),
+               "--file", input_path, "--output", os.path.join(workdir, "process.out.csv")]
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return {"cli_process.seconds": result(min(timings), "s", False, rows=args.rows)}
+
+
+class APIServer:
+    """API Flask servida pelo werkzeug em uma thread, com várias threads por requisição."""
+
+    def __init__(self):
+        from werkzeug.serving import make_server
+        from api import app
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        logging.getLogger("api").setLevel(logging.WARNING)
+        self._server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._thread.join()
+
+
+def bench_api_convert(args):
+    import requests
+
+    dates = business_dates(args.distinct_dates, args.seed)
+    rng = random.Random(args.seed)
+    payloads = [{"usd_amount": round(rng.uniform(1, 50_000), 2), "date": rng.choice(dates)}
+                for _ in range(args.requests)]
+    local = threading.local()
+    failures = []
+
+    reset_cache()
+    with APIServer() as server:
+        endpoint = server.url + "/api/convert"
+
+        def post(payload):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            start = time.perf_counter()
+            response = session.post(endpoint, json=payload)
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                failures.append(response.status_code)
+            return elapsed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            latencies = sorted(pool.map(post, payloads))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "api_convert.requests_per_second": result(len(payloads) / elapsed, "req/s", True,
+                                                  concurrency=args.concurrency, failed=len(failures)),
+        "api_convert.p50_ms": result(percentile(latencies, 0.50) * 1000, "ms", False),
+        "api_convert.p99_ms": result(percentile(latencies, 0.99) * 1000, "ms", False),
+    }
+
+
+def bench_api_batch(args):
+    import requests
+
+    dates = business_dates(args.distinct_dates, args.seed)
+    rng = random.Random(args.seed)
+    items = [{"usd_amount": round(rng.uniform(1, 50_000), 2), "date": rng.choice(dates)}
+             for _ in range(args.batch_size)]
+
+    reset_cache()
+    with APIServer() as server, requests.Session() as session:
+        endpoint = server.url + "/api/convert/batch"
+
+        def post():
+            start = time.perf_counter()
+            response = session.post(endpoint, json={"items": items})
+            response.raise_for_status()
+            return (time.perf_counter() - start) * 1000
+
+        cold = post()
+        warm = min(post() for _ in range(args.repeat))
+
+    return {
+        "api_batch.cold_ms": result(cold, "ms", False, items=len(items)),
+        "api_batch.warm_ms": result(warm, "ms", False, items=len(items)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Mostra a variação de cada medição em relação a um resultado anterior.
+
+    Returns:
+        list: Nomes das medições que pioraram mais que threshold
+    """
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)["results"]
+
+    regressions = []
+    print(f"\nComparação com {baseline_path}")
+    print("-" * 72)
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        worse = -change if current["higher_is_better"] else change
+        flag = "  PIOROU" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<36} {previous['value']:>12.2f} -> {current['value']:>12.2f} {current['unit']:<8} "
+              f"{change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks sem rede com o SGS simulado")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Executa só os benchmarks indicados")
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    parser.add_argument("--compare", metavar="BASELINE", help="Resultado anterior (JSON) para comparação")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Piora máxima aceita em --compare, em fração (padrão: 0.10)")
+    parser.add_argument("--quick", action="store_true", help="Volumes reduzidos, para verificação rápida")
+    parser.add_argument("--seed", type=int, default=1312, help="Semente dos dados gerados")
+    parser.add_argument("--repeat", type=int, default=3, help="Rodadas por medição (usa a melhor)")
+    parser.add_argument("--rows", type=int, default=50_000, help="Linhas do CSV dos benchmarks da CLI")
+    parser.add_argument("--distinct-dates", type=int, default=200, help="Datas distintas nos dados gerados")
+    parser.add_argument("--format-count", type=int, default=100_000, help="Itens do benchmark de formatação")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições em api_convert")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultâneos em api_convert")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Itens por lote em api_batch")
+    parser.add_argument("--sgs-latency", type=float, default=0.02, help="Latência do SGS simulado, em segundos")
+    parser.add_argument("--sgs-error-rate", type=float, default=0.0, help="Fração de respostas 503 do SGS simulado")
+    parser.add_argument("--sgs-empty-rate", type=float, default=0.02, help="Fração de dias úteis sem cotação")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.repeat = 1
+        args.rows = 2000
+        args.format_count = 10_000
+        args.requests = 200
+        args.batch_size = 500
+
+    selected = args.only or BENCHMARKS
+
+    with FakeSGS(latency=args.sgs_latency, error_rate=args.sgs_error_rate, empty_rate=args.sgs_empty_rate) as sgs, \
+            tempfile.TemporaryDirectory() as workdir:
+        # Configuração lida na importação dos módulos, então vem antes deles
+        for name in ("PTAX_CACHE_PATH", "PTAX_CACHE_REDIS_URL", "PTAX_SNAPSHOT_PATH", "SGS_OFFLINE"):
+            os.environ.pop(name, None)
+        os.environ.update(SGS_BASE_URL=sgs.url, SGS_BACKOFF="0.01",
+                          SGS_POOL_SIZE=str(max(10, args.concurrency)))
+        env = dict(os.environ)
+
+        results = {}
+        for name in selected:
+            print(f"Executando {name}...", file=sys.stderr)
+            if name == "format":
+                results.update(bench_format(args))
+            elif name == "cli_stream":
+                results.update(bench_cli_stream(args, workdir))
+            elif name == "cli_process":
+                results.update(bench_cli_process(args, workdir, env))
+            elif name == "api_convert":
+                results.update(bench_api_convert(args))
+            elif name == "api_batch":
+                results.update(bench_api_batch(args))
+
+        sgs_requests = sgs.requests
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "parameters": {key: value for key, value in vars(args).items()
+                           if key not in ("output", "compare", "only")},
+            "sgs_requests": sgs_requests,
+        },
+        "results": results,
+    }
+
+    print("-" * 60)
+    for name, measurement in results.items():
+        print(f"{name:<36} {measurement['value']:>12.2f} {measurement['unit']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
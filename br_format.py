@@ -0,0 +1,117 @@
+"""
+Formatação de números no padrão brasileiro
+
+Separador de milhar ".", separador decimal "," e prefixo de moeda opcional
+(ex: R$ 1.234,56). Os formatadores são compilados uma única vez, com a
+string de formato já montada, e format_many formata uma lista inteira com
+uma única troca de separadores sobre o texto concatenado.
+
+Exemplo:
+
+    from br_format import BRL, format_many
+
+    BRL(1234.56)                  # 'R$ 1.234,56'
+    format_many([1, 2.5], BRL)    # ['R$ 1,00', 'R$ 2,50']
+
+Medições: benchmarks/bench_format.py
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+
+
+def compile_formatter(prefix="", precision=2):
+    """
+    Cria um formatador de números no padrão brasileiro.
+
+    O número é formatado com "_" como separador de milhar, o que deixa só
+    duas substituições ("." -> "," e "_" -> ".") em vez de três.
+
+    Args:
+        prefix (str): Prefixo de moeda (ex: "R$ ")
+        precision (int): Casas decimais
+
+    Returns:
+        callable: Função valor -> texto, com os atributos prefix, precision, spec e simple_prefix
+    """
+    spec = f"_.{precision}f"
+    decimal_spec = f",.{precision}f"
+
+    def format_decimal(value):
+        # Decimal não aceita "_" como separador de milhar
+        number = format(value, decimal_spec).replace(",", "X").replace(".", ",").replace("X", ".")
+        return prefix + number
+
+    simple_prefix = not any(char in prefix for char in "._\n{}")
+
+    if not simple_prefix:
+        def formatter(value):
+            if isinstance(value, Decimal):
+                return format_decimal(value)
+            return prefix + format(value, spec).replace(".", ",").replace("_", ".")
+    else:
+        fast_format = (prefix + "{:" + spec + "}").format
+
+        def formatter(value):
+            try:
+                return fast_format(value).replace(".", ",").replace("_", ".")
+            except ValueError:
+                if isinstance(value, Decimal):
+                    return format_decimal(value)
+                raise
+
+    formatter.prefix = prefix
+    formatter.precision = precision
+    formatter.spec = spec
+    formatter.simple_prefix = simple_prefix
+    return formatter
+
+
+def format_many(values, formatter):
+    """
+    Formata vários valores de uma vez.
+
+    Args:
+        values (iterable): Valores (float, int ou Decimal)
+        formatter (callable): Formatador criado por compile_formatter
+
+    Returns:
+        list: Valores formatados, na mesma ordem
+    """
+    values = list(values)
+    if not values:
+        return []
+
+    if any(isinstance(value, Decimal) for value in values):
+        return [formatter(value) for value in values]
+
+    # Duas substituições sobre o texto concatenado em vez de duas por valor
+    prefix = formatter.prefix
+    specs = [formatter.spec] * len(values)
+
+    if formatter.simple_prefix:
+        joined = prefix + ("\n" + prefix).join(map(format, values, specs))
+        return joined.replace(".", ",").replace("_", ".").split("\n")
+
+    numbers = "\n".join(map(format, values, specs)).replace(".", ",").replace("_", ".").split("\n")
+    return [prefix + number for number in numbers]
+
+
+BRL = compile_formatter("R$ ")
+USD = compile_formatter("USD ")
+EUR = compile_formatter("EUR ")
+GBP = compile_formatter("GBP ")
+PLAIN = compile_formatter()
+
+# Cotações PTAX são publicadas com 4 casas decimais
+RATE = compile_formatter("R$ ", precision=4)
+
+# Poucas cotações distintas se repetem em muitas conversões
+format_rate = lru_cache(maxsize=4096)(RATE)
+
+CURRENCY_FORMATTERS = {
+    'BRL': BRL,
+    'USD': USD,
+    'EUR': EUR,
+    'GBP': GBP,
+}
@@ -0,0 +1,89 @@
+"""
+Moedas suportadas e respectivas séries PTAX de venda no SGS
+
+Cada moeda corresponde a uma série diária do SGS com a taxa de câmbio de
+venda (PTAX) em reais. As cotações são armazenadas no cache por série, então
+moedas diferentes não se misturam.
+
+Configuração por variáveis de ambiente:
+
+- SGS_BASE_URL: endereço do SGS, ex: um servidor local de testes
+  (padrão: https://api.bcb.gov.br)
+
+Exemplo:
+
+    from currencies import get_currency
+
+    get_currency("EUR").series   # 21619
+"""
+
+import os
+from collections import namedtuple
+
+from br_format import CURRENCY_FORMATTERS
+
+
+# Moeda usada quando nenhuma é informada
+DEFAULT_CURRENCY = "USD"
+
+SGS_BASE_URL = os.environ.get('SGS_BASE_URL', 'https://api.bcb.gov.br').rstrip('/')
+
+SGS_URL_TEMPLATE = SGS_BASE_URL + "/dados/serie/bcdata.sgs.{series}/dados"
+
+Currency = namedtuple("Currency", ["code", "series", "name"])
+Currency.__doc__ = "Moeda estrangeira: código ISO 4217, série SGS da PTAX de venda e nome."
+
+CURRENCIES = {
+    "USD": Currency("USD", 1, "Dólar americano"),
+    "EUR": Currency("EUR", 21619, "Euro"),
+    "GBP": Currency("GBP", 21623, "Libra esterlina"),
+}
+
+
+def get_currency(code=None):
+    """
+    Retorna uma moeda suportada pelo código.
+
+    Args:
+        code (str | Currency): Código ISO 4217, sem diferenciar maiúsculas (opcional, padrão: USD)
+
+    Returns:
+        Currency: Moeda
+
+    Raises:
+        ValueError: Se a moeda não for suportada
+    """
+    if code is None:
+        return CURRENCIES[DEFAULT_CURRENCY]
+    if isinstance(code, Currency):
+        return code
+    try:
+        return CURRENCIES[code.upper()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"currency deve ser uma de: {', '.join(sorted(CURRENCIES))}")
+
+
+def sgs_url(currency):
+    """
+    Retorna a URL da série PTAX de uma moeda no SGS.
+
+    Args:
+        currency (Currency): Moeda
+
+    Returns:
+        str: URL da série
+    """
+    return SGS_URL_TEMPLATE.format(series=currency.series)
+
+
+def amount_formatter(currency):
+    """
+    Retorna o formatador do valor na moeda estrangeira (ex: "EUR 1.000,00").
+
+    Args:
+        currency (Currency): Moeda
+
+    Returns:
+        callable: Formatador de br_format
+    """
+    return CURRENCY_FORMATTERS[currency.code]
@@ -0,0 +1,238 @@
+"""
+Modelos de texto da descrição de conversão
+
+Cada modelo é um texto com os campos {usd}, {rate}, {date}, {brl} e {url}
+(valores já formatados). Os modelos são validados e compilados uma única
+vez em f-strings, então renderizar uma nota é só a concatenação dos trechos
+fixos com os valores, sem interpretar o modelo a cada chamada.
+
+Modelos incluídos:
+
+- padrao: texto da IN RFB nº 1.312/2012 (usado quando nenhum é informado)
+- resumido: versão curta para campos com limite de caracteres
+- en: versão em inglês
+
+Configuração por variáveis de ambiente:
+
+- PTAX_TEMPLATES_PATH: arquivo JSON com modelos adicionais ou substitutos,
+  no formato {"nome": {"text": "...", "url_text": "..."}} (padrão: desabilitado)
+
+Exemplo:
+
+    from description_templates import get_template
+
+    get_template("resumido").render("USD 1,00", "R$ 5,4802", "06/08/2025", "R$ 5,48")
+"""
+
+import json
+import os
+import threading
+from string import Formatter
+
+
+DEFAULT_TEMPLATE = "padrao"
+
+# Campos disponíveis nos modelos, na ordem dos argumentos de render
+FIELDS = ("usd", "rate", "date", "brl", "url")
+
+DEFAULT_URL_TEXT = "\n\n🔗 Fonte dos dados: {url}"
+
+BUILTIN_TEMPLATES = {
+    "padrao": {
+        "text": "Valor recebido em moeda estrangeira ({usd}), convertido conforme PTAX de venda de {date} ({rate}), conforme IN RFB nº 1.312/2012. Valor total em reais: {brl}.",
+    },
+    "resumido": {
+        "text": "{usd} convertido pela PTAX de venda de {date} ({rate}) = {brl} (IN RFB nº 1.312/2012).",
+    },
+    "en": {
+        "text": "Amount received in foreign currency ({usd}), converted at the PTAX selling rate of {date} ({rate}), pursuant to IN RFB No. 1,312/2012. Total amount in reais: {brl}.",
+        "url_text": "\n\n🔗 Data source: {url}",
+    },
+}
+
+
+def compile_template(text):
+    """
+    Compila um modelo em uma função de renderização.
+
+    O modelo é validado e convertido em uma f-string com os campos como
+    variáveis locais, compilada uma única vez.
+
+    Args:
+        text (str): Modelo com os campos {usd}, {rate}, {date}, {brl} e {url}
+
+    Returns:
+        callable: Função (usd, rate, date, brl, url) -> texto
+
+    Raises:
+        ValueError: Se o modelo usar um campo desconhecido ou especificação de formato
+    """
+    parts = []
+
+    for literal, field, spec, conversion in Formatter().parse(text):
+        # Trechos fixos mantêm as chaves escapadas ({{ e }})
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field not in FIELDS:
+            raise ValueError(f"Campo desconhecido no modelo: {{{field}}} (use {', '.join(FIELDS)})")
+        if spec or conversion:
+            raise ValueError(f"Campos do modelo não aceitam formatação: {{{field}}}")
+        parts.append("{" + field + "}")
+
+    # repr() gera um literal válido para qualquer trecho fixo; só os campos
+    # validados acima viram expressões da f-string
+    source = f"lambda usd, rate, date, brl, url='': f{''.join(parts)!r}"
+    return eval(compile(source, f"<template {text[:40]!r}>", "eval"), {})
+
+
+class DescriptionTemplate:
+    """
+    Modelo de descrição compilado, com e sem a linha da fonte dos dados.
+    """
+
+    def __init__(self, name, text, url_text=DEFAULT_URL_TEXT):
+        """
+        Args:
+            name (str): Nome do modelo
+            text (str): Texto da descrição
+            url_text (str): Texto acrescentado quando a URL dos dados é mostrada
+        """
+        self.name = name
+        self.text = text
+        self.url_text = url_text
+        self._render = compile_template(text)
+        self._render_with_url = compile_template(text + url_text)
+
+    def render(self, usd, rate, date, brl, url="", show_url=False):
+        """
+        Renderiza a descrição com valores já formatados.
+
+        Args:
+            usd (str): Valor em dólares formatado
+            rate (str): Cotação formatada
+            date (str): Data da cotação (DD/MM/YYYY)
+            brl (str): Valor em reais formatado
+            url (str): URL da consulta ao SGS
+            show_url (bool): Se deve acrescentar a fonte dos dados
+
+        Returns:
+            str: Texto da descrição
+        """
+        if show_url:
+            return self._render_with_url(usd, rate, date, brl, url)
+        return self._render(usd, rate, date, brl, url)
+
+
+class TemplateRegistry:
+    """
+    Conjunto de modelos disponíveis, indexados por nome.
+    """
+
+    def __init__(self, templates=None):
+        """
+        Args:
+            templates (dict): Mapeamento nome -> {"text": ..., "url_text": ...} (padrão: modelos incluídos)
+        """
+        self._templates = {}
+        for name, spec in (BUILTIN_TEMPLATES if templates is None else templates).items():
+            self.register(name, spec["text"], spec.get("url_text", DEFAULT_URL_TEXT))
+
+    def register(self, name, text, url_text=DEFAULT_URL_TEXT):
+        """
+        Compila e registra um modelo (substitui um modelo de mesmo nome).
+
+        Returns:
+            DescriptionTemplate: Modelo compilado
+        """
+        template = DescriptionTemplate(name, text, url_text)
+        self._templates[name] = template
+        return template
+
+    def load(self, path):
+        """
+        Registra os modelos de um arquivo JSON ({"nome": {"text": ..., "url_text": ...}}).
+        """
+        with open(path, encoding="utf-8") as fh:
+            templates = json.load(fh)
+        for name, spec in templates.items():
+            self.register(name, spec["text"], spec.get("url_text", DEFAULT_URL_TEXT))
+
+    def get(self, name=None):
+        """
+        Retorna um modelo pelo nome.
+
+        Args:
+            name (str): Nome do modelo (opcional, padrão: DEFAULT_TEMPLATE)
+
+        Returns:
+            DescriptionTemplate: Modelo compilado
+
+        Raises:
+            ValueError: Se o modelo não existir
+        """
+        try:
+            return self._templates[DEFAULT_TEMPLATE if name is None else name]
+        except (KeyError, TypeError):
+            raise ValueError(f"template deve ser um de: {', '.join(self.names())}")
+
+    def names(self):
+        """
+        Returns:
+            list: Nomes dos modelos disponíveis
+        """
+        return sorted(self._templates)
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_template_registry():
+    """
+    Retorna os modelos padrão do processo, compilando-os na primeira chamada
+    (incluídos e, se configurado, os de PTAX_TEMPLATES_PATH).
+
+    Returns:
+        TemplateRegistry: Modelos compartilhados
+    """
+    global _default_registry
+
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                registry = TemplateRegistry()
+                path = os.environ.get('PTAX_TEMPLATES_PATH')
+                if path:
+                    registry.load(path)
+                _default_registry = registry
+    return _default_registry
+
+
+def configure_templates(path=None, templates=None):
+    """
+    Substitui os modelos padrão do processo.
+
+    Args:
+        path (str): Arquivo JSON com modelos adicionais (opcional)
+        templates (dict): Modelos base (opcional, padrão: modelos incluídos)
+
+    Returns:
+        TemplateRegistry: Novos modelos padrão
+    """
+    global _default_registry
+
+    registry = TemplateRegistry(templates)
+    if path:
+        registry.load(path)
+
+    with _default_registry_lock:
+        _default_registry = registry
+    return registry
+
+
+def get_template(name=None):
+    """
+    Atalho para get_template_registry().get(name).
+    """
+    return get_template_registry().get(name)
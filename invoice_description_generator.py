@@ -1,55 +1,277 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-import locale
-import re
+import threading
+import time
 
+from rate_cache import SingleFlight, date_key, get_rate_cache
+from sgs_client import SGSOfflineError, get_sgs_client
+from ptax_calendar import is_business_day, latest_business_day
+from br_format import BRL, CURRENCY_FORMATTERS, PLAIN, RATE, format_rate
+from money import cents_to_decimal, convert_exact, to_cents
+from description_templates import DescriptionTemplate, get_template, get_template_registry
+from currencies import CURRENCIES, DEFAULT_CURRENCY, amount_formatter, get_currency, sgs_url
+from metrics import get_metrics
+from timing import current_timer, span
+from validation import default_quote_date, parse_amount, parse_quote_date, parse_reference_date
 
-def get_bb_dollar_rate(date=None):
+
+SGS_URL = sgs_url(CURRENCIES["USD"])
+
+# Janela máxima aceita pelo SGS em uma consulta de série diária
+MAX_RANGE_DAYS = 3650
+
+# Dias anteriores consultados quando não há cotação na data (feriados prolongados)
+FALLBACK_WINDOW_DAYS = 10
+
+# Buscas de cotação em andamento neste processo, por série e data
+_rate_flights = SingleFlight()
+
+# Atualizações em segundo plano após servir uma cotação antiga: tentativas e
+# espera mínima entre elas, em segundos (com o disjuntor aberto, espera-se
+# até a chamada de teste)
+STALE_REFRESH_ATTEMPTS = 3
+STALE_REFRESH_DELAY = 1.0
+
+_refreshes = set()
+_refreshes_lock = threading.Lock()
+
+
+def _fetch_sgs(url, params):
+    """
+    Faz a requisição HTTP ao SGS e retorna o JSON decodificado.
+    
+    Args:
+        url (str): URL da série no SGS
+        params (dict): Parâmetros da consulta
+    
+    Returns:
+        list | dict: Dados retornados pelo SGS
+    """
+    with span('sgs'):
+        return get_sgs_client().get_json(url, params)
+
+
+class RateNotFoundError(Exception):
+    """O SGS não tem cotação publicada para a data (fim de semana, feriado ou data futura)."""
+
+
+class RateUnavailableError(Exception):
+    """O SGS não respondeu (falha de conexão, erro do servidor ou disjuntor aberto)."""
+
+
+class RateOutsideSnapshotError(Exception):
+    """Modo offline: a data está fora do período do snapshot (não se sabe se há cotação)."""
+
+
+class StaleQuote(tuple):
+    """
+    Cotação (cotação, data_formatada, url_completa) servida do cache porque
+    o SGS não respondeu; uma atualização em segundo plano já foi agendada.
+    """
+
+
+def is_stale(quote):
+    """Verifica se uma cotação de get_ptax_rate veio do cache com o SGS fora do ar."""
+    return isinstance(quote, StaleQuote)
+
+
+def get_bb_dollar_rate(date=None, fallback=False):
     """
     Busca a cotação PTAX de venda do dólar no Banco Central do Brasil para uma data específica.
     Se não for fornecida uma data, usa o dia anterior.
     
     Args:
         date (datetime): Data para buscar a cotação (opcional)
+        fallback (bool): Se deve usar a última cotação publicada em ou antes
+            da data quando não houver cotação no dia (fins de semana e feriados)
     
     Returns:
         tuple: (cotação, data_formatada, url_completa) ou (None, None, None) se erro
     """
+    return get_ptax_rate(date, fallback)
+
+
+def get_ptax_rate(date=None, fallback=False, currency=DEFAULT_CURRENCY):
+    """
+    Busca a cotação PTAX de venda de uma moeda no Banco Central do Brasil
+    para uma data específica. Se não for fornecida uma data, usa o dia anterior.
+    
+    Args:
+        date (datetime): Data para buscar a cotação (opcional)
+        fallback (bool): Se deve usar a última cotação publicada em ou antes
+            da data quando não houver cotação no dia (fins de semana e feriados)
+        currency (str): Código da moeda (USD, EUR ou GBP)
+    
+    Returns:
+        tuple: (cotação, data_formatada, url_completa); se o SGS não responder,
+            a última cotação conhecida como StaleQuote (ver is_stale)
+    """
+    currency = get_currency(currency)
+    
+    # Latência por resultado: acertos do cache, consultas ao SGS e falhas
+    # (também é a etapa "rate" do Server-Timing da requisição)
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        quote = _get_ptax_rate(date, fallback, currency)
+        outcome = 'stale' if is_stale(quote) else 'ok'
+        return quote
+    except RateNotFoundError:
+        outcome = 'not_found'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        get_metrics().observe_rate_lookup(currency.code, outcome, elapsed)
+        timer = current_timer()
+        if timer is not None:
+            timer.add('rate', elapsed)
+
+
+def _get_ptax_rate(date, fallback, currency, allow_stale=True):
+    """
+    Implementação de get_ptax_rate, sem métricas.
+    
+    Args:
+        date (datetime): Data para buscar a cotação (None para o dia anterior)
+        fallback (bool): Se deve usar a última cotação publicada em ou antes da data
+        currency (Currency): Moeda
+        allow_stale (bool): Se pode usar uma cotação expirada quando o SGS não responder
+    
+    Returns:
+        tuple: (cotação, data_formatada, url_completa)
+    """
     if date is None:
-        date = datetime.now() - timedelta(days=1)
+        date = default_quote_date()
+    
+    if fallback:
+        return _get_latest_rate(date, currency, allow_stale)
     
     # Formata a data para o formato esperado
     date_str = date.strftime("%d/%m/%Y")
     
+    # API do SGS - Sistema Gerenciador de Séries Temporais
+    # Uma série por moeda (ex: 1 = Taxa de câmbio - Dólar americano (venda))
+    # Formato da data para a API: DD/MM/YYYY
+    api_date = date_str
+    
+    # URL da API do SGS
+    url = sgs_url(currency)
+    
+    # Parâmetros para buscar cotação de venda do dólar
+    params = {
+        'formato': 'json',
+        'dataInicial': api_date,
+        'dataFinal': api_date
+    }
+    
+    # Constrói a URL completa para mostrar
+    param_str = '&'.join([f"{k}={v}" for k, v in params.items()])
+    full_url = f"{url}?{param_str}"
+    
+    # Cotações já publicadas não mudam: consulta o cache antes do SGS
+    cache = get_rate_cache()
+    cached_rate = cache.get(date, currency.series)
+    if cached_rate is not None:
+        return cached_rate, date_str, full_url
+    
+    # Chamadores simultâneos para a mesma série e data aguardam uma única busca
     try:
-        # API do SGS - Sistema Gerenciador de Séries Temporais
-        # Código 1 = Taxa de câmbio - Dólar americano (venda) - Ajuste pro-rata
-        # Formato da data para a API: DD/MM/YYYY
-        api_date = date.strftime("%d/%m/%Y")
-        
-        # URL da API do SGS
-        url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.1/dados"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Parâmetros para buscar cotação de venda do dólar
-        params = {
-            'formato': 'json',
-            'dataInicial': api_date,
-            'dataFinal': api_date
-        }
-        
-        # Constrói a URL completa para mostrar
-        param_str = '&'.join([f"{k}={v}" for k, v in params.items()])
-        full_url = f"{url}?{param_str}"
-        
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        ptax_venda = _rate_flights.do(
+            (currency.series, date_key(date)),
+            lambda: _fetch_rate(date, url, params, currency.series)
+        )
+    except RateUnavailableError:
+        # SGS fora do ar: serve a última cotação conhecida e atualiza depois
+        stale_rate = cache.get_stale(date, currency.series) if allow_stale else None
+        if stale_rate is None:
+            raise
+        _schedule_refresh(date, False, currency)
+        return StaleQuote((stale_rate, date_str, full_url))
+    
+    return ptax_venda, date_str, full_url
+
+
+def _last_known_quote(date, start_date, currency):
+    """
+    Busca a cotação mais recente entre start_date e date já conhecida pelo cache.
+    
+    Args:
+        date (datetime): Data final (inclusive)
+        start_date (datetime): Data inicial (inclusive)
+        currency (Currency): Moeda
+    
+    Returns:
+        StaleQuote: Cotação encontrada ou None
+    """
+    cache = get_rate_cache()
+    quote_date = date
+    while quote_date >= start_date:
+        stale_rate = cache.get_stale(quote_date, currency.series)
+        if stale_rate is not None:
+            date_str = quote_date.strftime("%d/%m/%Y")
+            full_url = f"{sgs_url(currency)}?formato=json&dataInicial={date_str}&dataFinal={date_str}"
+            return StaleQuote((stale_rate, date_str, full_url))
+        quote_date -= timedelta(days=1)
+    return None
+
+
+def _schedule_refresh(date, fallback, currency):
+    """
+    Agenda, em uma thread, a busca da cotação que foi servida antiga.
+    
+    Uma única atualização por moeda e data fica pendente; as tentativas
+    esperam a chamada de teste do disjuntor do SGS.
+    
+    Args:
+        date (datetime): Data da cotação
+        fallback (bool): Se deve usar a última cotação publicada em ou antes da data
+        currency (Currency): Moeda
+    """
+    key = (currency.series, date_key(date), fallback)
+    with _refreshes_lock:
+        if key in _refreshes:
+            return
+        _refreshes.add(key)
+    
+    def refresh():
+        breaker = get_sgs_client().breaker
+        try:
+            for _ in range(STALE_REFRESH_ATTEMPTS):
+                time.sleep(max(breaker.retry_after(), STALE_REFRESH_DELAY))
+                try:
+                    _get_ptax_rate(date, fallback, currency, allow_stale=False)
+                    return
+                except RateUnavailableError:
+                    continue
+                except Exception:
+                    return
+        finally:
+            with _refreshes_lock:
+                _refreshes.discard(key)
+    
+    threading.Thread(target=refresh, name=f"ptax-refresh-{currency.code}-{key[1]}", daemon=True).start()
+
+
+def _fetch_rate(date, url, params, series):
+    """
+    Busca a cotação de uma data no SGS e a armazena no cache.
+    
+    Args:
+        date (datetime): Data da cotação
+        url (str): URL da série no SGS
+        params (dict): Parâmetros da consulta
+        series (int): Código da série SGS
+    
+    Returns:
+        float: Cotação PTAX de venda
+    """
+    cache = get_rate_cache()
+    
+    # Outra thread pode ter concluído a busca desde a última consulta ao cache
+    if cache.contains(date, series):
+        return cache.get(date, series)
+    
+    try:
+        data = _fetch_sgs(url, params)
         
         # Busca pela cotação de venda nos dados retornados
         ptax_venda = None
@@ -68,12 +290,244 @@ def get_bb_dollar_rate(date=None):
         
         # Se não encontrou cotação, falha
         if ptax_venda is None:
-            raise Exception("Não foi possível obter cotação do SGS. Verifique a data ou sua conexão com a internet.")
+            raise RateNotFoundError("Não foi possível obter cotação do SGS. Verifique a data ou sua conexão com a internet.")
+        
+        cache.set(date, ptax_venda, series)
+        
+        return ptax_venda
         
-        return ptax_venda, date_str, full_url
+    except SGSOfflineError as e:
+        # Em modo offline, só uma data dentro do período do snapshot pode ser
+        # dada como sem cotação; fora dele, o fallback não deve recuar
+        snapshot = cache.snapshot
+        if snapshot is None or not snapshot.covers(date, series):
+            raise RateOutsideSnapshotError(f"Cotação de {date.strftime('%d/%m/%Y')} fora do snapshot: {e}")
+        raise RateNotFoundError(f"Erro ao buscar cotação do SGS: {e}")
+    except RateNotFoundError as e:
+        raise RateNotFoundError(f"Erro ao buscar cotação do SGS: {e}")
+    except Exception as e:
+        # O SGS responde 404 para consultas sem dados
+        if getattr(getattr(e, 'response', None), 'status_code', None) == 404:
+            raise RateNotFoundError(f"Erro ao buscar cotação do SGS: {e}")
+        raise RateUnavailableError(f"Erro ao buscar cotação do SGS: {e}")
+
+
+def _get_latest_rate(date, currency, allow_stale=True):
+    """
+    Busca a última cotação publicada em ou antes da data.
+    
+    O calendário de dias úteis indica a data provável sem consultar o SGS;
+    se ela também não tiver cotação (feriado não previsto ou cotação ainda
+    não publicada), uma única consulta por intervalo resolve a data correta.
+    
+    Se o SGS não responder, usa a última cotação conhecida pelo cache no
+    mesmo intervalo (StaleQuote) e agenda a atualização.
+    
+    Args:
+        date (datetime): Data de referência da cotação
+        currency (Currency): Moeda
+        allow_stale (bool): Se pode usar uma cotação antiga quando o SGS não responder
+    
+    Returns:
+        tuple: (cotação, data_formatada, url_completa) da data efetivamente usada
+    """
+    business_day = latest_business_day(date)
+    business_day = datetime(business_day.year, business_day.month, business_day.day)
+    start_date = date - timedelta(days=FALLBACK_WINDOW_DAYS)
+    
+    # Datas já resolvidas (inclusive dias úteis sem cotação) não consultam o SGS
+    cached_date = _cached_quote_date(date, currency)
+    if cached_date is not None:
+        return _get_ptax_rate(cached_date, False, currency, allow_stale)
+    
+    try:
+        if not get_rate_cache().is_missing(business_day, currency.series):
+            try:
+                return _get_ptax_rate(business_day, False, currency, allow_stale)
+            except RateNotFoundError:
+                pass
         
+        rates = get_ptax_rates(start_date, date, currency.code)
+    except RateUnavailableError:
+        quote = _last_known_quote(business_day, start_date, currency) if allow_stale else None
+        if quote is None:
+            raise
+        _schedule_refresh(date, True, currency)
+        return quote
+    
+    available = [quote_date for quote_date in rates if quote_date <= _as_date(date)]
+    
+    if not available:
+        raise _no_quote_error(date)
+    
+    quote_date = max(available)
+    return _get_ptax_rate(datetime(quote_date.year, quote_date.month, quote_date.day), False, currency)
+
+
+def _cached_quote_date(date, currency):
+    """
+    Resolve pelo cache, sem consultar o SGS, a última data com cotação em ou
+    antes da data (até FALLBACK_WINDOW_DAYS antes).
+    
+    Fins de semana e feriados do calendário são pulados; os demais dias só
+    são pulados se já se sabe que não têm cotação (RateCache.is_missing).
+    
+    Args:
+        date (datetime): Data de referência da cotação
+        currency (Currency): Moeda
+    
+    Returns:
+        datetime: Data da cotação em cache ou None se for preciso consultar o SGS
+    
+    Raises:
+        RateNotFoundError: Se nenhum dia do intervalo tem cotação
+    """
+    cache = get_rate_cache()
+    day = _as_date(date)
+    first_day = _as_date(date - timedelta(days=FALLBACK_WINDOW_DAYS))
+    
+    while day >= first_day:
+        if is_business_day(day):
+            if cache.contains(day, currency.series):
+                return datetime(day.year, day.month, day.day)
+            if not cache.is_missing(day, currency.series):
+                return None
+        day -= timedelta(days=1)
+    
+    raise _no_quote_error(date)
+
+
+def _is_cached(date, fallback, currency):
+    """
+    Verifica se a busca pode ser resolvida só com o cache, inclusive quando
+    já se sabe que não há cotação.
+    
+    Args:
+        date (datetime): Data da cotação
+        fallback (bool): Se a busca usa a última cotação publicada em ou antes da data
+        currency (Currency): Moeda
+    
+    Returns:
+        bool: True se não for preciso consultar o SGS
+    """
+    if not fallback:
+        return get_rate_cache().contains(date, currency.series)
+    try:
+        return _cached_quote_date(date, currency) is not None
+    except RateNotFoundError:
+        return True
+
+
+def _no_quote_error(date):
+    start_date = date - timedelta(days=FALLBACK_WINDOW_DAYS)
+    return RateNotFoundError(
+        f"Erro ao buscar cotação do SGS: nenhuma cotação publicada entre "
+        f"{start_date.strftime('%d/%m/%Y')} e {date.strftime('%d/%m/%Y')}"
+    )
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _mark_missing(start_date, end_date, rates, series):
+    # Registra os dias do intervalo sem cotação, para não consultá-los de novo
+    day = _as_date(start_date)
+    end_date = _as_date(end_date)
+    missing = []
+    while day <= end_date:
+        if day not in rates:
+            missing.append(day)
+        day += timedelta(days=1)
+    get_rate_cache().set_missing(missing, series)
+
+
+def get_bb_dollar_rates(start_date, end_date):
+    """
+    Busca todas as cotações PTAX de venda do dólar em um intervalo de datas
+    e as armazena no cache, evitando uma requisição por data.
+    
+    Args:
+        start_date (datetime): Data inicial (inclusive)
+        end_date (datetime): Data final (inclusive)
+    
+    Returns:
+        dict: Mapeamento date -> cotação, em ordem cronológica
+    """
+    return get_ptax_rates(start_date, end_date)
+
+
+def get_ptax_rates(start_date, end_date, currency=DEFAULT_CURRENCY):
+    """
+    Busca todas as cotações PTAX de venda de uma moeda em um intervalo de
+    datas e as armazena no cache, evitando uma requisição por data.
+    
+    Intervalos maiores que MAX_RANGE_DAYS são divididos em várias consultas.
+    Dias sem cotação (fins de semana e feriados) não aparecem no resultado.
+    Em modo offline (SGS_OFFLINE), as cotações vêm do snapshot do cache.
+    
+    Args:
+        start_date (datetime): Data inicial (inclusive)
+        end_date (datetime): Data final (inclusive)
+        currency (str): Código da moeda (USD, EUR ou GBP)
+    
+    Returns:
+        dict: Mapeamento date -> cotação, em ordem cronológica
+    """
+    currency = get_currency(currency)
+    url = sgs_url(currency)
+    
+    if end_date < start_date:
+        raise ValueError("A data final deve ser igual ou posterior à data inicial")
+    
+    if get_sgs_client().offline:
+        snapshot = get_rate_cache().snapshot
+        if snapshot is None:
+            raise Exception("Erro ao buscar cotações do SGS: modo offline sem snapshot (PTAX_SNAPSHOT_PATH)")
+        # Dias úteis depois do fim do snapshot podem ter cotação desconhecida
+        if not snapshot.covers(latest_business_day(end_date), currency.series):
+            raise RateOutsideSnapshotError(
+                f"Cotações até {end_date.strftime('%d/%m/%Y')} fora do snapshot ({snapshot.path})"
+            )
+        return snapshot.range(start_date, end_date, currency.series)
+    
+    rates = {}
+    chunk_start = start_date
+    
+    try:
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=MAX_RANGE_DAYS - 1), end_date)
+            
+            params = {
+                'formato': 'json',
+                'dataInicial': chunk_start.strftime("%d/%m/%Y"),
+                'dataFinal': chunk_end.strftime("%d/%m/%Y")
+            }
+            
+            data = _fetch_sgs(url, params)
+            
+            if isinstance(data, dict):
+                data = [data]
+            
+            for item in data:
+                if isinstance(item, dict) and 'data' in item and 'valor' in item:
+                    quote_date = datetime.strptime(item['data'], "%d/%m/%Y").date()
+                    rates[quote_date] = float(item['valor'])
+            
+            chunk_start = chunk_end + timedelta(days=1)
+    
     except Exception as e:
-        raise Exception(f"Erro ao buscar cotação do SGS: {e}")
+        if getattr(getattr(e, 'response', None), 'status_code', None) == 404:
+            # O SGS responde 404 para um trecho sem nenhuma cotação
+            get_rate_cache().set_many(rates, currency.series)
+            _mark_missing(start_date, chunk_end, rates, currency.series)
+            raise RateNotFoundError(f"Erro ao buscar cotações do SGS: {e}")
+        raise RateUnavailableError(f"Erro ao buscar cotações do SGS: {e}")
+    
+    get_rate_cache().set_many(rates, currency.series)
+    _mark_missing(start_date, end_date, rates, currency.series)
+    
+    return rates
 
 
 def format_currency(value, currency="BRL"):
@@ -81,61 +535,417 @@ def format_currency(value, currency="BRL"):
     Formata valor monetário no padrão brasileiro.
     
     Args:
-        value (float): Valor a ser formatado
+        value (float | Decimal): Valor a ser formatado
         currency (str): Moeda (BRL ou USD)
     
     Returns:
         str: Valor formatado
     """
-    if currency == "BRL":
-        return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    elif currency == "USD":
-        return f"USD {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return CURRENCY_FORMATTERS.get(currency, PLAIN)(value)
+
+
+def _render_conversion(usd_amount, rate, date_str, url, show_url=False, exact=False, template=None,
+                       currency=DEFAULT_CURRENCY, stale=False):
+    """
+    Monta o resultado de conversão a partir de uma cotação já obtida.
+    
+    Args:
+        usd_amount (float): Valor na moeda estrangeira
+        rate (float): Cotação PTAX de venda
+        date_str (str): Data da cotação (DD/MM/YYYY)
+        url (str): URL da consulta ao SGS
+        show_url (bool): Se o texto deve mostrar a URL dos dados
+        exact (bool): Se deve calcular em centavos exatos (brl_amount como Decimal)
+        template (str | DescriptionTemplate): Modelo do texto (opcional, padrão: "padrao")
+        currency (str | Currency): Moeda do valor (padrão: USD)
+        stale (bool): Se a cotação veio do cache com o SGS fora do ar (ver is_stale)
+    
+    Returns:
+        dict: Resultado com usd_amount, currency, brl_amount, rate, date, source_url e text
+            (e stale=True se a cotação for antiga)
+    """
+    if not isinstance(template, DescriptionTemplate):
+        template = get_template(template)
+    currency = get_currency(currency)
+    
+    # Calcula o valor em reais
+    if exact:
+        usd_exact = cents_to_decimal(to_cents(usd_amount))
+        brl_amount = convert_exact(usd_exact, rate)
     else:
-        return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        usd_exact = usd_amount
+        brl_amount = usd_amount * rate
+    
+    # Gera o texto com os valores formatados
+    text = template.render(amount_formatter(currency)(usd_exact), format_rate(rate), date_str, BRL(brl_amount),
+                           url, show_url)
+    
+    conversion = {
+        'usd_amount': usd_amount,
+        'currency': currency.code,
+        'brl_amount': brl_amount,
+        'rate': rate,
+        'date': date_str,
+        'source_url': url,
+        'text': text
+    }
+    if stale:
+        conversion['stale'] = True
+    
+    return conversion
+
+
+def build_conversion(usd_amount, date=None, show_url=False, fallback=False, exact=False, template=None,
+                     currency=DEFAULT_CURRENCY):
+    """
+    Converte um valor em moeda estrangeira para reais com uma única busca de cotação.
+    
+    Args:
+        usd_amount (float): Valor na moeda estrangeira
+        date (datetime): Data para buscar cotação (opcional)
+        show_url (bool): Se o texto deve mostrar a URL dos dados
+        fallback (bool): Se deve usar a última cotação publicada em ou antes da data
+        exact (bool): Se deve calcular em centavos exatos (brl_amount como Decimal)
+        template (str): Nome do modelo do texto (opcional, padrão: "padrao")
+        currency (str): Código da moeda (USD, EUR ou GBP)
+    
+    Returns:
+        dict: Resultado com usd_amount, currency, brl_amount, rate, date, source_url e text
+    """
+    # Valida o modelo e a moeda antes de consultar o SGS
+    template = get_template(template)
+    currency = get_currency(currency)
+    
+    # Busca a cotação da moeda
+    quote = get_ptax_rate(date, fallback, currency)
+    
+    with span('render'):
+        return _render_conversion(usd_amount, *quote, show_url, exact, template, currency, is_stale(quote))
+
+
+def resolve_rates(dates, fallback=False, currency=DEFAULT_CURRENCY):
+    """
+    Resolve a cotação de cada data distinta uma única vez.
+    
+    Quando há mais de uma data fora do cache, o intervalo entre a menor e a
+    maior é carregado com get_ptax_rates (uma consulta em vez de uma por
+    data). Erros são registrados por data, sem interromper as demais.
+    
+    Args:
+        dates (iterable): Datas de cotação (datetime ou None para ontem)
+        fallback (bool): Se deve usar a última cotação publicada em ou antes de cada data
+        currency (str): Código da moeda (USD, EUR ou GBP)
+    
+    Returns:
+        dict: Mapeamento data -> (cotação, data_formatada, url_completa) ou Exception
+    """
+    currency = get_currency(currency)
+    default_date = default_quote_date()
+    distinct = {}
+    for date in dates:
+        quote_date = default_date if date is None else date
+        distinct.setdefault(date_key(quote_date), quote_date)
+    
+    # Com fallback, fins de semana, feriados e dias úteis já conhecidos sem
+    # cotação são pulados até a última cotação em cache
+    missing = [d for d in distinct.values() if not _is_cached(d, fallback, currency)]
+    if len(missing) > 1:
+        try:
+            get_ptax_rates(min(missing), max(missing), currency)
+        except Exception:
+            # Sem a carga por intervalo, cada data é buscada individualmente
+            pass
+    
+    resolved = {}
+    for key, quote_date in distinct.items():
+        try:
+            resolved[key] = get_ptax_rate(quote_date, fallback, currency)
+        except Exception as e:
+            resolved[key] = e
+    
+    return resolved
+
+
+def build_conversions(items, show_url=False, fallback=False, exact=False, template=None,
+                      currency=DEFAULT_CURRENCY):
+    """
+    Converte vários valores, buscando a cotação de cada data distinta uma vez.
+    
+    Args:
+        items (iterable): Pares (valor na moeda estrangeira, data de cotação ou None)
+        show_url (bool): Se os textos devem mostrar a URL dos dados
+        fallback (bool): Se deve usar a última cotação publicada em ou antes de cada data
+        exact (bool): Se deve calcular em centavos exatos (brl_amount como Decimal)
+        template (str): Nome do modelo do texto (opcional, padrão: "padrao")
+        currency (str): Código da moeda dos valores (USD, EUR ou GBP)
+    
+    Returns:
+        list: Um resultado de conversão (dict) ou Exception por item, na mesma ordem
+    """
+    template = get_template(template)
+    currency = get_currency(currency)
+    default_date = default_quote_date()
+    items = [(usd_amount, default_date if date is None else date) for usd_amount, date in items]
+    resolved = resolve_rates((date for _, date in items), fallback, currency)
+    
+    results = []
+    with span('render'):
+        for usd_amount, date in items:
+            quote = resolved[date_key(date)]
+            if isinstance(quote, Exception):
+                results.append(quote)
+            else:
+                results.append(_render_conversion(usd_amount, *quote, show_url, exact, template, currency,
+                                                  is_stale(quote)))
+    
+    return results
 
 
-def generate_conversion_text(usd_amount, date=None, show_url=False):
+def generate_conversion_text(usd_amount, date=None, show_url=False, fallback=False, template=None,
+                             currency=DEFAULT_CURRENCY):
     """
     Gera texto de conversão de moeda estrangeira para reais.
     
     Args:
-        usd_amount (float): Valor em dólares
+        usd_amount (float): Valor na moeda estrangeira
         date (datetime): Data para buscar cotação (opcional)
         show_url (bool): Se deve mostrar a URL dos dados
+        fallback (bool): Se deve usar a última cotação publicada em ou antes da data
+        template (str): Nome do modelo do texto (opcional, padrão: "padrao")
+        currency (str): Código da moeda (USD, EUR ou GBP)
     
     Returns:
         str: Texto formatado de conversão
     """
-    # Busca a cotação do dólar
-    rate, date_str, url = get_bb_dollar_rate(date)
+    return build_conversion(usd_amount, date, show_url, fallback, template=template, currency=currency)['text']
+
+
+import sys
+import csv
+import json
+
+
+# Colunas da saída CSV do modo em lote
+STREAM_CSV_FIELDS = ['usd_amount', 'currency', 'date', 'rate', 'brl_amount', 'text', 'stale', 'error']
+
+
+def read_rows(stream, fmt):
+    """
+    Lê linhas de entrada (CSV com cabeçalho ou JSONL) sob demanda.
     
-    # Calcula o valor em reais
-    brl_amount = usd_amount * rate
+    Args:
+        stream (file): Arquivo de entrada aberto em modo texto
+        fmt (str): "csv" ou "jsonl"
+    
+    Yields:
+        dict: Linha com as chaves usd_amount, currency (opcional) e date
+        (opcional, DDMMYYYY); no JSONL, uma linha que não é JSON válido vira
+        ValueError, sem interromper a leitura
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield row
+    else:
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"JSON inválido: {e}")
+
+
+def convert_rows(rows, show_url=False, fallback=False, exact=False, template=None, currency=DEFAULT_CURRENCY):
+    """
+    Converte um fluxo de linhas, buscando a cotação de cada moeda e data uma
+    única vez.
     
-    # Formata os valores
-    usd_formatted = format_currency(usd_amount, "USD")
-    rate_formatted = f"R$ {rate:.4f}".replace(".", ",")
-    brl_formatted = format_currency(brl_amount, "BRL")
+    A memória usada depende apenas do número de pares (moeda, data)
+    distintos, não do número de linhas.
     
-    # Gera o texto
-    text = f"Valor recebido em moeda estrangeira ({usd_formatted}), convertido conforme PTAX de venda de {date_str} ({rate_formatted}), conforme IN RFB nº 1.312/2012. Valor total em reais: {brl_formatted}."
+    Args:
+        rows (iterable): Linhas com usd_amount, currency (opcional) e date (DDMMYYYY, opcional)
+        show_url (bool): Se os textos devem mostrar a URL dos dados
+        fallback (bool): Se deve usar a última cotação publicada em ou antes de cada data
+        exact (bool): Se deve calcular em centavos exatos
+        template (str): Nome do modelo do texto (opcional, padrão: "padrao")
+        currency (str): Moeda das linhas sem a coluna currency (padrão: USD)
     
-    # Adiciona a URL se solicitado
-    if show_url:
-        text += f"\n\n🔗 Fonte dos dados: {url}"
+    Yields:
+        dict: Resultado por linha (com a chave error preenchida em caso de falha)
+    """
+    template = get_template(template)
+    default_currency = get_currency(currency)
+    default_date = default_quote_date()
+    quotes = {}
     
-    return text
+    for row in rows:
+        if not isinstance(row, dict):
+            # JSON inválido (ValueError de read_rows) ou que não é um objeto
+            error = row if isinstance(row, Exception) else "a linha deve ser um objeto JSON"
+            yield {'usd_amount': None, 'currency': default_currency.code, 'date': '',
+                   'error': f"Linha inválida: {error}"}
+            continue
+        
+        date_str = row.get('date') or ''
+        result = {'usd_amount': row.get('usd_amount'), 'currency': row.get('currency') or default_currency.code,
+                  'date': date_str}
+        
+        try:
+            usd_amount = parse_amount(row.get('usd_amount'), exact)
+            quote_date = parse_quote_date(date_str) if date_str else default_date
+            row_currency = get_currency(row.get('currency') or default_currency)
+        except (TypeError, ValueError, ArithmeticError) as e:
+            result['error'] = f"Linha inválida: {e}"
+            yield result
+            continue
+        
+        key = (row_currency.series, date_key(quote_date))
+        quote = quotes.get(key)
+        if quote is None:
+            try:
+                quote = get_ptax_rate(quote_date, fallback, row_currency)
+            except Exception as e:
+                quote = e
+            # Só resultados definitivos são reaproveitados: falhas transitórias
+            # e cotações antigas (SGS fora do ar) são buscadas de novo nas
+            # próximas linhas
+            if isinstance(quote, (RateNotFoundError, RateOutsideSnapshotError)) or not (
+                isinstance(quote, Exception) or is_stale(quote)
+            ):
+                quotes[key] = quote
+        
+        if isinstance(quote, Exception):
+            result['error'] = str(quote)
+        else:
+            stale = is_stale(quote)
+            conversion = _render_conversion(usd_amount, *quote, show_url, exact, template, row_currency, stale)
+            brl_amount = conversion['brl_amount']
+            result.update({
+                'usd_amount': str(usd_amount) if exact else usd_amount,
+                'currency': row_currency.code,
+                'rate': conversion['rate'],
+                'brl_amount': str(brl_amount) if exact else round(brl_amount, 2),
+                'text': conversion['text'],
+                'stale': stale
+            })
+        
+        yield result
 
 
-import sys
-import argparse
+def write_rows(results, stream, fmt):
+    """
+    Escreve os resultados incrementalmente (CSV ou JSONL).
+    
+    Args:
+        results (iterable): Resultados produzidos por convert_rows
+        stream (file): Arquivo de saída aberto em modo texto
+        fmt (str): "csv" ou "jsonl"
+    
+    Returns:
+        int: Número de linhas escritas
+    """
+    count = 0
+    
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=STREAM_CSV_FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+            count += 1
+    else:
+        for result in results:
+            stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += 1
+    
+    return count
+
+
+def process_stream(input_path, output_path=None, fmt=None, show_url=False, fallback=False, exact=False,
+                   template=None, currency=DEFAULT_CURRENCY):
+    """
+    Converte um arquivo CSV/JSONL (ou stdin) e escreve o resultado no
+    arquivo de saída (ou stdout), linha a linha.
+    
+    Args:
+        input_path (str): Caminho da entrada ou "-" para stdin
+        output_path (str): Caminho da saída (opcional, padrão: stdout)
+        fmt (str): "csv" ou "jsonl" (opcional, deduzido pela extensão)
+        show_url (bool): Se os textos devem mostrar a URL dos dados
+        fallback (bool): Se deve usar a última cotação publicada em ou antes de cada data
+        exact (bool): Se deve calcular em centavos exatos
+        template (str): Nome do modelo do texto (opcional, padrão: "padrao")
+        currency (str): Moeda das linhas sem a coluna currency (padrão: USD)
+    
+    Returns:
+        tuple: (linhas processadas, segundos decorridos)
+    """
+    if fmt is None:
+        fmt = "csv" if input_path.lower().endswith(".csv") else "jsonl"
+    
+    start = time.perf_counter()
+    
+    source = sys.stdin if input_path == "-" else open(input_path, newline="", encoding="utf-8")
+    target = sys.stdout if output_path is None else open(output_path, "w", newline="", encoding="utf-8")
+    
+    try:
+        rows = convert_rows(read_rows(source, fmt), show_url, fallback, exact, template, currency)
+        count = write_rows(rows, target, fmt)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    
+    return count, time.perf_counter() - start
+
+
+def preload_rates(start_str, end_str, verbose=False, currencies=(DEFAULT_CURRENCY,)):
+    """
+    Carrega no cache as cotações de um período (datas DDMMYYYY, inclusive).
+    
+    Args:
+        start_str (str): Data inicial no formato DDMMYYYY
+        end_str (str): Data final no formato DDMMYYYY
+        verbose (bool): Mostra informações detalhadas
+        currencies (iterable): Códigos das moedas (uma consulta por intervalo e moeda)
+    
+    Returns:
+        dict: Mapeamento série SGS -> {date -> cotação}
+    """
+    try:
+        start_date = parse_reference_date(start_str)
+        end_date = parse_reference_date(end_str)
+    except ValueError:
+        print("❌ Erro: Datas devem estar no formato DDMMYYYY (ex: 01012025 31122025)")
+        sys.exit(1)
+    
+    loaded = {}
+    for currency in currencies:
+        try:
+            rates = get_ptax_rates(start_date, end_date, currency)
+        except Exception as e:
+            print(f"❌ Erro ao carregar cotações ({currency}): {e}")
+            sys.exit(1)
+        loaded[get_currency(currency).series] = rates
+        
+        if verbose:
+            for quote_date, rate in rates.items():
+                print(f"{currency} {quote_date.strftime('%d/%m/%Y')}: {RATE(rate)}")
+        
+        print(f"✅ {len(rates)} cotações {currency} carregadas de {start_date.strftime('%d/%m/%Y')} "
+              f"a {end_date.strftime('%d/%m/%Y')}")
+    
+    return loaded
 
 
 def main():
     """
     Função principal que aceita argumentos da linha de comando.
     """
+    # Só a linha de comando precisa do argparse; quem importa o módulo não paga por ele
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="Gerador de Descrição de Conversão de Moeda",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -144,14 +954,57 @@ Exemplos de uso:
   python invoice_description_generator.py --input 6774.00
   python invoice_description_generator.py --input 1000.00 --date 02012025
   python invoice_description_generator.py --input 50000.00 --date 07082025
+  PTAX_CACHE_PATH=ptax.sqlite3 python invoice_description_generator.py --preload 01012025 31122025
+  python invoice_description_generator.py --preload 01012015 31122025 --export-snapshot ptax.snap
+  PTAX_SNAPSHOT_PATH=ptax.snap SGS_OFFLINE=1 python invoice_description_generator.py --file notas.csv
+  python invoice_description_generator.py --file notas.csv --output resultado.csv
         """
     )
     
     parser.add_argument(
         "--input",
         type=float,
-        required=True,
-        help="Valor em dólares (ex: 6774.00)"
+        help="Valor na moeda estrangeira (ex: 6774.00)"
+    )
+    
+    parser.add_argument(
+        "--currency",
+        type=str.upper,
+        choices=sorted(CURRENCIES),
+        default=DEFAULT_CURRENCY,
+        help="Moeda do valor (padrão: USD). No modo em lote, vale para as linhas sem a coluna currency; "
+             "com --preload, define a série carregada."
+    )
+    
+    parser.add_argument(
+        "--preload",
+        nargs=2,
+        metavar=("INICIO", "FIM"),
+        help="Carrega no cache as cotações entre duas datas DDMMYYYY (inclusive). "
+             "Use com PTAX_CACHE_PATH para persistir as cotações em disco."
+    )
+    
+    parser.add_argument(
+        "--export-snapshot",
+        metavar="ARQUIVO",
+        help="Grava as cotações do cache (e do --preload, se informado) em um snapshot binário "
+             "para uso offline com PTAX_SNAPSHOT_PATH e SGS_OFFLINE=1"
+    )
+    
+    parser.add_argument(
+        "--file",
+        help="Arquivo CSV (colunas usd_amount,date) ou JSONL a converter em lote; use - para stdin"
+    )
+    
+    parser.add_argument(
+        "--output",
+        help="Arquivo de saída do modo em lote (padrão: stdout)"
+    )
+    
+    parser.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        help="Formato da entrada e da saída do modo em lote (padrão: deduzido pela extensão)"
     )
     
     parser.add_argument(
@@ -160,6 +1013,19 @@ Exemplos de uso:
         help="Data no formato DDMMYYYY (opcional, padrão: hoje). A cotação será buscada do dia anterior."
     )
     
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Calcula o valor em reais em centavos exatos (arredondamento meio centavo para cima)"
+    )
+    
+    parser.add_argument(
+        "--template",
+        choices=get_template_registry().names(),
+        help="Modelo do texto da descrição (padrão: padrao). "
+             "Modelos adicionais podem ser definidos em PTAX_TEMPLATES_PATH."
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -168,50 +1034,62 @@ Exemplos de uso:
     
     args = parser.parse_args()
     
-    try:
-        # Processa a data
-        if args.date:
-            # Valida formato DDMMYYYY
-            if len(args.date) != 8 or not args.date.isdigit():
-                print("❌ Erro: Data deve estar no formato DDMMYYYY (ex: 02012025)")
-                sys.exit(1)
-            
+    if args.preload or args.export_snapshot:
+        loaded = {}
+        if args.preload:
+            loaded = preload_rates(args.preload[0], args.preload[1], args.verbose, [args.currency])
+        
+        if args.export_snapshot:
             try:
-                # Converte DDMMYYYY para datetime
-                day = args.date[:2]
-                month = args.date[2:4]
-                year = args.date[4:8]
-                
-                # Data de referência (data fornecida)
-                reference_date = datetime(int(year), int(month), int(day))
-                
-                # Data para buscar cotação (dia anterior)
-                quote_date = reference_date - timedelta(days=1)
+                from rate_snapshot import export_snapshot
                 
-                if args.verbose:
-                    print(f"Data de referência: {reference_date.strftime('%d/%m/%Y')}")
-                    print(f"Buscando cotação de: {quote_date.strftime('%d/%m/%Y')}")
-                
-            except ValueError as e:
-                print(f"❌ Erro: Data inválida - {e}")
+                count = export_snapshot(args.export_snapshot, get_rate_cache(), loaded)
+            except Exception as e:
+                print(f"❌ Erro ao gravar snapshot: {e}")
                 sys.exit(1)
-        else:
-            # Se não foi fornecida data, usa hoje como referência e busca cotação de ontem
-            reference_date = datetime.now()
-            quote_date = reference_date - timedelta(days=1)
-            
-            if args.verbose:
-                print(f"Data de referência: {reference_date.strftime('%d/%m/%Y')}")
-                print(f"Buscando cotação de: {quote_date.strftime('%d/%m/%Y')}")
+            print(f"✅ {count} cotações gravadas em {args.export_snapshot}")
+        return
+    
+    if args.file:
+        try:
+            count, elapsed = process_stream(args.file, args.output, args.format, args.verbose,
+                                            fallback=True, exact=args.exact, template=args.template,
+                                            currency=args.currency)
+        except Exception as e:
+            print(f"❌ Erro ao processar arquivo: {e}", file=sys.stderr)
+            sys.exit(1)
+        
+        rate = count / elapsed if elapsed > 0 else 0
+        print(f"✅ {count} linhas processadas em {elapsed:.2f}s ({rate:,.0f} linhas/s)", file=sys.stderr)
+        return
+    
+    if args.input is None:
+        parser.error("o argumento --input é obrigatório")
+    
+    try:
+        # Processa a data (sem data, usa hoje como referência e busca a cotação de ontem)
+        try:
+            reference_date = parse_reference_date(args.date) if args.date else datetime.now()
+        except ValueError as e:
+            print(f"❌ Erro: {e}")
+            sys.exit(1)
+        
+        # Data para buscar cotação (dia anterior)
+        quote_date = default_quote_date(reference_date)
+        
+        if args.verbose:
+            print(f"Data de referência: {reference_date.strftime('%d/%m/%Y')}")
+            print(f"Buscando cotação de: {quote_date.strftime('%d/%m/%Y')}")
         
         if args.verbose:
             print("Gerador de Descrição de Conversão de Moeda")
             print("=" * 50)
-            print(f"Valor em USD: {args.input:,.2f}")
+            print(f"Valor em {args.currency}: {args.input:,.2f}")
             print()
         
         # Gera o texto usando a data de cotação (dia anterior)
-        text = generate_conversion_text(args.input, quote_date, args.verbose)
+        text = build_conversion(args.input, quote_date, args.verbose, fallback=True, exact=args.exact,
+                                template=args.template, currency=args.currency)['text']
         
         if args.verbose:
             print("Texto gerado:")
@@ -0,0 +1,328 @@
+"""
+Métricas do Gerador de Descrição de Conversão de Moeda
+
+Contadores e histogramas em memória, expostos no formato texto do
+Prometheus (GET /metrics na API). Registrar uma observação custa uma busca
+binária no vetor de buckets e um incremento sob lock, sem dependências
+externas.
+
+Métricas disponíveis:
+
+- ptax_http_request_duration_seconds: latência por rota, método e status da API
+- ptax_rate_lookup_duration_seconds: latência da busca de cotação (cache + SGS) por moeda e resultado
+- ptax_sgs_request_duration_seconds: latência de cada tentativa de requisição ao SGS por resultado
+- ptax_sgs_failures_total: chamadas ao SGS que falharam após todas as tentativas, por motivo
+- ptax_batch_size: itens por requisição de conversão em lote
+- ptax_rate_cache_*: acertos e falhas do cache de cotações (lidos na coleta)
+
+Cada processo (worker do gunicorn) mantém as próprias métricas.
+
+Configuração por variáveis de ambiente:
+
+- PTAX_METRICS: "0" para desabilitar a coleta (padrão: habilitado)
+
+Exemplo:
+
+    from metrics import get_metrics
+
+    get_metrics().batch_size.observe(250)
+    print(get_metrics().render())
+"""
+
+import os
+import threading
+from bisect import bisect_left
+
+
+# Limites dos buckets de latência, em segundos
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+# Limites dos buckets de tamanho de lote, em itens
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    """
+    Contador monotônico, opcionalmente com rótulos.
+    """
+
+    def __init__(self, name, help_text, labelnames=()):
+        """
+        Args:
+            name (str): Nome da métrica
+            help_text (str): Descrição mostrada em # HELP
+            labelnames (tuple): Nomes dos rótulos
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        """
+        Incrementa o contador.
+
+        Args:
+            *labelvalues: Valores dos rótulos, na ordem de labelnames
+            amount (float): Valor do incremento
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        """
+        Returns:
+            float: Valor atual do contador para os rótulos
+        """
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self):
+        """
+        Returns:
+            list: Linhas no formato de exposição do Prometheus
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Histograma com buckets fixos, opcionalmente com rótulos.
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            name (str): Nome da métrica
+            help_text (str): Descrição mostrada em # HELP
+            labelnames (tuple): Nomes dos rótulos
+            buckets (tuple): Limites superiores dos buckets, em ordem crescente
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        # Rótulos -> [contagem por bucket (não acumulada, + Inf), soma, total]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """
+        Registra uma observação.
+
+        Args:
+            value (float): Valor observado
+            *labelvalues: Valores dos rótulos, na ordem de labelnames
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labelvalues):
+        """
+        Returns:
+            int: Número de observações para os rótulos
+        """
+        with self._lock:
+            state = self._values.get(labelvalues)
+            return state[2] if state is not None else 0
+
+    def render(self):
+        """
+        Returns:
+            list: Linhas no formato de exposição do Prometheus
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        bounds = self.buckets + (float("inf"),)
+
+        with self._lock:
+            snapshot = [(labelvalues, list(counts), total, count)
+                        for labelvalues, (counts, total, count) in sorted(self._values.items())]
+
+        for labelvalues, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Metrics:
+    """
+    Métricas da aplicação e da coleta do cache de cotações.
+
+    Com enabled=False as observações são ignoradas (render continua válido).
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Args:
+            enabled (bool): Se as observações devem ser registradas
+        """
+        self.enabled = enabled
+
+        self.http_requests = Histogram(
+            "ptax_http_request_duration_seconds",
+            "Latência das requisições da API, por rota, método e status.",
+            ("route", "method", "status")
+        )
+        self.rate_lookups = Histogram(
+            "ptax_rate_lookup_duration_seconds",
+            "Latência da busca de cotação (cache e SGS), por moeda e resultado.",
+            ("currency", "outcome")
+        )
+        self.sgs_requests = Histogram(
+            "ptax_sgs_request_duration_seconds",
+            "Latência de cada tentativa de requisição ao SGS, por resultado.",
+            ("outcome",)
+        )
+        self.sgs_failures = Counter(
+            "ptax_sgs_failures_total",
+            "Chamadas ao SGS que falharam após todas as tentativas, por motivo.",
+            ("reason",)
+        )
+        self.batch_size = Histogram(
+            "ptax_batch_size",
+            "Itens por requisição de conversão em lote.",
+            buckets=BATCH_SIZE_BUCKETS
+        )
+
+    def observe_request(self, route, method, status, seconds):
+        """Registra a latência de uma requisição da API."""
+        if self.enabled:
+            self.http_requests.observe(seconds, route, method, str(status))
+
+    def observe_rate_lookup(self, currency, outcome, seconds):
+        """Registra a latência de uma busca de cotação."""
+        if self.enabled:
+            self.rate_lookups.observe(seconds, currency, outcome)
+
+    def observe_sgs_request(self, outcome, seconds):
+        """Registra a latência de uma tentativa de requisição ao SGS."""
+        if self.enabled:
+            self.sgs_requests.observe(seconds, outcome)
+
+    def count_sgs_failure(self, reason):
+        """Conta uma chamada ao SGS que falhou após todas as tentativas."""
+        if self.enabled:
+            self.sgs_failures.inc(reason)
+
+    def observe_batch(self, size):
+        """Registra o tamanho de uma requisição em lote."""
+        if self.enabled:
+            self.batch_size.observe(size)
+
+    def _cache_lines(self):
+        # Lido na coleta: o cache já mantém os próprios contadores
+        from rate_cache import get_rate_cache
+
+        stats = get_rate_cache().stats()
+        lines = []
+        for key, kind, help_text in (
+            ('hits', 'counter', 'Cotações encontradas na memória do processo.'),
+            ('snapshot_hits', 'counter', 'Cotações encontradas no snapshot.'),
+            ('store_hits', 'counter', 'Cotações encontradas no armazenamento compartilhado.'),
+            ('misses', 'counter', 'Cotações não encontradas no cache.'),
+            ('entries', 'gauge', 'Cotações mantidas na memória do processo.'),
+        ):
+            name = f"ptax_rate_cache_{key}" + ("_total" if kind == 'counter' else "")
+            lines.extend((f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {stats[key]}"))
+        return lines
+
+    def _breaker_lines(self):
+        # Estado do disjuntor do cliente SGS no momento da coleta
+        from sgs_client import get_sgs_client
+
+        name = "ptax_sgs_circuit_open"
+        state = get_sgs_client().breaker.state
+        return [f"# HELP {name} 1 se o disjuntor do SGS estiver aberto (chamadas falham na hora).",
+                f"# TYPE {name} gauge", f"{name} {0 if state == 'closed' else 1}"]
+
+    def render(self):
+        """
+        Gera o texto de exposição de todas as métricas.
+
+        Returns:
+            str: Métricas no formato de exposição do Prometheus
+        """
+        lines = []
+        for metric in (self.http_requests, self.rate_lookups, self.sgs_requests, self.sgs_failures, self.batch_size):
+            lines.extend(metric.render())
+        lines.extend(self._cache_lines())
+        lines.extend(self._breaker_lines())
+        return "\n".join(lines) + "\n"
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Retorna as métricas padrão do processo, criando-as na primeira chamada
+    a partir das variáveis de ambiente.
+
+    Returns:
+        Metrics: Métricas compartilhadas
+    """
+    global _default_metrics
+
+    if _default_metrics is None:
+        with _default_metrics_lock:
+            if _default_metrics is None:
+                _default_metrics = Metrics(enabled=os.environ.get('PTAX_METRICS', '1') != '0')
+    return _default_metrics
+
+
+def configure_metrics(enabled=True):
+    """
+    Substitui as métricas padrão do processo (zera todas as observações).
+
+    Args:
+        enabled (bool): Se as observações devem ser registradas
+
+    Returns:
+        Metrics: Novas métricas padrão
+    """
+    global _default_metrics
+
+    with _default_metrics_lock:
+        _default_metrics = Metrics(enabled=enabled)
+    return _default_metrics
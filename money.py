@@ -0,0 +1,166 @@
+"""
+Aritmética exata de conversão USD -> BRL
+
+Valores são representados em centavos (int) e a cotação PTAX, publicada com
+4 casas decimais, em décimos de milésimo (int). A conversão é uma
+multiplicação de inteiros seguida de um único arredondamento explícito para
+centavos, sem erro de ponto flutuante e sem criar um contexto Decimal por
+item. Somas de muitos itens são somas de inteiros, exatas para qualquer
+quantidade de notas.
+
+Exemplo:
+
+    from money import convert_cents, to_cents, rate_to_units, cents_to_decimal
+
+    brl = convert_cents(to_cents(6774.00), rate_to_units(5.4802))
+    cents_to_decimal(brl)   # Decimal('37122.87')
+"""
+
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+
+# Casas decimais da cotação PTAX
+RATE_DECIMALS = 4
+RATE_SCALE = 10 ** RATE_DECIMALS
+
+# Arredondamento padrão (meio centavo para cima)
+DEFAULT_ROUNDING = ROUND_HALF_UP
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(amount, rounding=DEFAULT_ROUNDING):
+    """
+    Converte um valor monetário para centavos.
+
+    Args:
+        amount (int | float | str | Decimal): Valor (ex: 6774.00, "6774.00")
+        rounding (str): Modo de arredondamento do módulo decimal
+
+    Returns:
+        int: Valor em centavos
+    """
+    if isinstance(amount, int) and not isinstance(amount, bool):
+        return amount * 100
+    if isinstance(amount, float):
+        # str() usa a menor representação decimal do float (6774.1 e não 6774.0999...)
+        amount = str(amount)
+
+    if isinstance(amount, str):
+        # Caminho rápido, sem Decimal, para valores com até 2 casas ("6774.5")
+        whole, dot, fraction = amount.strip().partition(".")
+        digits = whole.lstrip("-")
+        if digits.isdigit() and len(fraction) <= 2 and (not fraction or fraction.isdigit()):
+            cents = int(digits) * 100 + int(fraction.ljust(2, "0"))
+            return -cents if whole.startswith("-") else cents
+
+    return int(Decimal(amount).quantize(_CENT, rounding=rounding).scaleb(2))
+
+
+def rate_to_units(rate):
+    """
+    Converte uma cotação para décimos de milésimo (4 casas decimais).
+
+    Args:
+        rate (float | str | Decimal): Cotação (ex: 5.4802)
+
+    Returns:
+        int: Cotação em décimos de milésimo (ex: 54802)
+    """
+    if isinstance(rate, float):
+        return round(rate * RATE_SCALE)
+    return int(Decimal(rate).quantize(Decimal(1).scaleb(-RATE_DECIMALS), rounding=ROUND_HALF_EVEN).scaleb(RATE_DECIMALS))
+
+
+def _divide(numerator, denominator, rounding):
+    # Divisão inteira com o modo de arredondamento informado (denominador > 0)
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if rounding == ROUND_HALF_UP:
+        if remainder * 2 >= denominator:
+            quotient += 1
+    elif rounding == ROUND_HALF_EVEN:
+        if remainder * 2 > denominator or (remainder * 2 == denominator and quotient % 2 == 1):
+            quotient += 1
+    elif rounding != ROUND_DOWN:
+        raise ValueError(f"Modo de arredondamento não suportado: {rounding}")
+    return quotient if numerator >= 0 else -quotient
+
+
+def convert_cents(usd_cents, rate_units, rounding=DEFAULT_ROUNDING):
+    """
+    Converte centavos de dólar em centavos de real.
+
+    Args:
+        usd_cents (int): Valor em centavos de dólar
+        rate_units (int): Cotação em décimos de milésimo
+        rounding (str): ROUND_HALF_UP, ROUND_HALF_EVEN ou ROUND_DOWN
+
+    Returns:
+        int: Valor em centavos de real
+    """
+    return _divide(usd_cents * rate_units, RATE_SCALE, rounding)
+
+
+def cents_to_decimal(cents):
+    """
+    Converte centavos para Decimal com 2 casas.
+
+    Args:
+        cents (int): Valor em centavos
+
+    Returns:
+        Decimal: Valor (ex: Decimal('37122.87'))
+    """
+    return Decimal(cents).scaleb(-2)
+
+
+def convert_exact(usd_amount, rate, rounding=DEFAULT_ROUNDING):
+    """
+    Converte um valor em dólares para reais, arredondando para centavos.
+
+    Args:
+        usd_amount (int | float | str | Decimal): Valor em dólares
+        rate (float | str | Decimal): Cotação PTAX
+        rounding (str): Modo de arredondamento
+
+    Returns:
+        Decimal: Valor em reais com 2 casas
+    """
+    return cents_to_decimal(convert_cents(to_cents(usd_amount), rate_to_units(rate), rounding))
+
+
+def sum_conversions(items, rounding=DEFAULT_ROUNDING):
+    """
+    Converte e soma vários valores sem acumular erro.
+
+    Cada item é arredondado para centavos individualmente (como na nota
+    fiscal) e as somas são feitas em inteiros.
+
+    Args:
+        items (iterable): Pares (valor em dólares, cotação)
+        rounding (str): Modo de arredondamento
+
+    Returns:
+        dict: count, usd_total e brl_total (Decimal com 2 casas)
+    """
+    count = 0
+    usd_total = 0
+    brl_total = 0
+    # Cotações se repetem muito em lotes (uma por data)
+    rate_units = {}
+
+    for usd_amount, rate in items:
+        usd_cents = to_cents(usd_amount, rounding)
+        units = rate_units.get(rate)
+        if units is None:
+            units = rate_units[rate] = rate_to_units(rate)
+
+        count += 1
+        usd_total += usd_cents
+        brl_total += convert_cents(usd_cents, units, rounding)
+
+    return {
+        'count': count,
+        'usd_total': cents_to_decimal(usd_total),
+        'brl_total': cents_to_decimal(brl_total)
+    }
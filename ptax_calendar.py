@@ -0,0 +1,111 @@
+"""
+Calendário de dias úteis para a PTAX
+
+O Banco Central não publica PTAX em fins de semana nem em feriados
+nacionais. Este módulo permite saber, sem consultar o SGS, qual o último dia
+útil em ou antes de uma data.
+
+Feriados considerados (nacionais bancários):
+
+- fixos: 01/01, 21/04, 01/05, 07/09, 12/10, 02/11, 15/11, 20/11 (a partir de
+  2024) e 25/12;
+- móveis: segunda e terça de Carnaval, Sexta-feira Santa e Corpus Christi.
+"""
+
+from datetime import date as date_type, datetime, timedelta
+from functools import lru_cache
+
+
+FIXED_HOLIDAYS = (
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (12, 25),  # Natal
+)
+
+
+def easter(year):
+    """
+    Calcula o domingo de Páscoa (algoritmo de Meeus/Jones/Butcher).
+
+    Args:
+        year (int): Ano
+
+    Returns:
+        date: Domingo de Páscoa
+    """
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date_type(year, month, day + 1)
+
+
+@lru_cache(maxsize=64)
+def holidays(year):
+    """
+    Retorna os feriados bancários nacionais de um ano.
+
+    Args:
+        year (int): Ano
+
+    Returns:
+        frozenset: Datas dos feriados
+    """
+    days = {date_type(year, month, day) for month, day in FIXED_HOLIDAYS}
+
+    # Dia Nacional de Zumbi e da Consciência Negra (Lei nº 14.759/2023)
+    if year >= 2024:
+        days.add(date_type(year, 11, 20))
+
+    easter_sunday = easter(year)
+    days.add(easter_sunday - timedelta(days=48))  # Segunda de Carnaval
+    days.add(easter_sunday - timedelta(days=47))  # Terça de Carnaval
+    days.add(easter_sunday - timedelta(days=2))   # Sexta-feira Santa
+    days.add(easter_sunday + timedelta(days=60))  # Corpus Christi
+
+    return frozenset(days)
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def is_business_day(date):
+    """
+    Verifica se há publicação de PTAX na data.
+
+    Args:
+        date (datetime | date): Data
+
+    Returns:
+        bool: False para sábados, domingos e feriados
+    """
+    day = _as_date(date)
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def latest_business_day(date):
+    """
+    Retorna o último dia útil em ou antes da data.
+
+    Args:
+        date (datetime | date): Data
+
+    Returns:
+        date: Último dia útil
+    """
+    day = _as_date(date)
+    while not is_business_day(day):
+        day -= timedelta(days=1)
+    return day
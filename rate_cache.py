@@ -0,0 +1,668 @@
+"""
+Cache de cotações PTAX para o Gerador de Descrição de Conversão de Moeda
+
+A cotação de uma data já publicada pelo Banco Central não muda mais, então
+cada par (série, data) precisa ser buscado no SGS apenas uma vez. O cache
+possui duas camadas:
+
+- memória: LRU com número máximo de entradas (limita o crescimento de
+  cada worker do gunicorn);
+- armazenamento compartilhado (opcional): arquivo SQLite ou servidor
+  compatível com Redis, visível por todos os workers e que sobrevive a
+  reinícios do processo.
+
+Cotações de datas recentes (hoje e ontem) ainda podem ser revisadas e são
+guardadas com validade limitada; as demais são permanentes. Depois de
+expirar, a última cotação conhecida continua disponível em get_stale, para
+ser usada enquanto o SGS estiver fora do ar. Datas definitivas sem cotação
+(fins de semana e feriados) também são registradas, só em memória, para não
+serem consultadas de novo.
+
+Se o armazenamento compartilhado falhar (Redis ou SQLite fora do ar), o
+erro é registrado no log e o cache continua só com a memória e o SGS.
+
+Um snapshot somente leitura (rate_snapshot) pode ser usado como camada
+adicional, consultada antes do armazenamento compartilhado.
+
+Configuração por variáveis de ambiente:
+
+- PTAX_CACHE_MAX_ENTRIES: máximo de entradas em memória (padrão: 4096)
+- PTAX_CACHE_PATH: caminho do arquivo SQLite (padrão: desabilitado)
+- PTAX_CACHE_REDIS_URL: URL do Redis, ex: redis://localhost:6379/0 (padrão: desabilitado)
+- PTAX_CACHE_RECENT_TTL: validade, em segundos, de cotações recentes (padrão: 3600)
+- PTAX_SNAPSHOT_PATH: caminho de um snapshot de cotações (padrão: desabilitado)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date as date_type, datetime, timedelta
+
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# Código SGS padrão: 1 = Taxa de câmbio - Dólar americano (venda)
+DEFAULT_SERIES = 1
+
+# Validade padrão, em segundos, de cotações que ainda podem ser revisadas
+DEFAULT_RECENT_TTL = 3600
+
+# Datas a partir de hoje - RECENT_DAYS são consideradas recentes
+RECENT_DAYS = 1
+
+
+def date_key(date):
+    """
+    Normaliza uma data para a chave usada no cache (YYYY-MM-DD).
+
+    Args:
+        date (datetime | date | str): Data da cotação
+
+    Returns:
+        str: Data no formato ISO
+    """
+    if isinstance(date, datetime):
+        return date.date().isoformat()
+    if isinstance(date, date_type):
+        return date.isoformat()
+    return str(date)
+
+
+def is_settled(date):
+    """
+    Verifica se a cotação de uma data já é definitiva.
+
+    Cotações de hoje e de ontem (RECENT_DAYS) ainda podem ser publicadas ou
+    revisadas; as anteriores não mudam mais.
+
+    Args:
+        date (datetime | date | str): Data da cotação
+
+    Returns:
+        bool: True se a data for anterior ao período recente
+    """
+    return date_key(date) < (datetime.now() - timedelta(days=RECENT_DAYS)).date().isoformat()
+
+
+def _store_failed(action, error):
+    # logging só é importado quando o armazenamento falha: a importação deste
+    # módulo entra no tempo de partida da CLI
+    import logging
+
+    logging.getLogger(__name__).warning(f"Armazenamento do cache indisponível ({action}): {error}")
+
+
+class SQLiteRateStore:
+    """
+    Armazenamento de cotações em um arquivo SQLite.
+
+    O arquivo pode ser compartilhado por vários processos: o modo WAL permite
+    leituras concorrentes e o SQLite serializa as escritas.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Caminho do arquivo SQLite
+        """
+        import sqlite3
+
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rates ("
+            " series INTEGER NOT NULL,"
+            " date TEXT NOT NULL,"
+            " rate REAL NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (series, date))"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(rates)")]
+        if 'expires_at' not in columns:
+            # Arquivos criados antes da validade por entrada
+            self._db.execute("ALTER TABLE rates ADD COLUMN expires_at REAL")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Args:
+            key (tuple): (série, data ISO)
+
+        Returns:
+            tuple: (cotação, expira_em ou None) ou None se ausente/expirada
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rate, expires_at FROM rates WHERE series = ? AND date = ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (key[0], key[1], time.time())
+            ).fetchone()
+        return row
+
+    def set_many(self, items):
+        """
+        Args:
+            items (list): Tuplas ((série, data ISO), cotação, expira_em ou None)
+        """
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rates (series, date, rate, expires_at) VALUES (?, ?, ?, ?)",
+                [(key[0], key[1], rate, expires_at) for key, rate, expires_at in items]
+            )
+            self._db.commit()
+
+    def items(self):
+        """
+        Returns:
+            list: Tuplas ((série, data ISO), cotação) das cotações permanentes
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT series, date, rate FROM rates WHERE expires_at IS NULL"
+            ).fetchall()
+        return [((series, date), rate) for series, date, rate in rows]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM rates")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RedisRateStore:
+    """
+    Armazenamento de cotações em um servidor compatível com Redis.
+
+    Aceita qualquer cliente com a interface get/set/delete/scan_iter do
+    redis-py (útil para testes com um substituto local).
+    """
+
+    def __init__(self, client, prefix="ptax"):
+        """
+        Args:
+            client: Cliente Redis (ex: redis.Redis.from_url(...))
+            prefix (str): Prefixo das chaves
+        """
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix="ptax"):
+        """
+        Cria o armazenamento a partir de uma URL redis://.
+
+        Requer o pacote redis (pip install redis).
+        """
+        import redis
+
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def _redis_key(self, key):
+        return f"{self.prefix}:{key[0]}:{key[1]}"
+
+    def get(self, key):
+        value = self.client.get(self._redis_key(key))
+        if value is None:
+            return None
+        # A expiração é controlada pelo próprio Redis
+        return float(value), None
+
+    def set_many(self, items):
+        pipeline = self.client.pipeline() if hasattr(self.client, 'pipeline') else self.client
+        for key, rate, expires_at in items:
+            ttl = None if expires_at is None else max(1, int(expires_at - time.time()))
+            pipeline.set(self._redis_key(key), repr(rate), ex=ttl)
+        if pipeline is not self.client:
+            pipeline.execute()
+
+    def items(self):
+        """
+        Returns:
+            list: Tuplas ((série, data ISO), cotação) das chaves sem expiração
+        """
+        items = []
+        ttl = getattr(self.client, 'ttl', None)
+        for redis_key in self.client.scan_iter(f"{self.prefix}:*"):
+            if ttl is not None and ttl(redis_key) > 0:
+                continue
+            value = self.client.get(redis_key)
+            if value is None:
+                continue
+            name = redis_key.decode() if isinstance(redis_key, bytes) else redis_key
+            _, series, date_iso = name.rsplit(":", 2)
+            items.append(((int(series), date_iso), float(value)))
+        return items
+
+    def clear(self):
+        for redis_key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(redis_key)
+
+    def close(self):
+        close = getattr(self.client, 'close', None)
+        if close is not None:
+            close()
+
+
+class RateCache:
+    """
+    Cache de cotações indexado por série SGS e data da cotação.
+
+    Thread-safe: pode ser compartilhado entre as threads de um worker.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None, store=None,
+                 recent_ttl=DEFAULT_RECENT_TTL, snapshot=None):
+        """
+        Args:
+            max_entries (int): Máximo de entradas mantidas em memória
+            path (str): Caminho do arquivo SQLite (opcional)
+            store: Armazenamento compartilhado (opcional, alternativa a path)
+            recent_ttl (float): Validade, em segundos, de cotações recentes
+            snapshot (RateSnapshot): Snapshot somente leitura (opcional)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries deve ser maior que zero")
+
+        self.max_entries = max_entries
+        self.path = path
+        self.recent_ttl = recent_ttl
+        self._memory = OrderedDict()
+        self._stale = OrderedDict()
+        self._missing = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = store
+        if self._store is None and path:
+            self._store = SQLiteRateStore(path)
+        self.snapshot = snapshot
+
+        self.hits = 0
+        self.store_hits = 0
+        self.snapshot_hits = 0
+        self.misses = 0
+
+    def _expires_at(self, date_iso):
+        # Datas recentes ainda podem ser revisadas pelo Banco Central
+        if not is_settled(date_iso):
+            return time.time() + self.recent_ttl
+        return None
+
+    def _remember(self, key, rate, expires_at):
+        # Chamado com o lock adquirido
+        self._memory[key] = (rate, expires_at)
+        self._memory.move_to_end(key)
+        self._stale.pop(key, None)
+        self._missing.pop(key, None)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _expire(self, key, rate):
+        # Chamado com o lock adquirido; guarda a última cotação conhecida
+        del self._memory[key]
+        self._stale[key] = rate
+        self._stale.move_to_end(key)
+        while len(self._stale) > self.max_entries:
+            self._stale.popitem(last=False)
+
+    def _lookup(self, key):
+        # Retorna (cotação, origem) com origem None (memória), "snapshot" ou
+        # "store". O armazenamento é consultado fora do lock (uma consulta
+        # lenta ao Redis não bloqueia as demais threads) e, se falhar, conta
+        # como ausência: a cotação é buscada no SGS
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                rate, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    return rate, None
+                self._expire(key, rate)
+            snapshot = self.snapshot
+            store = self._store
+
+        if snapshot is not None:
+            # Acesso direto ao arquivo mapeado; não precisa ocupar a LRU
+            rate = snapshot.get(key[1], key[0])
+            if rate is not None:
+                return rate, "snapshot"
+
+        if store is not None:
+            try:
+                row = store.get(key)
+            except Exception as e:
+                _store_failed("leitura", e)
+                row = None
+            if row is not None:
+                rate, expires_at = row
+                local_expiry = self._expires_at(key[1])
+                if expires_at is None or (local_expiry is not None and local_expiry < expires_at):
+                    expires_at = local_expiry
+                with self._lock:
+                    self._remember(key, rate, expires_at)
+                return rate, "store"
+
+        return None, None
+
+    def get(self, date, series=DEFAULT_SERIES):
+        """
+        Busca uma cotação no cache.
+
+        Args:
+            date (datetime | date | str): Data da cotação
+            series (int): Código da série SGS
+
+        Returns:
+            float: Cotação ou None se não estiver no cache
+        """
+        key = (series, date_key(date))
+        rate, source = self._lookup(key)
+
+        with self._lock:
+            if rate is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if source == "store":
+                self.store_hits += 1
+            elif source == "snapshot":
+                self.snapshot_hits += 1
+            return rate
+
+    def contains(self, date, series=DEFAULT_SERIES, memory_only=False):
+        """
+        Verifica se uma cotação está no cache, sem alterar os contadores.
+
+        Args:
+            date (datetime | date | str): Data da cotação
+            series (int): Código da série SGS
+            memory_only (bool): Se deve consultar só a memória, sem acessar o
+                snapshot nem o armazenamento (ex: a partir de um event loop)
+
+        Returns:
+            bool: True se a cotação estiver em memória, no snapshot ou no armazenamento
+        """
+        key = (series, date_key(date))
+
+        if memory_only:
+            with self._lock:
+                entry = self._memory.get(key)
+                return entry is not None and (entry[1] is None or entry[1] > time.time())
+        return self._lookup(key)[0] is not None
+
+    def get_stale(self, date, series=DEFAULT_SERIES):
+        """
+        Busca a última cotação conhecida de uma data, mesmo que já expirada.
+
+        Usada apenas quando o SGS não responde; não altera os contadores.
+
+        Args:
+            date (datetime | date | str): Data da cotação
+            series (int): Código da série SGS
+
+        Returns:
+            float: Cotação ou None se a data nunca foi armazenada neste processo
+        """
+        key = (series, date_key(date))
+
+        rate = self._lookup(key)[0]
+        if rate is None:
+            with self._lock:
+                rate = self._stale.get(key)
+        return rate
+
+    def set_missing(self, dates, series=DEFAULT_SERIES):
+        """
+        Registra datas sem cotação publicada (fins de semana e feriados).
+
+        Só datas definitivas (is_settled) são registradas: a cotação de hoje
+        e de ontem ainda pode aparecer.
+
+        Args:
+            dates (iterable): Datas sem cotação
+            series (int): Código da série SGS
+        """
+        keys = [(series, date_key(date)) for date in dates if is_settled(date)]
+
+        with self._lock:
+            for key in keys:
+                self._missing[key] = True
+                self._missing.move_to_end(key)
+            while len(self._missing) > self.max_entries:
+                self._missing.popitem(last=False)
+
+    def is_missing(self, date, series=DEFAULT_SERIES):
+        """
+        Verifica se já se sabe que a data não tem cotação (set_missing).
+
+        Args:
+            date (datetime | date | str): Data da cotação
+            series (int): Código da série SGS
+
+        Returns:
+            bool: True se a data foi registrada como sem cotação
+        """
+        key = (series, date_key(date))
+
+        with self._lock:
+            return key in self._missing
+
+    def set(self, date, rate, series=DEFAULT_SERIES):
+        """
+        Armazena uma cotação no cache.
+
+        Args:
+            date (datetime | date | str): Data da cotação
+            rate (float): Cotação
+            series (int): Código da série SGS
+        """
+        self.set_many({date: rate}, series)
+
+    def set_many(self, rates, series=DEFAULT_SERIES):
+        """
+        Armazena várias cotações de uma vez (uma única escrita no armazenamento).
+
+        Args:
+            rates (dict): Mapeamento data -> cotação
+            series (int): Código da série SGS
+        """
+        items = []
+        for date, rate in rates.items():
+            key = (series, date_key(date))
+            items.append((key, float(rate), self._expires_at(key[1])))
+
+        with self._lock:
+            for key, rate, expires_at in items:
+                self._remember(key, rate, expires_at)
+            store = self._store
+
+        # Fora do lock; sem o armazenamento, a cotação fica só na memória
+        if store is not None and items:
+            try:
+                store.set_many(items)
+            except Exception as e:
+                _store_failed("gravação", e)
+
+    def items(self):
+        """
+        Lista as cotações permanentes conhecidas (snapshot, armazenamento e memória).
+
+        Returns:
+            list: Tuplas ((série, data ISO), cotação)
+        """
+        with self._lock:
+            items = {}
+            if self.snapshot is not None:
+                for series, (first, last) in self.snapshot.series().items():
+                    for quote_date, rate in self.snapshot.range(first, last, series).items():
+                        items[(series, quote_date.isoformat())] = rate
+            if self._store is not None:
+                items.update(self._store.items())
+            for key, (rate, expires_at) in self._memory.items():
+                if expires_at is None:
+                    items[key] = rate
+        return list(items.items())
+
+    def clear(self):
+        """Remove todas as entradas (memória e armazenamento) e zera os contadores."""
+        with self._lock:
+            self._memory.clear()
+            self._stale.clear()
+            self._missing.clear()
+            if self._store is not None:
+                self._store.clear()
+            self.hits = 0
+            self.store_hits = 0
+            self.snapshot_hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Retorna estatísticas de uso do cache.
+
+        Returns:
+            dict: Contadores de acertos/falhas e ocupação da memória
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'snapshot_hits': self.snapshot_hits,
+                'misses': self.misses,
+                'entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'store': type(self._store).__name__ if self._store is not None else None,
+                'snapshot': self.snapshot.path if self.snapshot is not None else None
+            }
+
+    def close(self):
+        """Fecha o armazenamento compartilhado e o snapshot, se houver."""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+            if self.snapshot is not None:
+                self.snapshot.close()
+                self.snapshot = None
+
+
+class _Flight:
+    """Busca em andamento compartilhada por SingleFlight."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas simultâneas com a mesma chave: apenas a primeira executa
+    a função e as demais aguardam e recebem o mesmo resultado (ou exceção).
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        """
+        Executa fn() uma única vez para as chamadas simultâneas de uma chave.
+
+        Args:
+            key: Chave que identifica a busca
+            fn (callable): Função sem argumentos a executar
+
+        Returns:
+            Resultado de fn()
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_rate_cache():
+    """
+    Retorna o cache padrão do processo, criando-o na primeira chamada
+    a partir das variáveis de ambiente.
+
+    Returns:
+        RateCache: Cache compartilhado
+    """
+    global _default_cache
+
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                redis_url = os.environ.get('PTAX_CACHE_REDIS_URL')
+                snapshot_path = os.environ.get('PTAX_SNAPSHOT_PATH')
+                snapshot = None
+                if snapshot_path:
+                    from rate_snapshot import RateSnapshot
+
+                    snapshot = RateSnapshot(snapshot_path)
+                _default_cache = RateCache(
+                    max_entries=int(os.environ.get('PTAX_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                    path=os.environ.get('PTAX_CACHE_PATH') or None,
+                    store=RedisRateStore.from_url(redis_url) if redis_url else None,
+                    recent_ttl=float(os.environ.get('PTAX_CACHE_RECENT_TTL', DEFAULT_RECENT_TTL)),
+                    snapshot=snapshot
+                )
+    return _default_cache
+
+
+def configure_rate_cache(max_entries=DEFAULT_MAX_ENTRIES, path=None, store=None,
+                         recent_ttl=DEFAULT_RECENT_TTL, snapshot=None):
+    """
+    Substitui o cache padrão do processo.
+
+    Args:
+        max_entries (int): Máximo de entradas mantidas em memória
+        path (str): Caminho do arquivo SQLite (opcional)
+        store: Armazenamento compartilhado (opcional, alternativa a path)
+        recent_ttl (float): Validade, em segundos, de cotações recentes
+        snapshot (RateSnapshot): Snapshot somente leitura (opcional)
+
+    Returns:
+        RateCache: Novo cache padrão
+    """
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is not None:
+            _default_cache.close()
+        _default_cache = RateCache(max_entries=max_entries, path=path, store=store,
+                                   recent_ttl=recent_ttl, snapshot=snapshot)
+    return _default_cache
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Pré-carga das cotações PTAX logo após a publicação
+
+O Banco Central publica a PTAX de cada dia útil por volta das 13h (horário de
+Brasília). Sem pré-carga, a primeira requisição depois disso (e a primeira de
+cada worker) paga uma consulta ao SGS. O RatePrefetcher consulta o SGS a
+partir do horário de publicação, repetindo com backoff até a cotação do dia
+aparecer, e grava as cotações recentes no cache; no resto do tempo, renova as
+cotações recentes antes que expirem (PTAX_CACHE_RECENT_TTL).
+
+Pode rodar dentro do processo da API (PTAX_PREFETCH=1) ou como processo
+separado que grava em um cache compartilhado (PTAX_CACHE_PATH ou
+PTAX_CACHE_REDIS_URL), lido por todos os workers:
+
+    python rate_prefetch.py            # roda continuamente
+    python rate_prefetch.py --once     # uma única carga (ex: cron)
+
+Configuração por variáveis de ambiente:
+
+- PTAX_PREFETCH: "1" para iniciar a pré-carga junto com a API (padrão: desabilitado)
+- PTAX_PREFETCH_AT: horário de publicação em Brasília, HH:MM (padrão: 13:10)
+- PTAX_PREFETCH_INTERVAL: intervalo, em segundos, entre renovações; deve ser
+  menor que PTAX_CACHE_RECENT_TTL (padrão: 900)
+- PTAX_PREFETCH_CURRENCIES: moedas separadas por vírgula (padrão: todas)
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, time as dtime, timedelta, timezone
+
+from currencies import CURRENCIES, get_currency
+from invoice_description_generator import FALLBACK_WINDOW_DAYS, get_ptax_rates
+from ptax_calendar import is_business_day, latest_business_day
+
+logger = logging.getLogger(__name__)
+
+# Horário de Brasília (sem horário de verão desde 2019)
+BRASILIA = timezone(timedelta(hours=-3), "BRT")
+
+DEFAULT_PUBLISH_AT = dtime(13, 10)
+DEFAULT_INTERVAL = 900
+
+# Espera entre tentativas enquanto a cotação esperada não aparece, em segundos
+RETRY_MIN = 30
+RETRY_MAX = 600
+
+
+def parse_publish_at(value):
+    """
+    Converte um horário HH:MM.
+
+    Args:
+        value (str): Horário, ex: "13:10"
+
+    Returns:
+        datetime.time: Horário
+
+    Raises:
+        ValueError: Se o formato for inválido
+    """
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"Horário inválido: {value!r}. Use o formato HH:MM (ex: 13:10)")
+
+
+class RatePrefetcher:
+    """
+    Pré-carga periódica das cotações recentes no cache, em uma thread.
+    """
+
+    def __init__(self, currencies=None, publish_at=DEFAULT_PUBLISH_AT, interval=DEFAULT_INTERVAL,
+                 retry_min=RETRY_MIN, retry_max=RETRY_MAX, clock=None):
+        """
+        Args:
+            currencies (iterable): Códigos das moedas (padrão: todas)
+            publish_at (datetime.time): Horário de publicação da PTAX, em Brasília
+            interval (float): Segundos entre renovações das cotações recentes
+            retry_min (float): Primeira espera enquanto a cotação esperada não aparece
+            retry_max (float): Espera máxima entre tentativas
+            clock (callable): Retorna o horário atual com fuso (padrão: agora em Brasília)
+        """
+        self.currencies = tuple(get_currency(code).code for code in (currencies or sorted(CURRENCIES)))
+        self.publish_at = publish_at
+        self.interval = interval
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self._clock = clock or (lambda: datetime.now(BRASILIA))
+
+        self._failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def expected_date(self, now=None):
+        """
+        Última data cuja cotação já deveria estar publicada.
+
+        Args:
+            now (datetime): Horário de referência (padrão: agora)
+
+        Returns:
+            date: Hoje após o horário de publicação, senão o dia útil anterior
+        """
+        now = now or self._clock()
+        today = now.date()
+        if now.time() >= self.publish_at:
+            return latest_business_day(today)
+        return latest_business_day(today - timedelta(days=1))
+
+    def next_publication(self, now=None):
+        """
+        Próximo horário de publicação (em dia útil) depois de now.
+
+        Args:
+            now (datetime): Horário de referência (padrão: agora)
+
+        Returns:
+            datetime: Horário da próxima publicação, no fuso de now
+        """
+        now = now or self._clock()
+        candidate = datetime.combine(now.date(), self.publish_at, tzinfo=now.tzinfo)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        while not is_business_day(candidate.date()):
+            candidate += timedelta(days=1)
+        return candidate
+
+    def run_once(self):
+        """
+        Carrega as cotações recentes de cada moeda (uma consulta por moeda).
+
+        Returns:
+            dict: Código da moeda -> data da cotação mais recente carregada (None se falhou)
+        """
+        today = self._clock().date()
+        end_date = datetime(today.year, today.month, today.day)
+        start_date = end_date - timedelta(days=FALLBACK_WINDOW_DAYS)
+
+        loaded = {}
+        for code in self.currencies:
+            try:
+                rates = get_ptax_rates(start_date, end_date, code)
+                loaded[code] = max(rates) if rates else None
+            except Exception as e:
+                logger.warning(f"Pré-carga de {code} falhou: {str(e)}")
+                loaded[code] = None
+        return loaded
+
+    def next_delay(self, loaded, now=None):
+        """
+        Calcula a espera até a próxima carga.
+
+        Se alguma moeda ainda não tem a cotação esperada (ou a carga falhou),
+        tenta de novo com backoff exponencial; senão, renova no intervalo
+        normal ou no próximo horário de publicação, o que vier primeiro.
+
+        Args:
+            loaded (dict): Resultado de run_once
+            now (datetime): Horário de referência (padrão: agora)
+
+        Returns:
+            float: Segundos até a próxima carga
+        """
+        now = now or self._clock()
+        expected = self.expected_date(now)
+
+        if any(quote_date is None or quote_date < expected for quote_date in loaded.values()):
+            delay = min(self.retry_max, self.retry_min * (2 ** self._failures))
+            self._failures += 1
+            return delay
+
+        self._failures = 0
+        until_publication = (self.next_publication(now) - now).total_seconds()
+        return max(0.0, min(self.interval, until_publication))
+
+    def run_forever(self):
+        """Carrega as cotações até stop() ser chamado."""
+        while not self._stop.is_set():
+            loaded = self.run_once()
+            delay = self.next_delay(loaded)
+            dates = ", ".join(f"{code} {quote_date}" for code, quote_date in loaded.items())
+            logger.info(f"Pré-carga de cotações: {dates}; próxima em {delay:.0f}s")
+            self._stop.wait(delay)
+
+    def start(self):
+        """Inicia a pré-carga em uma thread (sem efeito se já estiver rodando)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="ptax-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Interrompe a pré-carga.
+
+        Args:
+            timeout (float): Segundos para aguardar a thread terminar (opcional)
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_default_prefetcher = None
+_default_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """
+    Retorna a pré-carga padrão do processo, criando-a na primeira chamada
+    a partir das variáveis de ambiente.
+
+    Returns:
+        RatePrefetcher: Pré-carga compartilhada (ainda não iniciada)
+    """
+    global _default_prefetcher
+
+    if _default_prefetcher is None:
+        with _default_prefetcher_lock:
+            if _default_prefetcher is None:
+                currencies = os.environ.get('PTAX_PREFETCH_CURRENCIES')
+                _default_prefetcher = RatePrefetcher(
+                    currencies=currencies.split(",") if currencies else None,
+                    publish_at=parse_publish_at(os.environ.get('PTAX_PREFETCH_AT', '13:10')),
+                    interval=float(os.environ.get('PTAX_PREFETCH_INTERVAL', DEFAULT_INTERVAL))
+                )
+    return _default_prefetcher
+
+
+def configure_prefetcher(**kwargs):
+    """
+    Substitui a pré-carga padrão do processo (a anterior é interrompida).
+
+    Args:
+        **kwargs: Parâmetros de RatePrefetcher
+
+    Returns:
+        RatePrefetcher: Nova pré-carga padrão
+    """
+    global _default_prefetcher
+
+    with _default_prefetcher_lock:
+        if _default_prefetcher is not None:
+            _default_prefetcher.stop()
+        _default_prefetcher = RatePrefetcher(**kwargs)
+    return _default_prefetcher
+
+
+def start_from_env():
+    """
+    Inicia a pré-carga padrão se PTAX_PREFETCH=1.
+
+    Returns:
+        RatePrefetcher: Pré-carga iniciada ou None se desabilitada
+    """
+    if os.environ.get('PTAX_PREFETCH', '') != '1':
+        return None
+    prefetcher = get_prefetcher()
+    prefetcher.start()
+    return prefetcher
+
+
+def main():
+    import argparse
+
+    from rate_cache import get_rate_cache
+
+    parser = argparse.ArgumentParser(
+        description='Pré-carga das cotações PTAX no cache logo após a publicação'
+    )
+    parser.add_argument('--once', action='store_true', help='Faz uma única carga e sai')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if get_rate_cache().stats()['store'] is None:
+        logger.warning("Sem cache compartilhado (PTAX_CACHE_PATH ou PTAX_CACHE_REDIS_URL): "
+                       "as cotações carregadas ficam só neste processo")
+
+    prefetcher = get_prefetcher()
+    if args.once:
+        loaded = prefetcher.run_once()
+        for code, quote_date in loaded.items():
+            print(f"{code}: {quote_date.strftime('%d/%m/%Y') if quote_date else 'falhou'}")
+        return 0 if all(loaded.values()) else 1
+
+    try:
+        prefetcher.run_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+"""
+Snapshot binário de cotações para uso sem acesso ao SGS
+
+O snapshot guarda, para cada série SGS, um vetor de float64 indexado pelo
+ordinal da data (date.toordinal()), com NaN nos dias sem cotação. O arquivo
+é mapeado em memória somente para leitura: abrir o snapshot lê apenas o
+cabeçalho, cada consulta é um acesso direto por índice e as páginas são
+compartilhadas pelo sistema operacional entre todos os workers do gunicorn.
+
+Formato (little-endian):
+
+- cabeçalho: b"PTAXSNAP", versão (uint16), número de séries (uint16), reservado (uint32)
+- diretório, uma entrada por série: série (uint32), ordinal da primeira data
+  (uint32), número de dias (uint32), reservado (uint32), deslocamento dos dados (uint64)
+- dados: um vetor de float64 por série, alinhado em 8 bytes
+
+Configuração por variáveis de ambiente:
+
+- PTAX_SNAPSHOT_PATH: caminho do snapshot usado pelo cache padrão (padrão: desabilitado)
+
+Exemplo:
+
+    from rate_snapshot import RateSnapshot, export_snapshot
+
+    export_snapshot("ptax.snap", get_rate_cache())
+    RateSnapshot("ptax.snap").get(datetime(2025, 8, 6))   # 5.4802
+"""
+
+import math
+import mmap
+import os
+import struct
+from datetime import date as date_type
+
+from rate_cache import DEFAULT_SERIES, is_settled
+
+
+MAGIC = b"PTAXSNAP"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHHI")
+_ENTRY = struct.Struct("<IIIIQ")
+_RATE = struct.Struct("<d")
+
+
+def _ordinal(date):
+    # Aceita datetime, date ou texto ISO (chave do cache)
+    if isinstance(date, date_type):
+        return date.toordinal()
+    return date_type.fromisoformat(date).toordinal()
+
+
+class RateSnapshot:
+    """
+    Snapshot de cotações mapeado em memória (somente leitura).
+
+    Thread-safe: o mapeamento nunca é alterado depois de aberto.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Caminho do arquivo de snapshot
+
+        Raises:
+            ValueError: Se o arquivo não for um snapshot válido
+        """
+        self.path = path
+        with open(path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"Snapshot inválido: {path}")
+        magic, version, count, _ = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Snapshot inválido ou de versão não suportada: {path}")
+
+        # Só o diretório é lido na abertura; os dados ficam no mapeamento
+        self._series = {}
+        for index in range(count):
+            series, first, days, _, offset = _ENTRY.unpack_from(self._mmap, _HEADER.size + index * _ENTRY.size)
+            self._series[series] = (first, days, offset)
+
+    def get(self, date, series=DEFAULT_SERIES):
+        """
+        Busca a cotação de uma data.
+
+        Args:
+            date (datetime | date | str): Data da cotação
+            series (int): Código da série SGS
+
+        Returns:
+            float: Cotação ou None se a data não tiver cotação no snapshot
+        """
+        entry = self._series.get(series)
+        if entry is None:
+            return None
+
+        first, days, offset = entry
+        index = _ordinal(date) - first
+        if not 0 <= index < days:
+            return None
+
+        rate, = _RATE.unpack_from(self._mmap, offset + index * _RATE.size)
+        return None if rate != rate else rate
+
+    def covers(self, date, series=DEFAULT_SERIES):
+        """
+        Verifica se a data está dentro do período do snapshot.
+
+        Returns:
+            bool: True se o snapshot inclui a data (com ou sem cotação)
+        """
+        entry = self._series.get(series)
+        return entry is not None and 0 <= _ordinal(date) - entry[0] < entry[1]
+
+    def range(self, start_date, end_date, series=DEFAULT_SERIES):
+        """
+        Retorna as cotações de um intervalo (inclusive).
+
+        Args:
+            start_date (datetime | date): Data inicial
+            end_date (datetime | date): Data final
+            series (int): Código da série SGS
+
+        Returns:
+            dict: Mapeamento date -> cotação, em ordem cronológica
+        """
+        entry = self._series.get(series)
+        if entry is None:
+            return {}
+
+        first, days, offset = entry
+        start = max(_ordinal(start_date) - first, 0)
+        end = min(_ordinal(end_date) - first, days - 1)
+
+        rates = {}
+        for index in range(start, end + 1):
+            rate, = _RATE.unpack_from(self._mmap, offset + index * _RATE.size)
+            if rate == rate:
+                rates[date_type.fromordinal(first + index)] = rate
+        return rates
+
+    def series(self):
+        """
+        Returns:
+            dict: Mapeamento série -> (primeira data, última data)
+        """
+        return {
+            series: (date_type.fromordinal(first), date_type.fromordinal(first + days - 1))
+            for series, (first, days, _) in self._series.items()
+        }
+
+    def close(self):
+        """Desfaz o mapeamento do arquivo."""
+        self._mmap.close()
+
+
+def write_snapshot(path, rates_by_series):
+    """
+    Grava um snapshot de cotações.
+
+    O arquivo é escrito ao lado do destino e renomeado no final: processos
+    que já mapearam o snapshot anterior continuam lendo a versão antiga.
+
+    Args:
+        path (str): Caminho do arquivo de snapshot
+        rates_by_series (dict): Mapeamento série -> {data -> cotação}
+
+    Returns:
+        int: Número de cotações gravadas
+    """
+    columns = []
+    for series, rates in sorted(rates_by_series.items()):
+        ordinals = {_ordinal(date): float(rate) for date, rate in rates.items()}
+        if not ordinals:
+            continue
+        first = min(ordinals)
+        column = [math.nan] * (max(ordinals) - first + 1)
+        for ordinal, rate in ordinals.items():
+            column[ordinal - first] = rate
+        columns.append((series, first, column, len(ordinals)))
+
+    offset = _HEADER.size + _ENTRY.size * len(columns)
+    offset += -offset % _RATE.size
+    header = bytearray(offset)
+    _HEADER.pack_into(header, 0, MAGIC, VERSION, len(columns), 0)
+
+    for index, (series, first, column, _) in enumerate(columns):
+        _ENTRY.pack_into(header, _HEADER.size + index * _ENTRY.size, series, first, len(column), 0, offset)
+        offset += len(column) * _RATE.size
+
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".ptax-snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header)
+            for _, _, column, _ in columns:
+                fh.write(struct.pack(f"<{len(column)}d", *column))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return sum(count for _, _, _, count in columns)
+
+
+def export_snapshot(path, cache, extra=None):
+    """
+    Grava em um snapshot as cotações definitivas de um cache.
+
+    Args:
+        path (str): Caminho do arquivo de snapshot
+        cache (RateCache): Cache de origem (memória, armazenamento e snapshot atual)
+        extra (dict): Cotações adicionais, série -> {data -> cotação} (opcional);
+            as de datas recentes, que ainda podem ser revisadas, são ignoradas
+
+    Returns:
+        int: Número de cotações gravadas
+    """
+    rates_by_series = {}
+    for (series, date_iso), rate in cache.items():
+        rates_by_series.setdefault(series, {})[date_iso] = rate
+    for series, rates in (extra or {}).items():
+        target = rates_by_series.setdefault(series, {})
+        for date, rate in rates.items():
+            if is_settled(date):
+                target[date_type.fromordinal(_ordinal(date)).isoformat()] = rate
+    return write_snapshot(path, rates_by_series)
@@ -42,6 +42,15 @@ setup(
             "black>=21.0",
             "flake8>=3.8",
         ],
+        "redis": [
+            "redis>=4.0",
+        ],
+        "numpy": [
+            "numpy>=1.20",
+        ],
+        "asgi": [
+            "uvicorn>=0.20",
+        ],
     },
     entry_points={
         "console_scripts": [
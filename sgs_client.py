@@ -0,0 +1,327 @@
+"""
+Cliente HTTP do SGS para o Gerador de Descrição de Conversão de Moeda
+
+Mantém uma única requests.Session por processo, com pool de conexões
+keep-alive para api.bcb.gov.br, e repete requisições que falham por motivos
+transitórios (conexão, timeout, 429 e 5xx) com backoff exponencial e jitter,
+respeitando um prazo total por chamada.
+
+Um disjuntor (CircuitBreaker) abre depois de várias falhas seguidas do SGS:
+enquanto estiver aberto, as chamadas falham na hora (SGSUnavailableError),
+sem ocupar o worker pelo timeout inteiro. Depois de SGS_BREAKER_RESET
+segundos, uma única chamada de teste decide se ele fecha ou volta a abrir.
+
+Configuração por variáveis de ambiente:
+
+- SGS_POOL_SIZE: conexões mantidas no pool (padrão: 10)
+- SGS_MAX_RETRIES: novas tentativas após a primeira falha (padrão: 3)
+- SGS_BACKOFF: espera base entre tentativas, em segundos (padrão: 0.5)
+- SGS_TIMEOUT: timeout de cada tentativa, em segundos (padrão: 10)
+- SGS_DEADLINE: prazo total da chamada, em segundos (padrão: 20)
+- SGS_BREAKER_THRESHOLD: falhas seguidas que abrem o disjuntor (padrão: 5; 0 desabilita)
+- SGS_BREAKER_RESET: tempo, em segundos, até a chamada de teste (padrão: 30)
+- SGS_OFFLINE: "1" para nunca acessar a rede (padrão: desabilitado), usado
+  com um snapshot de cotações (PTAX_SNAPSHOT_PATH)
+
+O requests só é importado na primeira requisição: processos que respondem
+apenas com o cache não pagam o custo de importação.
+"""
+
+import os
+import random
+import threading
+import time
+
+from metrics import get_metrics
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Status HTTP considerados transitórios
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Espera máxima entre duas tentativas, em segundos
+MAX_BACKOFF = 8.0
+
+
+class SGSOfflineError(RuntimeError):
+    """O cliente está em modo offline e não acessa o SGS."""
+
+
+class SGSUnavailableError(RuntimeError):
+    """O disjuntor está aberto: o SGS falhou seguidamente e não é consultado."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de falhas consecutivas.
+
+    Fechado: todas as chamadas passam. Aberto (após failure_threshold falhas
+    seguidas): nenhuma passa até reset_timeout segundos. Meio aberto: passa
+    uma única chamada de teste; sucesso fecha o disjuntor e falha o reabre.
+
+    Thread-safe: compartilhado por todas as threads do cliente.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """
+        Args:
+            failure_threshold (int): Falhas seguidas que abrem o disjuntor (0 desabilita)
+            reset_timeout (float): Segundos aberto antes da chamada de teste
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """Estado atual: CLOSED, OPEN ou HALF_OPEN."""
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return self.OPEN
+            return self.HALF_OPEN
+
+    def allow(self):
+        """
+        Verifica se uma chamada pode ser feita agora.
+
+        Returns:
+            bool: True se o disjuntor estiver fechado ou esta for a chamada de teste
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+
+            # Uma chamada de teste por vez; uma que nunca terminou é substituída
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = now
+            return True
+
+    def retry_after(self):
+        """
+        Returns:
+            float: Segundos até a próxima chamada de teste (0 se fechado ou já permitida)
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        """Registra uma resposta do SGS (fecha o disjuntor)."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        """Registra uma falha transitória (conexão, timeout, 429 ou 5xx)."""
+        with self._lock:
+            self._failures += 1
+            if self._probe_started is not None or (
+                self.failure_threshold and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+
+class SGSClient:
+    """
+    Cliente HTTP com pool de conexões e novas tentativas para o SGS.
+
+    Thread-safe: a sessão é criada uma única vez e compartilhada.
+    """
+
+    def __init__(self, pool_size=10, max_retries=3, backoff=0.5, timeout=10, deadline=20, offline=False,
+                 breaker_threshold=5, breaker_reset=30):
+        """
+        Args:
+            pool_size (int): Conexões mantidas no pool
+            max_retries (int): Novas tentativas após a primeira falha
+            backoff (float): Espera base entre tentativas, em segundos
+            timeout (float): Timeout de cada tentativa, em segundos
+            deadline (float): Prazo total da chamada, em segundos
+            offline (bool): Se True, nenhuma requisição é feita
+            breaker_threshold (int): Falhas seguidas que abrem o disjuntor (0 desabilita)
+            breaker_reset (float): Segundos com o disjuntor aberto antes da chamada de teste
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.deadline = deadline
+        self.offline = offline
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """requests.Session compartilhada, criada na primeira utilização."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['User-Agent'] = USER_AGENT
+                    self._session = session
+        return self._session
+
+    def _sleep_before_retry(self, attempt, remaining):
+        # Backoff exponencial com "full jitter"; False se não couber no prazo
+        delay = random.uniform(0, min(MAX_BACKOFF, self.backoff * (2 ** attempt)))
+        if delay >= remaining:
+            return False
+        time.sleep(delay)
+        return True
+
+    def get_json(self, url, params=None):
+        """
+        Faz um GET e retorna o JSON decodificado, repetindo falhas transitórias.
+
+        Args:
+            url (str): URL da requisição
+            params (dict): Parâmetros da consulta
+
+        Returns:
+            list | dict: JSON retornado
+
+        Raises:
+            requests.RequestException: Se todas as tentativas falharem ou o prazo acabar
+            SGSOfflineError: Se o cliente estiver em modo offline
+            SGSUnavailableError: Se o disjuntor estiver aberto
+        """
+        if self.offline:
+            raise SGSOfflineError(f"Modo offline: {url} não foi consultado")
+
+        import requests
+
+        metrics = get_metrics()
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if not self.breaker.allow():
+                metrics.count_sgs_failure('circuit_open')
+                raise SGSUnavailableError(
+                    f"SGS indisponível (disjuntor aberto, nova tentativa em {self.breaker.retry_after():.0f}s): {url}"
+                )
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=min(self.timeout, remaining))
+                if response.status_code not in RETRY_STATUSES:
+                    try:
+                        response.raise_for_status()
+                    except requests.HTTPError:
+                        # O SGS respondeu: 404 é a resposta para consultas sem dados
+                        self.breaker.record_success()
+                        outcome = 'not_found' if response.status_code == 404 else 'http_error'
+                        metrics.observe_sgs_request(outcome, time.perf_counter() - started)
+                        if outcome == 'http_error':
+                            metrics.count_sgs_failure(outcome)
+                        raise
+                    self.breaker.record_success()
+                    metrics.observe_sgs_request('ok', time.perf_counter() - started)
+                    return response.json()
+                reason = 'server_error'
+                last_error = requests.HTTPError(
+                    f"{response.status_code} Server Error for url: {response.url}", response=response
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = 'timeout' if isinstance(e, requests.Timeout) else 'connection_error'
+                last_error = e
+            self.breaker.record_failure()
+            metrics.observe_sgs_request(reason, time.perf_counter() - started)
+
+            if attempt == self.max_retries:
+                break
+            if not self._sleep_before_retry(attempt, deadline - time.monotonic()):
+                break
+
+        if last_error is None:
+            reason = 'deadline'
+            last_error = requests.Timeout(f"Prazo de {self.deadline}s esgotado para {url}")
+        metrics.count_sgs_failure(reason)
+        raise last_error
+
+    def close(self):
+        """Fecha as conexões do pool."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_sgs_client():
+    """
+    Retorna o cliente padrão do processo, criando-o na primeira chamada
+    a partir das variáveis de ambiente.
+
+    Returns:
+        SGSClient: Cliente compartilhado
+    """
+    global _default_client
+
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = SGSClient(
+                    pool_size=int(os.environ.get('SGS_POOL_SIZE', 10)),
+                    max_retries=int(os.environ.get('SGS_MAX_RETRIES', 3)),
+                    backoff=float(os.environ.get('SGS_BACKOFF', 0.5)),
+                    timeout=float(os.environ.get('SGS_TIMEOUT', 10)),
+                    deadline=float(os.environ.get('SGS_DEADLINE', 20)),
+                    offline=os.environ.get('SGS_OFFLINE', '') == '1',
+                    breaker_threshold=int(os.environ.get('SGS_BREAKER_THRESHOLD', 5)),
+                    breaker_reset=float(os.environ.get('SGS_BREAKER_RESET', 30))
+                )
+    return _default_client
+
+
+def configure_sgs_client(**kwargs):
+    """
+    Substitui o cliente padrão do processo.
+
+    Args:
+        **kwargs: Parâmetros de SGSClient
+
+    Returns:
+        SGSClient: Novo cliente padrão
+    """
+    global _default_client
+
+    with _default_client_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = SGSClient(**kwargs)
+    return _default_client
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Testes da API Flask sem acesso à rede (SGS simulado)
+"""
+
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import requests
+
+import rate_cache
+import sgs_client
+from api import app
+from api_core import ResponseCache, configure_response_cache, etag_matches, get_response_cache
+
+
+def fake_sgs_response(valor):
+    """Cria uma resposta falsa do SGS com um único valor."""
+    response = mock.Mock()
+    response.json.return_value = [{'data': '06/08/2025', 'valor': valor}]
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestConvertEndpoint(unittest.TestCase):
+    """Testes para POST /api/convert."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_single_upstream_fetch(self, mock_get):
+        """Testa que uma conversão faz uma única busca no SGS."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        response = self.client.post('/api/convert', json={
+            'usd_amount': 6774.00,
+            'date': '07082025',
+            'show_url': True
+        })
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(body['data']['rate'], 5.4802)
+        self.assertEqual(body['data']['date'], '06/08/2025')
+        self.assertEqual(body['data']['brl_amount'], 37122.87)
+        self.assertIn('source_url', body['data'])
+        self.assertIn('R$ 37.122,87', body['text'])
+
+    @mock.patch("requests.Session.get")
+    def test_exact_mode(self, mock_get):
+        """Testa o cálculo em centavos exatos."""
+        mock_get.return_value = fake_sgs_response("1.0000")
+
+        # round(2.675, 2) em float resulta em 2.67
+        response = self.client.post('/api/convert', json={
+            'usd_amount': 2.675,
+            'date': '07082025',
+            'exact': True
+        })
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['data']['brl_amount'], 2.68)
+        self.assertIn('(USD 2,68)', body['text'])
+        self.assertIn('R$ 2,68.', body['text'])
+
+    @mock.patch("requests.Session.get")
+    def test_template_selection(self, mock_get):
+        """Testa a escolha do modelo do texto."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        response = self.client.post('/api/convert', json={
+            'usd_amount': 1000.00,
+            'date': '07082025',
+            'template': 'en'
+        })
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(body['text'].startswith('Amount received in foreign currency (USD 1.000,00)'))
+
+    @mock.patch("requests.Session.get")
+    def test_currency(self, mock_get):
+        """Testa a conversão de outra moeda pela série correspondente."""
+        mock_get.return_value = fake_sgs_response("6.3850")
+
+        response = self.client.post('/api/convert', json={
+            'usd_amount': 1000.00,
+            'date': '07082025',
+            'currency': 'EUR'
+        })
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['data']['currency'], 'EUR')
+        self.assertEqual(body['data']['brl_amount'], 6385.0)
+        self.assertIn('bcdata.sgs.21619', mock_get.call_args[0][0])
+
+    def test_unknown_currency(self):
+        """Testa que uma moeda não suportada é rejeitada."""
+        response = self.client.post('/api/convert', json={'usd_amount': 100, 'currency': 'JPY'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_template(self):
+        """Testa que um modelo desconhecido é rejeitado antes da busca."""
+        response = self.client.post('/api/convert', json={'usd_amount': 100, 'template': 'xx'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('padrao', response.get_json()['error'])
+
+    def test_invalid_amount(self):
+        """Testa a validação de valor negativo."""
+        response = self.client.post('/api/convert', json={'usd_amount': -100})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestRateEndpoint(unittest.TestCase):
+    """Testes para GET /api/rate e seus cabeçalhos de cache."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_settled_date(self, mock_get):
+        """Testa ETag e Cache-Control longo para uma data definitiva."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        response = self.client.get('/api/rate?date=07082025')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], '"USD-20250806-5.4802"')
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.get_json()['data']['rate'], 5.4802)
+
+    @mock.patch("requests.Session.get")
+    def test_recent_date(self, mock_get):
+        """Testa o Cache-Control curto para a cotação de ontem (padrão)."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        response = self.client.get('/api/rate')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=300')
+
+    @mock.patch("requests.Session.get")
+    def test_not_modified(self, mock_get):
+        """Testa o 304 com If-None-Match e a resposta servida do cache."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        etag = self.client.get('/api/rate?date=07082025').headers['ETag']
+        response = self.client.get('/api/rate?date=07082025', headers={'If-None-Match': f'W/{etag}'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b"")
+        self.assertEqual(response.headers['ETag'], etag)
+
+        response = self.client.get('/api/rate?date=07082025', headers={'If-None-Match': '"outro"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch("invoice_description_generator._schedule_refresh")
+    @mock.patch("requests.Session.get")
+    def test_stale_rate(self, mock_get, mock_refresh):
+        """Testa a cotação antiga, sem cache HTTP, quando o SGS está fora do ar."""
+        rate_cache.get_rate_cache().set(datetime(2025, 8, 6), 5.4802)
+        mock_get.side_effect = requests.ConnectionError("fora do ar")
+        sgs_client.configure_sgs_client(max_retries=0)
+        try:
+            response = self.client.get('/api/rate?date=08082025')
+        finally:
+            sgs_client.configure_sgs_client()
+
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(body['data']['stale'])
+        self.assertEqual(body['data']['date'], '06/08/2025')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(get_response_cache().stats()['entries'], 0)
+        self.assertEqual(response.headers['ETag'], '"USD-20250806-5.4802-stale"')
+
+    def test_etag_matches(self):
+        """Testa a comparação do If-None-Match."""
+        self.assertTrue(etag_matches('"a", "b"', '"b"'))
+        self.assertTrue(etag_matches('*', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+
+    def test_response_cache_expiry(self):
+        """Testa a validade e o limite de entradas do cache de respostas."""
+        cache = ResponseCache(max_entries=2)
+        cache.set('a', mock.Mock(expires_at=None))
+        cache.set('b', mock.Mock(expires_at=0))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+
+        cache.set('c', mock.Mock(expires_at=None))
+        cache.set('d', mock.Mock(expires_at=None))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+
+class TestConvertBatchEndpoint(unittest.TestCase):
+    """Testes para POST /api/convert/batch."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_groups_by_date(self, mock_get):
+        """Testa que datas repetidas são resolvidas com uma única consulta."""
+        response = mock.Mock()
+        response.json.return_value = [
+            {'data': '05/08/2025', 'valor': '5.5162'},
+            {'data': '06/08/2025', 'valor': '5.4802'},
+        ]
+        mock_get.return_value = response
+
+        items = [{'usd_amount': 100.0 + i, 'date': '07082025'} for i in range(50)]
+        items.append({'usd_amount': 10.0, 'date': '06082025'})
+
+        result = self.client.post('/api/convert/batch', json={'items': items})
+        body = result.get_json()
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(body['summary']['total'], 51)
+        self.assertEqual(body['summary']['succeeded'], 51)
+        self.assertEqual(body['summary']['usd_total'], 6235.0)
+        # 50 itens de 100 a 149 USD a 5,4802 + 10 USD a 5,5162 (soma dos valores exibidos)
+        self.assertEqual(body['summary']['brl_total'], 34169.40)
+        self.assertEqual(body['summary']['brl_total'],
+                         round(sum(r['data']['brl_amount'] for r in body['results']), 2))
+        self.assertEqual(body['results'][0]['data']['rate'], 5.4802)
+        self.assertEqual(body['results'][-1]['data']['date'], '05/08/2025')
+
+    @mock.patch("requests.Session.get")
+    def test_groups_by_currency(self, mock_get):
+        """Testa uma consulta por moeda em lotes com várias moedas."""
+        mock_get.return_value = fake_sgs_response("5.0000")
+
+        result = self.client.post('/api/convert/batch', json={
+            'items': [
+                {'usd_amount': 10.0, 'date': '07082025'},
+                {'usd_amount': 20.0, 'date': '07082025', 'currency': 'EUR'},
+                {'usd_amount': 30.0, 'date': '07082025', 'currency': 'EUR'},
+                {'usd_amount': 40.0, 'currency': 'XYZ'},
+            ]
+        })
+        body = result.get_json()
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(body['summary']['succeeded'], 3)
+        self.assertEqual(body['summary']['usd_total'], 10.0)
+        self.assertEqual(body['summary']['brl_total'], 300.0)
+        self.assertEqual(body['summary']['currency_totals'], {'USD': 10.0, 'EUR': 50.0})
+        self.assertEqual(body['results'][1]['data']['currency'], 'EUR')
+        self.assertFalse(body['results'][3]['success'])
+
+    @mock.patch("requests.Session.get")
+    def test_per_item_errors(self, mock_get):
+        """Testa que itens inválidos não impedem a conversão dos demais."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        result = self.client.post('/api/convert/batch', json=[
+            {'usd_amount': 6774.00, 'date': '07082025'},
+            {'usd_amount': -1},
+            {'usd_amount': 10.0, 'date': '123'},
+        ])
+        body = result.get_json()
+
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(body['results'][0]['success'])
+        self.assertFalse(body['results'][1]['success'])
+        self.assertIn('DDMMYYYY', body['results'][2]['error'])
+        self.assertEqual(body['summary']['failed'], 2)
+
+    @mock.patch("requests.Session.get")
+    def test_total_matches_items(self, mock_get):
+        """Testa que brl_total é a soma dos valores exibidos nos itens."""
+        mock_get.return_value = fake_sgs_response("1.0000")
+
+        # round(2.675, 2) em float resulta em 2.67; em centavos exatos, 2.68
+        items = [{'usd_amount': 2.675, 'date': '07082025'}, {'usd_amount': 2.675, 'date': '07082025'}]
+
+        body = self.client.post('/api/convert/batch', json={'items': items}).get_json()
+        self.assertEqual([r['data']['brl_amount'] for r in body['results']], [2.67, 2.67])
+        self.assertEqual(body['summary']['brl_total'], 5.34)
+
+        body = self.client.post('/api/convert/batch', json={'items': items, 'exact': True}).get_json()
+        self.assertEqual([r['data']['brl_amount'] for r in body['results']], [2.68, 2.68])
+        self.assertEqual(body['summary']['brl_total'], 5.36)
+
+    def test_empty_batch(self):
+        """Testa a rejeição de lote vazio."""
+        result = self.client.post('/api/convert/batch', json={'items': []})
+        self.assertEqual(result.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
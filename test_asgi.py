@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Testes da aplicação ASGI (mesmas respostas da API Flask, SGS simulado)
+"""
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import rate_cache
+from api_core import JSON_MIMETYPE, configure_response_cache
+from api import app as flask_app
+from asgi import ASGIApp
+
+
+def fake_sgs_response(valor):
+    """Cria uma resposta falsa do SGS com um único valor."""
+    response = mock.Mock()
+    response.status_code = 200
+    response.json.return_value = [{'data': '06/08/2025', 'valor': valor}]
+    response.raise_for_status.return_value = None
+    return response
+
+
+def encode_body(body):
+    """Corpo da requisição: bytes são enviados como estão, o resto como JSON."""
+    if body is None:
+        return b""
+    return body if isinstance(body, bytes) else json.dumps(body).encode()
+
+
+async def call(app, method, path, body=None, query=b"", headers=(), content_type=JSON_MIMETYPE):
+    """Executa uma requisição na aplicação ASGI e retorna (status, cabeçalhos, corpo)."""
+    payload = encode_body(body)
+    if body is not None and content_type:
+        headers = [(b"content-type", content_type.encode())] + list(headers)
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': list(headers)}
+    await app(scope, receive, send)
+
+    start, content = sent
+    return start['status'], dict(start['headers']), content['body']
+
+
+def request(app, *args, **kwargs):
+    return asyncio.run(call(app, *args, **kwargs))
+
+
+class TestSameResponses(unittest.TestCase):
+    """Testes que comparam as respostas da aplicação ASGI com as da API Flask."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+        self.app = ASGIApp()
+        self.client = flask_app.test_client()
+
+    def tearDown(self):
+        self.app.close()
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+
+    def assertSameJSON(self, method, path, body=None, query="", content_type=JSON_MIMETYPE):
+        status, headers, content = request(self.app, method, path, body, query.encode(),
+                                           content_type=content_type)
+        url = f"{path}?{query}" if query else path
+        if body is None:
+            flask_response = self.client.open(url, method=method)
+        else:
+            flask_response = self.client.open(url, method=method, data=encode_body(body),
+                                              content_type=content_type)
+
+        self.assertEqual(status, flask_response.status_code)
+        self.assertEqual(headers[b"content-type"], b"application/json")
+        self.assertEqual(json.loads(content), flask_response.get_json())
+        return json.loads(content)
+
+    def test_health_and_info(self):
+        """Testa /health e /api/info."""
+        self.assertSameJSON('GET', '/health')
+        self.assertSameJSON('GET', '/api/info')
+
+    @mock.patch("requests.Session.get")
+    def test_convert(self, mock_get):
+        """Testa POST /api/convert, inclusive com URL e centavos exatos."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        body = self.assertSameJSON('POST', '/api/convert', {
+            'usd_amount': 6774.00, 'date': '07082025', 'show_url': True, 'exact': True
+        })
+        self.assertEqual(body['data']['brl_amount'], 37122.87)
+        self.assertSameJSON('POST', '/api/convert', {'usd_amount': -1})
+        self.assertSameJSON('POST', '/api/convert', {'usd_amount': 1, 'date': '31022025'})
+
+    @mock.patch("requests.Session.get")
+    def test_rate(self, mock_get):
+        """Testa GET /api/rate."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        self.assertSameJSON('GET', '/api/rate', query="date=07082025")
+        self.assertSameJSON('GET', '/api/rate', query="currency=XYZ")
+
+    @mock.patch("requests.Session.get")
+    def test_batch(self, mock_get):
+        """Testa POST /api/convert/batch com itens válidos e inválidos."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        body = self.assertSameJSON('POST', '/api/convert/batch', {'items': [
+            {'usd_amount': 6774.00, 'date': '07082025'},
+            {'usd_amount': 1000.00, 'date': '07082025'},
+            {'usd_amount': 'abc'},
+        ]})
+        self.assertEqual(body['summary']['succeeded'], 2)
+        self.assertSameJSON('POST', '/api/convert/batch', {'items': []})
+
+    def test_invalid_body(self):
+        """Testa corpo JSON malformado e Content-Type que não é JSON."""
+        for path, error in (('/api/convert', 'Dados não fornecidos'),
+                            ('/api/convert/batch', 'items deve ser uma lista não vazia')):
+            for body, content_type in ((b"{nao e json", JSON_MIMETYPE), ({'usd_amount': 10}, 'text/plain'),
+                                       ({'usd_amount': 10}, None)):
+                response = self.assertSameJSON('POST', path, body, content_type=content_type)
+                self.assertEqual(response['error'], error)
+
+class TestASGIApp(unittest.TestCase):
+    """Testes específicos da aplicação ASGI."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+        self.app = ASGIApp(concurrency=4)
+
+    def tearDown(self):
+        self.app.close()
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+
+    def test_not_found_and_method(self):
+        """Testa rotas inexistentes e métodos não suportados."""
+        status, _, content = request(self.app, 'GET', '/nao/existe')
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(content)['error'], 'Endpoint não encontrado')
+
+        status, _, _ = request(self.app, 'GET', '/api/convert')
+        self.assertEqual(status, 405)
+
+    def test_cors_preflight(self):
+        """Testa a resposta ao preflight de CORS."""
+        status, headers, _ = request(self.app, 'OPTIONS', '/api/convert',
+                                     headers=[(b"access-control-request-headers", b"content-type")])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b"access-control-allow-origin"], b"*")
+        self.assertEqual(headers[b"access-control-allow-headers"], b"content-type")
+
+    def test_invalid_json(self):
+        """Testa que um corpo inválido é tratado como dados não fornecidos."""
+        async def scenario():
+            messages = [{'type': 'http.request', 'body': b"{nao e json", 'more_body': False}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message)
+
+            await self.app({'type': 'http', 'method': 'POST', 'path': '/api/convert'}, receive, send)
+            return sent
+
+        sent = asyncio.run(scenario())
+        self.assertEqual(sent[0]['status'], 400)
+        self.assertEqual(json.loads(sent[1]['body'])['error'], 'Dados não fornecidos')
+
+    def test_many_requests_in_flight(self):
+        """Testa centenas de conversões simultâneas com uma única busca lenta ao SGS."""
+        calls = []
+        lock = threading.Lock()
+
+        def slow_rate(date, fallback=False, currency="USD"):
+            with lock:
+                calls.append(date)
+            time.sleep(0.2)
+            return 5.4802, date.strftime("%d/%m/%Y"), "https://example"
+
+        async def scenario():
+            return await asyncio.gather(*(
+                call(self.app, 'POST', '/api/convert', {'usd_amount': 10.0 + i, 'date': '07082025'})
+                for i in range(300)
+            ))
+
+        with mock.patch("async_rates.get_ptax_rate", slow_rate):
+            start = time.perf_counter()
+            responses = asyncio.run(scenario())
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(status == 200 for status, _, _ in responses))
+        self.assertLess(elapsed, 2.0)
+
+    @mock.patch("requests.Session.get")
+    def test_rate_conditional_get(self, mock_get):
+        """Testa ETag, Cache-Control e 304 em GET /api/rate."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        status, headers, content = request(self.app, 'GET', '/api/rate', query=b"date=07082025")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b"etag"], b'"USD-20250806-5.4802"')
+        self.assertIn(b"immutable", headers[b"cache-control"])
+
+        status, headers, content = request(self.app, 'GET', '/api/rate', query=b"date=07082025",
+                                           headers=[(b"if-none-match", b'"USD-20250806-5.4802"')])
+        self.assertEqual(status, 304)
+        self.assertEqual(content, b"")
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_lifespan(self):
+        """Testa a criação e o encerramento do pool no ciclo de vida do servidor."""
+        async def scenario():
+            messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await self.app({'type': 'lifespan'}, receive, send)
+            return sent
+
+        self.assertEqual(asyncio.run(scenario()),
+                         ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.assertIsNone(self.app._engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
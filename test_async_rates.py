@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Testes para a busca assíncrona de cotações
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import rate_cache
+from async_rates import AsyncRateEngine, get_rates
+
+
+class SlowFetcher:
+    """Substituto de get_ptax_rate com latência fixa."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, date, fallback=False, currency="USD"):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return 5.0 + date.day / 100, date.strftime("%d/%m/%Y"), "https://example"
+
+
+class TestAsyncRateEngine(unittest.TestCase):
+    """Testes para AsyncRateEngine."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+
+    def test_dates_are_fetched_concurrently(self):
+        """Testa que 20 datas levam bem menos que a soma das latências."""
+        fetcher = SlowFetcher(delay=0.1)
+        dates = [datetime(2025, 1, 1) + timedelta(days=i) for i in range(20)]
+
+        with mock.patch("async_rates.get_ptax_rate", fetcher):
+            start = time.perf_counter()
+            rates = asyncio.run(get_rates(dates, concurrency=20))
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(rates), 20)
+        self.assertEqual(rates["2025-01-05"][0], 5.05)
+        self.assertLess(elapsed, 1.0)
+
+    def test_concurrent_requests_are_coalesced(self):
+        """Testa que pedidos simultâneos da mesma data fazem uma única busca."""
+        fetcher = SlowFetcher()
+
+        async def scenario():
+            engine = AsyncRateEngine(concurrency=4)
+            try:
+                return await asyncio.gather(
+                    *(engine.get_rate(datetime(2025, 8, 6)) for _ in range(10))
+                )
+            finally:
+                engine.close()
+
+        with mock.patch("async_rates.get_ptax_rate", fetcher):
+            results = asyncio.run(scenario())
+
+        self.assertEqual(fetcher.calls, 1)
+        self.assertEqual(len(set(results)), 1)
+
+    def test_errors_are_returned_per_date(self):
+        """Testa que a falha de uma data não afeta as demais."""
+        def fetcher(date, fallback=False, currency="USD"):
+            if date.day == 2:
+                raise Exception("sem cotação")
+            return 5.0, date.strftime("%d/%m/%Y"), "https://example"
+
+        with mock.patch("async_rates.get_ptax_rate", fetcher):
+            rates = asyncio.run(get_rates([datetime(2025, 8, 1), datetime(2025, 8, 2)]))
+
+        self.assertEqual(rates["2025-08-01"][0], 5.0)
+        self.assertIsInstance(rates["2025-08-02"], Exception)
+
+
+class TestStoreLookups(unittest.TestCase):
+    """Testes do acesso ao armazenamento compartilhado a partir do event loop."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "rates.db")
+        rate_cache.configure_rate_cache(path=path).set_many({
+            datetime(2025, 8, 6): 5.4802, datetime(2025, 8, 8): 5.4335
+        })
+        # Novo cache (memória vazia) sobre o mesmo arquivo, como outro worker
+        self.cache = rate_cache.configure_rate_cache(path=path)
+        self.threads = []
+        store_get = self.cache._store.get
+
+        def recording_get(key):
+            self.threads.append(threading.current_thread())
+            return store_get(key)
+
+        self.cache._store.get = recording_get
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+        self.directory.cleanup()
+
+    def test_store_lookups_leave_the_event_loop(self):
+        """Testa que só acertos na memória são resolvidos no event loop."""
+        async def scenario():
+            engine = AsyncRateEngine()
+            try:
+                first = await engine.get_rates([datetime(2025, 8, 6), datetime(2025, 8, 10)],
+                                               fallback=True, preload=True)
+                self.assertTrue(self.threads)
+                self.assertNotIn(threading.main_thread(), self.threads)
+
+                # Agora na memória: nenhuma thread nem acesso ao armazenamento
+                self.threads.clear()
+                with mock.patch.object(engine, "_run", side_effect=AssertionError("usou o pool")):
+                    second = await engine.get_rate(datetime(2025, 8, 10), fallback=True)
+                self.assertEqual(self.threads, [])
+                return first, second
+            finally:
+                engine.close()
+
+        first, second = asyncio.run(scenario())
+
+        self.assertEqual(first["2025-08-06"][0], 5.4802)
+        self.assertEqual(first["2025-08-10"][1], "08/08/2025")
+        self.assertEqual(second[0], 5.4335)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Testes para a formatação de números no padrão brasileiro
+"""
+
+import unittest
+from decimal import Decimal
+
+from br_format import BRL, PLAIN, RATE, USD, compile_formatter, format_many, format_rate
+
+
+def legacy_format(value, prefix="R$ "):
+    """Implementação anterior de format_currency."""
+    return f"{prefix}{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+class TestFormatters(unittest.TestCase):
+    """Testes para os formatadores compilados."""
+
+    def test_matches_previous_implementation(self):
+        """Testa que a saída é idêntica à implementação anterior."""
+        for value in (0, 0.5, 1234.56, 1000000.0, 37122.8748, -9876543.215, 0.005, 999.995):
+            self.assertEqual(BRL(value), legacy_format(value))
+            self.assertEqual(USD(value), legacy_format(value, "USD "))
+            self.assertEqual(PLAIN(value), legacy_format(value, ""))
+
+    def test_rate_precision(self):
+        """Testa a formatação da cotação com 4 casas."""
+        self.assertEqual(RATE(5.4802), "R$ 5,4802")
+        self.assertEqual(format_rate(5.4802), "R$ 5,4802")
+
+    def test_decimal(self):
+        """Testa valores Decimal."""
+        self.assertEqual(BRL(Decimal("1234567.891")), "R$ 1.234.567,89")
+        self.assertEqual(PLAIN(Decimal("0.1")), "0,10")
+
+    def test_prefix_with_separators(self):
+        """Testa prefixos que contêm ponto."""
+        formatter = compile_formatter("U.S.$ ", precision=1)
+        self.assertEqual(formatter(1234.56), "U.S.$ 1.234,6")
+        self.assertEqual(format_many([1234.56], formatter), ["U.S.$ 1.234,6"])
+
+    def test_format_many(self):
+        """Testa a formatação vetorizada."""
+        values = [1, 2.5, 1234.56, -1000000]
+        self.assertEqual(format_many(values, BRL), [BRL(value) for value in values])
+        self.assertEqual(format_many(values, PLAIN), [PLAIN(value) for value in values])
+        self.assertEqual(format_many([Decimal("1.5")], BRL), ["R$ 1,50"])
+        self.assertEqual(format_many([], BRL), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
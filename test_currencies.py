@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes para o suporte a várias moedas (SGS simulado)
+"""
+
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import rate_cache
+from currencies import CURRENCIES, get_currency, sgs_url
+from invoice_description_generator import build_conversion, get_ptax_rate, get_ptax_rates
+
+
+def fake_range_response(url, params=None, timeout=None):
+    """Responde com cotações diferentes conforme a série consultada."""
+    values = {'bcdata.sgs.1/': '5.4802', 'bcdata.sgs.21619/': '6.3850', 'bcdata.sgs.21623/': '7.3791'}
+    valor = next(v for series, v in values.items() if series in url)
+    response = mock.Mock()
+    response.json.return_value = [
+        {'data': '05/08/2025', 'valor': valor},
+        {'data': '06/08/2025', 'valor': valor},
+    ]
+    return response
+
+
+class TestCurrencyRegistry(unittest.TestCase):
+    """Testes para o registro de moedas."""
+
+    def test_get_currency(self):
+        """Testa a busca por código, sem diferenciar maiúsculas."""
+        self.assertEqual(get_currency().code, "USD")
+        self.assertEqual(get_currency("eur").series, 21619)
+        self.assertIs(get_currency(CURRENCIES["GBP"]), CURRENCIES["GBP"])
+
+    def test_unknown_currency(self):
+        """Testa o erro para moeda não suportada."""
+        with self.assertRaises(ValueError):
+            get_currency("JPY")
+
+    def test_sgs_url(self):
+        """Testa a URL da série de cada moeda."""
+        self.assertEqual(sgs_url(CURRENCIES["USD"]), "https://api.bcb.gov.br/dados/serie/bcdata.sgs.1/dados")
+        self.assertIn("bcdata.sgs.21623/", sgs_url(CURRENCIES["GBP"]))
+
+
+@mock.patch("requests.Session.get", side_effect=fake_range_response)
+class TestMultiCurrencyLookup(unittest.TestCase):
+    """Testes para a busca de cotações de outras moedas."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    def test_currencies_are_cached_separately(self, mock_get):
+        """Testa que cada moeda usa a sua série e o seu espaço no cache."""
+        usd, _, _ = get_ptax_rate(datetime(2025, 8, 6))
+        eur, _, url = get_ptax_rate(datetime(2025, 8, 6), currency="EUR")
+        eur_again, _, _ = get_ptax_rate(datetime(2025, 8, 6), currency="EUR")
+
+        self.assertEqual((usd, eur, eur_again), (5.4802, 6.3850, 6.3850))
+        self.assertIn("bcdata.sgs.21619", url)
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_range_preload_per_currency(self, mock_get):
+        """Testa que a carga por intervalo alimenta apenas a série da moeda."""
+        get_ptax_rates(datetime(2025, 8, 4), datetime(2025, 8, 6), "GBP")
+
+        cache = rate_cache.get_rate_cache()
+        self.assertTrue(cache.contains(datetime(2025, 8, 5), CURRENCIES["GBP"].series))
+        self.assertFalse(cache.contains(datetime(2025, 8, 5)))
+
+    def test_conversion_text(self, mock_get):
+        """Testa o texto e o valor em reais de uma conversão em euros."""
+        conversion = build_conversion(1000.0, datetime(2025, 8, 6), currency="EUR")
+
+        self.assertEqual(conversion['currency'], "EUR")
+        self.assertEqual(round(conversion['brl_amount'], 2), 6385.0)
+        self.assertIn("(EUR 1.000,00)", conversion['text'])
+        self.assertIn("R$ 6,3850", conversion['text'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Testes para os modelos de texto da descrição
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from description_templates import (
+    DescriptionTemplate, TemplateRegistry, compile_template, configure_templates, get_template
+)
+
+
+VALUES = ("USD 6.774,00", "R$ 5,4802", "06/08/2025", "R$ 37.122,87", "https://example")
+
+
+class TestCompileTemplate(unittest.TestCase):
+    """Testes para compile_template."""
+
+    def test_matches_str_format(self):
+        """Testa que a renderização equivale a str.format."""
+        text = "{usd} -> {brl} ({rate} em {date}) {{literal}} {url}"
+        expected = text.format(usd=VALUES[0], rate=VALUES[1], date=VALUES[2], brl=VALUES[3], url=VALUES[4])
+
+        self.assertEqual(compile_template(text)(*VALUES), expected)
+
+    def test_short_templates(self):
+        """Testa modelos com um único trecho ou vazios."""
+        self.assertEqual(compile_template("{brl}")(*VALUES), "R$ 37.122,87")
+        self.assertEqual(compile_template("fixo")(*VALUES), "fixo")
+        self.assertEqual(compile_template("")(*VALUES), "")
+
+    def test_literals_are_not_evaluated(self):
+        """Testa que aspas e barras nos trechos fixos são mantidas como texto."""
+        text = 'a\'"\\n {brl} f"{{x}}" \'\'\' """'
+        expected = 'a\'"\\n R$ 37.122,87 f"{x}" \'\'\' """'
+
+        self.assertEqual(compile_template(text)(*VALUES), expected)
+
+    def test_rejects_unknown_fields(self):
+        """Testa a validação dos campos na compilação."""
+        with self.assertRaises(ValueError):
+            compile_template("{total}")
+        with self.assertRaises(ValueError):
+            compile_template("{brl:>20}")
+
+
+class TestTemplateRegistry(unittest.TestCase):
+    """Testes para TemplateRegistry e o modelo padrão."""
+
+    def tearDown(self):
+        configure_templates()
+
+    def test_default_template_text(self):
+        """Testa que o modelo padrão mantém o texto da IN RFB nº 1.312/2012."""
+        text = get_template().render(*VALUES[:4])
+
+        self.assertEqual(
+            text,
+            "Valor recebido em moeda estrangeira (USD 6.774,00), convertido conforme PTAX de venda de "
+            "06/08/2025 (R$ 5,4802), conforme IN RFB nº 1.312/2012. Valor total em reais: R$ 37.122,87."
+        )
+
+    def test_show_url(self):
+        """Testa a linha da fonte dos dados."""
+        text = get_template("padrao").render(*VALUES, show_url=True)
+        self.assertTrue(text.endswith("\n\n🔗 Fonte dos dados: https://example"))
+
+    def test_unknown_template(self):
+        """Testa o erro para modelo inexistente."""
+        with self.assertRaises(ValueError):
+            TemplateRegistry().get("inexistente")
+
+    def test_load_from_file(self):
+        """Testa modelos adicionais definidos em arquivo JSON."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "modelos.json")
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump({"cliente": {"text": "Total: {brl}", "url_text": " [{url}]"}}, fh)
+
+            configure_templates(path)
+
+        template = get_template("cliente")
+        self.assertIsInstance(template, DescriptionTemplate)
+        self.assertEqual(template.render(*VALUES, show_url=True), "Total: R$ 37.122,87 [https://example]")
+        self.assertIn("padrao", TemplateRegistry().names())
+
+
+if __name__ == "__main__":
+    unittest.main()
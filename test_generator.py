@@ -3,9 +3,18 @@
 Testes para o Gerador de Descrição de Conversão de Moeda
 """
 
+import io
+import json
+import os
+import subprocess
+import sys
 import unittest
-from invoice_description_generator import format_currency, generate_conversion_text
+from unittest import mock
+from invoice_description_generator import format_currency, generate_conversion_text, build_conversion
+from invoice_description_generator import convert_rows, read_rows, write_rows
 from datetime import datetime
+import rate_cache
+import sgs_client
 
 
 class TestCurrencyFormatter(unittest.TestCase):
@@ -30,6 +39,10 @@ class TestCurrencyFormatter(unittest.TestCase):
 class TestConversionText(unittest.TestCase):
     """Testes para a função de geração de texto de conversão."""
     
+    def tearDown(self):
+        # Falhas de rede reais não devem deixar o disjuntor aberto para os próximos testes
+        sgs_client.configure_sgs_client()
+    
     def test_generate_text_basic(self):
         """Testa geração básica de texto."""
         text = generate_conversion_text(6774.00)
@@ -57,9 +70,157 @@ class TestConversionText(unittest.TestCase):
         self.assertIn("07/08/2025", text)
 
 
+class TestBuildConversion(unittest.TestCase):
+    """Testes para o resultado estruturado de conversão (SGS simulado)."""
+    
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+    
+    @mock.patch("requests.Session.get")
+    def test_structured_result(self, mock_get):
+        """Testa os campos do resultado com uma única busca de cotação."""
+        response = mock.Mock()
+        response.json.return_value = [{'data': '06/08/2025', 'valor': '5.4802'}]
+        mock_get.return_value = response
+        
+        result = build_conversion(6774.00, datetime(2025, 8, 6), show_url=True)
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(result['rate'], 5.4802)
+        self.assertEqual(result['date'], "06/08/2025")
+        self.assertAlmostEqual(result['brl_amount'], 37122.8748)
+        self.assertIn("R$ 37.122,87", result['text'])
+        self.assertIn(result['source_url'], result['text'])
+
+
+class TestStreamMode(unittest.TestCase):
+    """Testes para o modo em lote com CSV/JSONL (SGS simulado)."""
+    
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+    
+    @mock.patch("requests.Session.get")
+    def test_csv_roundtrip(self, mock_get):
+        """Testa a conversão de um CSV com datas repetidas e linha inválida."""
+        response = mock.Mock()
+        response.json.return_value = [{'data': '06/08/2025', 'valor': '5.4802'}]
+        mock_get.return_value = response
+        
+        source = io.StringIO("usd_amount,date\n6774.00,07082025\n1000,07082025\nabc,07082025\n")
+        target = io.StringIO()
+        
+        count = write_rows(convert_rows(read_rows(source, "csv")), target, "csv")
+        lines = target.getvalue().splitlines()
+        
+        self.assertEqual(count, 3)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(lines[0], "usd_amount,currency,date,rate,brl_amount,text,stale,error")
+        self.assertIn("37122.87", lines[1])
+        self.assertIn("Linha inválida", lines[3])
+    
+    @mock.patch("requests.Session.get")
+    def test_jsonl_is_lazy(self, mock_get):
+        """Testa que as linhas JSONL são convertidas sob demanda."""
+        response = mock.Mock()
+        response.json.return_value = [{'data': '06/08/2025', 'valor': '5.4802'}]
+        mock_get.return_value = response
+        
+        source = io.StringIO('{"usd_amount": 10, "date": "07082025"}\n\n{"usd_amount": 20, "date": "07082025"}\n')
+        results = convert_rows(read_rows(source, "jsonl"))
+        
+        first = next(results)
+        self.assertEqual(first['brl_amount'], 54.8)
+        self.assertEqual(source.tell(), len('{"usd_amount": 10, "date": "07082025"}\n'))
+        self.assertEqual(json.loads(json.dumps(next(results)))['rate'], 5.4802)
+
+    
+    @mock.patch("requests.Session.get")
+    def test_jsonl_invalid_lines(self, mock_get):
+        """Testa que linhas JSONL inválidas viram erros sem interromper o lote."""
+        response = mock.Mock()
+        response.json.return_value = [{'data': '06/08/2025', 'valor': '5.4802'}]
+        mock_get.return_value = response
+        
+        source = io.StringIO('{"usd_amount": 10, "date": "07082025"}\n{"usd_amount": 10,\n'
+                             '[10, "07082025"]\n42\n{"usd_amount": 20, "date": "07082025"}\n')
+        target = io.StringIO()
+        
+        count = write_rows(convert_rows(read_rows(source, "jsonl")), target, "jsonl")
+        results = [json.loads(line) for line in target.getvalue().splitlines()]
+        
+        self.assertEqual(count, 5)
+        self.assertEqual([r.get('brl_amount') for r in results], [54.8, None, None, None, 109.6])
+        self.assertIn("JSON inválido", results[1]['error'])
+        self.assertIn("objeto JSON", results[2]['error'])
+        self.assertIn("objeto JSON", results[3]['error'])
+    
+    @mock.patch("requests.Session.get")
+    def test_transient_errors_are_retried(self, mock_get):
+        """Testa que uma falha transitória do SGS não se repete nas linhas seguintes."""
+        import requests
+        sgs_client.configure_sgs_client(max_retries=0)
+        self.addCleanup(sgs_client.configure_sgs_client)
+        response = mock.Mock()
+        response.json.return_value = [{'data': '06/08/2025', 'valor': '5.4802'}]
+        mock_get.side_effect = [requests.ConnectionError("falha"), response]
+        
+        rows = [{'usd_amount': 10, 'date': '07082025'}] * 5
+        results = list(convert_rows(rows))
+        
+        self.assertIn('error', results[0])
+        self.assertEqual([r.get('brl_amount') for r in results[1:]], [54.8] * 4)
+        self.assertEqual(mock_get.call_count, 2)
+    
+    @mock.patch("invoice_description_generator.get_ptax_rate")
+    def test_stale_rows(self, mock_rate):
+        """Testa que linhas convertidas com cotação antiga saem marcadas (JSONL e CSV)."""
+        from invoice_description_generator import StaleQuote
+        mock_rate.side_effect = [StaleQuote((5.4802, "06/08/2025", "url")), (5.5, "07/08/2025", "url")]
+        
+        rows = [{'usd_amount': 10, 'date': '07082025'}, {'usd_amount': 10, 'date': '08082025'}]
+        target = io.StringIO()
+        write_rows(convert_rows(rows), target, "jsonl")
+        results = [json.loads(line) for line in target.getvalue().splitlines()]
+        self.assertEqual([r['stale'] for r in results], [True, False])
+        
+        mock_rate.side_effect = [StaleQuote((5.4802, "06/08/2025", "url"))]
+        target = io.StringIO()
+        write_rows(convert_rows(rows[:1]), target, "csv")
+        self.assertTrue(target.getvalue().splitlines()[1].endswith(",True,"))
+    
+    def test_csv_invalid_json_row(self):
+        """Testa que a saída CSV aceita as linhas JSONL inválidas."""
+        target = io.StringIO()
+        
+        count = write_rows(convert_rows(read_rows(io.StringIO('not json\n'), "jsonl")), target, "csv")
+        
+        self.assertEqual(count, 1)
+        self.assertIn("Linha inválida: JSON inválido", target.getvalue())
+
+
+class TestImportCost(unittest.TestCase):
+    """Testes para o custo de importação do módulo."""
+    
+    def test_network_dependencies_are_lazy(self):
+        """Testa que importar o módulo não carrega requests nem sqlite3."""
+        code = (
+            "import sys, invoice_description_generator; "
+            "print(','.join(m for m in ('requests', 'bs4', 'sqlite3', 'argparse') if m in sys.modules))"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        )
+        self.assertEqual(completed.stdout.strip(), "")
+
+
 class TestIntegration(unittest.TestCase):
     """Testes de integração."""
     
+    def tearDown(self):
+        sgs_client.configure_sgs_client()
+    
     def test_complete_flow(self):
         """Testa o fluxo completo de geração de texto."""
         # Simula um cenário real
@@ -84,6 +245,8 @@ def run_tests():
     # Adiciona os testes
     suite.addTests(loader.loadTestsFromTestCase(TestCurrencyFormatter))
     suite.addTests(loader.loadTestsFromTestCase(TestConversionText))
+    suite.addTests(loader.loadTestsFromTestCase(TestBuildConversion))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamMode))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
     
     # Executa os testes
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Testes para as métricas no formato do Prometheus
+"""
+
+import unittest
+from unittest import mock
+
+import requests
+
+import metrics
+import rate_cache
+from api_core import configure_response_cache
+from metrics import Counter, Histogram, Metrics
+from sgs_client import SGSClient
+from api import app
+
+
+def fake_sgs_response(valor):
+    """Cria uma resposta falsa do SGS com um único valor."""
+    response = mock.Mock()
+    response.status_code = 200
+    response.json.return_value = [{'data': '06/08/2025', 'valor': valor}]
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestInstruments(unittest.TestCase):
+    """Testes para Counter e Histogram."""
+
+    def test_counter(self):
+        """Testa o contador com rótulos."""
+        counter = Counter("falhas_total", "Falhas.", ("reason",))
+        counter.inc("timeout")
+        counter.inc("timeout", amount=2)
+
+        self.assertEqual(counter.value("timeout"), 3)
+        self.assertIn('falhas_total{reason="timeout"} 3', counter.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Testa os buckets acumulados, a soma e a contagem."""
+        histogram = Histogram("latencia_seconds", "Latência.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "/api/rate")
+
+        lines = histogram.render()
+
+        self.assertIn('latencia_seconds_bucket{route="/api/rate",le="0.1"} 2', lines)
+        self.assertIn('latencia_seconds_bucket{route="/api/rate",le="1"} 3', lines)
+        self.assertIn('latencia_seconds_bucket{route="/api/rate",le="+Inf"} 4', lines)
+        self.assertIn('latencia_seconds_sum{route="/api/rate"} 3.65', lines)
+        self.assertIn('latencia_seconds_count{route="/api/rate"} 4', lines)
+
+    def test_label_escaping(self):
+        """Testa o escape de aspas nos valores dos rótulos."""
+        counter = Counter("x_total", "X.", ("route",))
+        counter.inc('a"b')
+        self.assertIn('x_total{route="a\\"b"} 1', counter.render())
+
+    def test_disabled(self):
+        """Testa que métricas desabilitadas ignoram as observações."""
+        disabled = Metrics(enabled=False)
+        disabled.observe_batch(10)
+        disabled.count_sgs_failure("timeout")
+
+        self.assertEqual(disabled.batch_size.count(), 0)
+        self.assertEqual(disabled.sgs_failures.value("timeout"), 0)
+
+
+class TestSGSMetrics(unittest.TestCase):
+    """Testes para as métricas do cliente do SGS."""
+
+    def setUp(self):
+        self.metrics = metrics.configure_metrics()
+
+    def tearDown(self):
+        metrics.configure_metrics()
+
+    @mock.patch("requests.Session.get")
+    def test_attempts_and_failures(self, mock_get):
+        """Testa a latência por tentativa e a falha após as novas tentativas."""
+        mock_get.side_effect = requests.ConnectionError("recusada")
+        client = SGSClient(max_retries=2, backoff=0)
+
+        with self.assertRaises(requests.ConnectionError):
+            client.get_json("https://example/sgs")
+
+        self.assertEqual(self.metrics.sgs_requests.count("connection_error"), 3)
+        self.assertEqual(self.metrics.sgs_failures.value("connection_error"), 1)
+
+    @mock.patch("requests.Session.get")
+    def test_not_found_is_not_a_failure(self, mock_get):
+        """Testa que o 404 do SGS (data sem cotação) não conta como falha."""
+        response = mock.Mock(status_code=404)
+        response.raise_for_status.side_effect = requests.HTTPError("404", response=response)
+        mock_get.return_value = response
+
+        with self.assertRaises(requests.HTTPError):
+            SGSClient().get_json("https://example/sgs")
+
+        self.assertEqual(self.metrics.sgs_requests.count("not_found"), 1)
+        self.assertEqual(self.metrics.sgs_failures.render()[2:], [])
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Testes para GET /metrics."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+        self.metrics = metrics.configure_metrics()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+        metrics.configure_metrics()
+
+    @mock.patch("requests.Session.get")
+    def test_exposition(self, mock_get):
+        """Testa as métricas de rota, busca de cotação, SGS, lote e cache."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+
+        self.client.get('/api/rate?date=07082025')
+        self.client.post('/api/convert/batch', json={'items': [
+            {'usd_amount': 1.0, 'date': '07082025'},
+            {'usd_amount': 2.0, 'date': '07082025'},
+        ]})
+        response = self.client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        self.assertIn('ptax_http_request_duration_seconds_count{route="/api/rate",method="GET",status="200"} 1', text)
+        self.assertIn('ptax_http_request_duration_seconds_count{route="/api/convert/batch",method="POST",status="200"} 1', text)
+        self.assertIn('ptax_sgs_request_duration_seconds_count{outcome="ok"} 1', text)
+        self.assertIn('ptax_rate_lookup_duration_seconds_count{currency="USD",outcome="ok"}', text)
+        self.assertIn('ptax_batch_size_count 1', text)
+        self.assertIn('ptax_rate_cache_misses_total 1', text)
+
+    def test_unmatched_route(self):
+        """Testa que URLs inexistentes não criam um rótulo por URL."""
+        self.client.get('/nao/existe/123')
+        text = self.client.get('/metrics').get_data(as_text=True)
+
+        self.assertIn('route="<unmatched>",method="GET",status="404"', text)
+        self.assertNotIn('/nao/existe/123', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Testes para a aritmética exata de conversão
+"""
+
+import unittest
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_EVEN
+
+from money import (
+    cents_to_decimal, convert_cents, convert_exact, rate_to_units, sum_conversions, to_cents
+)
+
+
+class TestMoney(unittest.TestCase):
+    """Testes para o módulo money."""
+
+    def test_to_cents(self):
+        """Testa a conversão para centavos de diferentes tipos."""
+        self.assertEqual(to_cents(6774), 677400)
+        self.assertEqual(to_cents(6774.1), 677410)
+        self.assertEqual(to_cents("0.5"), 50)
+        self.assertEqual(to_cents("-12.34"), -1234)
+        self.assertEqual(to_cents(Decimal("1.005")), 101)
+        self.assertEqual(to_cents(1.005), 101)
+
+    def test_rate_to_units(self):
+        """Testa a conversão da cotação para inteiro."""
+        self.assertEqual(rate_to_units(5.4802), 54802)
+        self.assertEqual(rate_to_units("5.4802"), 54802)
+
+    def test_rounding_modes(self):
+        """Testa o arredondamento explícito em meio centavo."""
+        # 0,05 USD * 5,0001 = 0,250005 BRL
+        self.assertEqual(convert_cents(5, 50001), 25)
+        # 0,01 USD * 0,5000 = 0,005 BRL (meio centavo exato)
+        self.assertEqual(convert_cents(1, 5000), 1)
+        self.assertEqual(convert_cents(1, 5000, ROUND_HALF_EVEN), 0)
+        self.assertEqual(convert_cents(1, 5000, ROUND_DOWN), 0)
+        self.assertEqual(convert_cents(-1, 5000), -1)
+        with self.assertRaises(ValueError):
+            convert_cents(1, 5000, "ROUND_CEILING")
+
+    def test_convert_exact(self):
+        """Testa a conversão completa."""
+        self.assertEqual(convert_exact(6774.00, 5.4802), Decimal("37122.87"))
+        self.assertEqual(cents_to_decimal(12), Decimal("0.12"))
+
+    def test_sum_has_no_float_drift(self):
+        """Testa que a soma de muitos itens é exata."""
+        items = [(0.10, 5.4802)] * 100000
+        totals = sum_conversions(items)
+
+        self.assertEqual(totals['count'], 100000)
+        self.assertEqual(totals['usd_total'], Decimal("10000.00"))
+        # Cada item: 0,10 * 5,4802 = 0,54802 -> 0,55
+        self.assertEqual(totals['brl_total'], Decimal("55000.00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
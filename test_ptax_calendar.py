@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Testes para o calendário de dias úteis e a busca da última cotação publicada
+"""
+
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import requests
+
+import rate_cache
+from invoice_description_generator import RateNotFoundError, get_bb_dollar_rate, resolve_rates
+from ptax_calendar import easter, holidays, is_business_day, latest_business_day
+
+
+def fake_sgs_response(items):
+    """Cria uma resposta falsa do SGS com os itens informados."""
+    response = mock.Mock()
+    response.status_code = 200
+    response.json.return_value = items
+    return response
+
+
+def not_found_response():
+    """Cria a resposta 404 do SGS para consultas sem dados."""
+    response = mock.Mock()
+    response.status_code = 404
+    response.raise_for_status.side_effect = requests.HTTPError("404 Not Found", response=response)
+    return response
+
+
+class TestCalendar(unittest.TestCase):
+    """Testes para o calendário de feriados bancários."""
+
+    def test_easter(self):
+        """Testa o cálculo da Páscoa."""
+        self.assertEqual(easter(2024), date(2024, 3, 31))
+        self.assertEqual(easter(2025), date(2025, 4, 20))
+
+    def test_movable_holidays(self):
+        """Testa Carnaval, Sexta-feira Santa e Corpus Christi de 2025."""
+        days = holidays(2025)
+        self.assertIn(date(2025, 3, 3), days)
+        self.assertIn(date(2025, 3, 4), days)
+        self.assertIn(date(2025, 4, 18), days)
+        self.assertIn(date(2025, 6, 19), days)
+
+    def test_consciencia_negra_since_2024(self):
+        """Testa que 20/11 só é feriado nacional a partir de 2024."""
+        self.assertTrue(is_business_day(date(2023, 11, 20)))
+        self.assertFalse(is_business_day(date(2024, 11, 20)))
+
+    def test_latest_business_day(self):
+        """Testa o recuo de fins de semana e feriados."""
+        self.assertEqual(latest_business_day(datetime(2025, 8, 10)), date(2025, 8, 8))
+        self.assertEqual(latest_business_day(date(2025, 3, 4)), date(2025, 2, 28))
+        self.assertEqual(latest_business_day(date(2025, 8, 6)), date(2025, 8, 6))
+
+
+class TestLatestRateLookup(unittest.TestCase):
+    """Testes para get_bb_dollar_rate com fallback (SGS simulado)."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_weekend_uses_previous_business_day(self, mock_get):
+        """Testa que um domingo resolve a sexta-feira com uma única consulta."""
+        mock_get.return_value = fake_sgs_response([{'data': '08/08/2025', 'valor': '5.4335'}])
+
+        rate, date_str, url = get_bb_dollar_rate(datetime(2025, 8, 10), fallback=True)
+
+        self.assertEqual(rate, 5.4335)
+        self.assertEqual(date_str, "08/08/2025")
+        self.assertIn("dataInicial=08/08/2025", url)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch("requests.Session.get")
+    def test_unexpected_holiday_uses_range_query(self, mock_get):
+        """Testa a consulta por intervalo quando o dia útil não tem cotação."""
+        mock_get.side_effect = [
+            fake_sgs_response([]),
+            fake_sgs_response([
+                {'data': '04/08/2025', 'valor': '5.5080'},
+                {'data': '05/08/2025', 'valor': '5.5162'},
+            ]),
+        ]
+
+        rate, date_str, _ = get_bb_dollar_rate(datetime(2025, 8, 6), fallback=True)
+
+        self.assertEqual(rate, 5.5162)
+        self.assertEqual(date_str, "05/08/2025")
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("requests.Session.get")
+    def test_unexpected_holiday_is_cached(self, mock_get):
+        """Testa que um dia útil sem cotação não é consultado de novo."""
+        mock_get.side_effect = [
+            not_found_response(),
+            fake_sgs_response([
+                {'data': '04/08/2025', 'valor': '5.5080'},
+                {'data': '05/08/2025', 'valor': '5.5162'},
+            ]),
+        ]
+
+        for _ in range(3):
+            rate, date_str, _ = get_bb_dollar_rate(datetime(2025, 8, 6), fallback=True)
+            self.assertEqual((rate, date_str), (5.5162, "05/08/2025"))
+        resolved = resolve_rates([datetime(2025, 8, 6), datetime(2025, 8, 5)], fallback=True)
+
+        self.assertEqual(resolved['2025-08-06'][0], 5.5162)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("requests.Session.get")
+    def test_empty_window_is_cached(self, mock_get):
+        """Testa que um intervalo sem nenhuma cotação não é consultado de novo."""
+        mock_get.side_effect = lambda *args, **kwargs: not_found_response()
+
+        with self.assertRaises(RateNotFoundError):
+            get_bb_dollar_rate(datetime(2025, 8, 6), fallback=True)
+        self.assertEqual(mock_get.call_count, 2)
+
+        with self.assertRaises(RateNotFoundError):
+            get_bb_dollar_rate(datetime(2025, 8, 6), fallback=True)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("requests.Session.get")
+    def test_strict_lookup_raises(self, mock_get):
+        """Testa que, sem fallback, a ausência de cotação continua sendo erro."""
+        mock_get.return_value = fake_sgs_response([])
+
+        with self.assertRaises(RateNotFoundError):
+            get_bb_dollar_rate(datetime(2025, 8, 10))
+
+    @mock.patch("requests.Session.get")
+    def test_warm_weekend_dates_skip_range_query(self, mock_get):
+        """Testa que fins de semana com a sexta no cache não geram consulta por intervalo."""
+        rate_cache.get_rate_cache().set(datetime(2025, 8, 8), 5.4335)
+
+        resolved = resolve_rates([datetime(2025, 8, 9), datetime(2025, 8, 10)], fallback=True)
+
+        self.assertEqual({quote[0] for quote in resolved.values()}, {5.4335})
+        mock_get.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Testes para o cache de cotações PTAX
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+import sqlite3
+from datetime import datetime, timedelta
+from unittest import mock
+
+import requests
+
+import rate_cache
+import sgs_client
+from rate_cache import RateCache, RedisRateStore, SingleFlight, date_key
+from invoice_description_generator import (
+    RateUnavailableError, get_bb_dollar_rate, get_bb_dollar_rates, is_stale
+)
+
+
+def fake_sgs_response(valor):
+    """Cria uma resposta falsa do SGS com um único valor."""
+    response = mock.Mock()
+    response.json.return_value = [{'data': '06/08/2025', 'valor': valor}]
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestRateCache(unittest.TestCase):
+    """Testes para a classe RateCache."""
+
+    def test_date_key(self):
+        """Testa a normalização das chaves de data."""
+        self.assertEqual(date_key(datetime(2025, 8, 6, 15, 30)), "2025-08-06")
+        self.assertEqual(date_key(datetime(2025, 8, 6).date()), "2025-08-06")
+
+    def test_hits_and_misses(self):
+        """Testa os contadores de acertos e falhas."""
+        cache = RateCache()
+        self.assertIsNone(cache.get(datetime(2025, 8, 6)))
+        cache.set(datetime(2025, 8, 6), 5.4802)
+        self.assertEqual(cache.get(datetime(2025, 8, 6, 12)), 5.4802)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_lru_eviction(self):
+        """Testa que a memória respeita o limite de entradas."""
+        cache = RateCache(max_entries=2)
+        cache.set("2025-08-04", 5.1)
+        cache.set("2025-08-05", 5.2)
+        cache.get("2025-08-04")
+        cache.set("2025-08-06", 5.3)
+
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.get("2025-08-04"), 5.1)
+        self.assertIsNone(cache.get("2025-08-05"))
+
+    def test_series_are_independent(self):
+        """Testa que séries diferentes não compartilham entradas."""
+        cache = RateCache()
+        cache.set("2025-08-06", 5.48)
+        self.assertIsNone(cache.get("2025-08-06", series=21619))
+
+    def test_sqlite_persistence(self):
+        """Testa que o arquivo SQLite sobrevive a uma nova instância."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ptax.sqlite3")
+            cache = RateCache(path=path)
+            cache.set_many({"2025-08-05": 5.5, "2025-08-06": 5.4802})
+            cache.close()
+
+            cache = RateCache(path=path)
+            self.assertEqual(cache.get("2025-08-06"), 5.4802)
+            self.assertEqual(cache.stats()['store_hits'], 1)
+            cache.close()
+
+
+class FakeRedis:
+    """Substituto local de um cliente Redis (get/set/delete/scan_iter)."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+        self.ttls[key] = ex
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+
+class TestSharedStores(unittest.TestCase):
+    """Testes para os armazenamentos compartilhados entre workers."""
+
+    def test_sqlite_shared_between_workers(self):
+        """Testa que um worker enxerga as cotações gravadas por outro."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ptax.sqlite3")
+            worker_a = RateCache(path=path)
+            worker_b = RateCache(path=path)
+
+            worker_a.set("2025-08-06", 5.4802)
+
+            self.assertEqual(worker_b.get("2025-08-06"), 5.4802)
+            worker_a.close()
+            worker_b.close()
+
+    def test_recent_dates_expire(self):
+        """Testa que cotações de ontem expiram e as antigas são permanentes."""
+        cache = RateCache(recent_ttl=0.05)
+        yesterday = datetime.now() - timedelta(days=1)
+        cache.set(yesterday, 5.40)
+        cache.set("2025-08-06", 5.4802)
+
+        self.assertEqual(cache.get(yesterday), 5.40)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(yesterday))
+        self.assertEqual(cache.get("2025-08-06"), 5.4802)
+
+    def test_sqlite_recent_dates_expire(self):
+        """Testa a validade das cotações recentes no arquivo SQLite."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ptax.sqlite3")
+            yesterday = datetime.now() - timedelta(days=1)
+            RateCache(path=path, recent_ttl=0.05).set(yesterday, 5.40)
+
+            time.sleep(0.1)
+            self.assertIsNone(RateCache(path=path).get(yesterday))
+
+    def test_sqlite_upgrades_old_schema(self):
+        """Testa a migração de arquivos sem a coluna de validade."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ptax.sqlite3")
+            db = sqlite3.connect(path)
+            db.execute("CREATE TABLE rates (series INTEGER NOT NULL, date TEXT NOT NULL,"
+                       " rate REAL NOT NULL, PRIMARY KEY (series, date))")
+            db.execute("INSERT INTO rates VALUES (1, '2025-08-06', 5.4802)")
+            db.commit()
+            db.close()
+
+            cache = RateCache(path=path)
+            self.assertEqual(cache.get("2025-08-06"), 5.4802)
+            cache.close()
+
+    def test_redis_store(self):
+        """Testa o armazenamento Redis com um substituto local."""
+        client = FakeRedis()
+        yesterday = datetime.now() - timedelta(days=1)
+
+        RateCache(store=RedisRateStore(client)).set_many({"2025-08-06": 5.4802, yesterday: 5.40})
+
+        self.assertIsNone(client.ttls["ptax:1:2025-08-06"])
+        self.assertGreater(client.ttls[f"ptax:1:{date_key(yesterday)}"], 0)
+
+        other_worker = RateCache(store=RedisRateStore(client))
+        self.assertEqual(other_worker.get("2025-08-06"), 5.4802)
+        self.assertEqual(other_worker.stats()['store_hits'], 1)
+
+
+class BrokenRedis(FakeRedis):
+    """Cliente Redis fora do ar: toda operação falha."""
+
+    def get(self, key):
+        raise ConnectionError("Redis indisponível")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("Redis indisponível")
+
+
+class TestStoreFailures(unittest.TestCase):
+    """Testes do cache com o armazenamento compartilhado fora do ar."""
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    def test_store_errors_are_misses(self):
+        """Testa que falhas do armazenamento contam como ausência e a memória continua valendo."""
+        cache = RateCache(store=RedisRateStore(BrokenRedis()))
+
+        with self.assertLogs("rate_cache", "WARNING"):
+            self.assertIsNone(cache.get("2025-08-06"))
+            cache.set("2025-08-06", 5.4802)
+
+        self.assertEqual(cache.get("2025-08-06"), 5.4802)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_store_is_read_outside_the_lock(self):
+        """Testa que uma consulta ao armazenamento não bloqueia as demais threads."""
+        client = FakeRedis()
+        RedisRateStore(client).set_many([((1, "2025-08-06"), 5.4802, None)])
+        cache = RateCache(store=RedisRateStore(client))
+        locked = []
+        store_get = client.get
+
+        def slow_get(key):
+            locked.append(cache._lock.locked())
+            return store_get(key)
+
+        client.get = slow_get
+
+        self.assertEqual(cache.get("2025-08-06"), 5.4802)
+        self.assertEqual(locked, [False])
+
+    @mock.patch("requests.Session.get")
+    def test_lookup_falls_back_to_sgs(self, mock_get):
+        """Testa que a busca de cotação consulta o SGS com o Redis fora do ar."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+        rate_cache.configure_rate_cache(store=RedisRateStore(BrokenRedis()))
+
+        with self.assertLogs("rate_cache", "WARNING"):
+            rate, date_str, _ = get_bb_dollar_rate(datetime(2025, 8, 6))
+
+        self.assertEqual((rate, date_str), (5.4802, "06/08/2025"))
+        self.assertEqual(mock_get.call_count, 1)
+
+
+class TestCachedRateLookup(unittest.TestCase):
+    """Testes para o uso do cache em get_bb_dollar_rate."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_fetches_each_date_once(self, mock_get):
+        """Testa que a mesma data só é buscada uma vez no SGS."""
+        mock_get.return_value = fake_sgs_response("5.4802")
+        quote_date = datetime(2025, 8, 6)
+
+        first = get_bb_dollar_rate(quote_date)
+        second = get_bb_dollar_rate(quote_date)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], 5.4802)
+        self.assertEqual(first[1], "06/08/2025")
+        self.assertEqual(mock_get.call_count, 1)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Testes para o agrupamento de buscas simultâneas."""
+
+    def run_concurrently(self, target, count=8):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_calls_share_result(self):
+        """Testa que chamadas simultâneas executam a função uma vez."""
+        flights = SingleFlight()
+        calls = []
+        results = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return 5.4802
+
+        self.run_concurrently(lambda: results.append(flights.do("2025-08-06", slow)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [5.4802] * 8)
+        self.assertEqual(flights.shared, 7)
+
+    def test_errors_are_shared(self):
+        """Testa que a exceção do líder é repassada aos demais."""
+        flights = SingleFlight()
+        errors = []
+
+        def failing():
+            time.sleep(0.1)
+            raise Exception("SGS indisponível")
+
+        def call():
+            try:
+                flights.do("2025-08-06", failing)
+            except Exception as e:
+                errors.append(str(e))
+
+        self.run_concurrently(call, count=4)
+
+        self.assertEqual(errors, ["SGS indisponível"] * 4)
+
+    @mock.patch("requests.Session.get")
+    def test_rate_lookup_is_coalesced(self, mock_get):
+        """Testa que threads pedindo a mesma data fazem uma única consulta."""
+        rate_cache.configure_rate_cache()
+
+        def slow_get(*args, **kwargs):
+            time.sleep(0.1)
+            return fake_sgs_response("5.4802")
+
+        mock_get.side_effect = slow_get
+        results = []
+
+        self.run_concurrently(lambda: results.append(get_bb_dollar_rate(datetime(2025, 8, 6))))
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual({result[0] for result in results}, {5.4802})
+
+
+class TestRangePreload(unittest.TestCase):
+    """Testes para a carga de cotações por intervalo."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_preload_seeds_cache(self, mock_get):
+        """Testa que o intervalo é buscado de uma vez e alimenta o cache."""
+        response = mock.Mock()
+        response.json.return_value = [
+            {'data': '04/08/2025', 'valor': '5.5080'},
+            {'data': '05/08/2025', 'valor': '5.5162'},
+            {'data': '06/08/2025', 'valor': '5.4802'},
+        ]
+        mock_get.return_value = response
+
+        rates = get_bb_dollar_rates(datetime(2025, 8, 2), datetime(2025, 8, 6))
+
+        self.assertEqual(len(rates), 3)
+        self.assertEqual(mock_get.call_count, 1)
+        params = mock_get.call_args[1]['params']
+        self.assertEqual(params['dataInicial'], '02/08/2025')
+        self.assertEqual(params['dataFinal'], '06/08/2025')
+
+        rate, _, _ = get_bb_dollar_rate(datetime(2025, 8, 5))
+        self.assertEqual(rate, 5.5162)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch("invoice_description_generator.MAX_RANGE_DAYS", 10)
+    @mock.patch("requests.Session.get")
+    def test_preload_chunks_long_ranges(self, mock_get):
+        """Testa a divisão de intervalos longos em várias consultas."""
+        response = mock.Mock()
+        response.json.return_value = []
+        mock_get.return_value = response
+
+        get_bb_dollar_rates(datetime(2025, 1, 1), datetime(2025, 1, 25))
+
+        self.assertEqual(mock_get.call_count, 3)
+        finals = [call[1]['params']['dataFinal'] for call in mock_get.call_args_list]
+        self.assertEqual(finals, ['10/01/2025', '20/01/2025', '25/01/2025'])
+
+
+class TestStaleRates(unittest.TestCase):
+    """Testes para o uso da última cotação conhecida com o SGS fora do ar."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache(recent_ttl=0)
+        sgs_client.configure_sgs_client(max_retries=0, breaker_threshold=1, breaker_reset=0)
+
+    def tearDown(self):
+        sgs_client.configure_sgs_client()
+        rate_cache.configure_rate_cache()
+
+    def test_get_stale_keeps_expired_rates(self):
+        """Testa que cotações expiradas continuam disponíveis em get_stale."""
+        cache = rate_cache.get_rate_cache()
+        yesterday = datetime.now() - timedelta(days=1)
+        cache.set(yesterday, 5.1)
+
+        self.assertIsNone(cache.get(yesterday))
+        self.assertEqual(cache.get_stale(yesterday), 5.1)
+        self.assertIsNone(cache.get_stale(datetime(2025, 8, 6)))
+
+    @mock.patch("invoice_description_generator.STALE_REFRESH_DELAY", 0)
+    @mock.patch("requests.Session.get")
+    def test_serves_stale_and_refreshes(self, mock_get):
+        """Testa a cotação antiga marcada como stale e a atualização em segundo plano."""
+        cache = rate_cache.get_rate_cache()
+        yesterday = datetime.now() - timedelta(days=1)
+        cache.set(yesterday, 5.1)
+        mock_get.side_effect = [requests.ConnectionError("fora do ar"), fake_sgs_response("5.2")]
+
+        quote = get_bb_dollar_rate(yesterday)
+
+        self.assertTrue(is_stale(quote))
+        self.assertEqual(quote[0], 5.1)
+        self.assertEqual(quote[1], yesterday.strftime("%d/%m/%Y"))
+
+        deadline = time.time() + 5
+        while cache.get_stale(yesterday) != 5.2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.get_stale(yesterday), 5.2)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("invoice_description_generator._schedule_refresh")
+    @mock.patch("requests.Session.get")
+    def test_fallback_uses_last_known_date(self, mock_get, mock_refresh):
+        """Testa que, com fallback, vale a última cotação conhecida antes da data."""
+        rate_cache.get_rate_cache().set(datetime(2025, 8, 6), 5.4802)
+        mock_get.side_effect = requests.ConnectionError("fora do ar")
+
+        quote = get_bb_dollar_rate(datetime(2025, 8, 7), fallback=True)
+
+        self.assertTrue(is_stale(quote))
+        self.assertEqual(quote[:2], (5.4802, "06/08/2025"))
+        self.assertIn("dataInicial=06/08/2025", quote[2])
+        self.assertEqual(mock_get.call_count, 1)
+        mock_refresh.assert_called_once()
+
+    @mock.patch("requests.Session.get")
+    def test_no_known_rate_fails_fast(self, mock_get):
+        """Testa que, sem cotação conhecida, o erro aparece e o disjuntor evita novas requisições."""
+        sgs_client.configure_sgs_client(max_retries=0, breaker_threshold=1, breaker_reset=60)
+        mock_get.side_effect = requests.ConnectionError("fora do ar")
+
+        with self.assertRaises(RateUnavailableError):
+            get_bb_dollar_rate(datetime(2025, 8, 7), fallback=True)
+        with self.assertRaises(RateUnavailableError):
+            get_bb_dollar_rate(datetime(2025, 8, 4), fallback=True)
+
+        self.assertEqual(mock_get.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
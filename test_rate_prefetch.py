@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Testes para a pré-carga das cotações após a publicação (SGS simulado)
+"""
+
+import unittest
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+import rate_cache
+from invoice_description_generator import get_ptax_rate
+from rate_prefetch import BRASILIA, RatePrefetcher, parse_publish_at
+
+
+def fake_range_response(*items):
+    """Cria uma resposta falsa do SGS com pares (data DD/MM/YYYY, valor)."""
+    response = mock.Mock()
+    response.json.return_value = [{'data': quote_date, 'valor': valor} for quote_date, valor in items]
+    response.raise_for_status.return_value = None
+    return response
+
+
+def at(year, month, day, hour, minute=0):
+    """Horário fixo em Brasília."""
+    return datetime(year, month, day, hour, minute, tzinfo=BRASILIA)
+
+
+class TestSchedule(unittest.TestCase):
+    """Testes para a data esperada e a espera entre cargas."""
+
+    def setUp(self):
+        self.prefetcher = RatePrefetcher(currencies=["USD"], publish_at=time(13, 10), interval=900,
+                                         retry_min=30, retry_max=600)
+
+    def test_expected_date(self):
+        """Testa a data esperada antes e depois da publicação, inclusive no fim de semana."""
+        # Quinta-feira, 07/08/2025
+        self.assertEqual(self.prefetcher.expected_date(at(2025, 8, 7, 9)), date(2025, 8, 6))
+        self.assertEqual(self.prefetcher.expected_date(at(2025, 8, 7, 13, 10)), date(2025, 8, 7))
+        # Segunda-feira de manhã: a última é a de sexta
+        self.assertEqual(self.prefetcher.expected_date(at(2025, 8, 11, 9)), date(2025, 8, 8))
+
+    def test_waits_for_publication(self):
+        """Testa que, com tudo carregado, a próxima carga é no horário de publicação."""
+        delay = self.prefetcher.next_delay({'USD': date(2025, 8, 6)}, at(2025, 8, 7, 13, 0))
+        self.assertEqual(delay, 600)
+
+        delay = self.prefetcher.next_delay({'USD': date(2025, 8, 6)}, at(2025, 8, 7, 9))
+        self.assertEqual(delay, 900)
+
+    def test_backoff_until_published(self):
+        """Testa o backoff enquanto a cotação do dia não aparece."""
+        now = at(2025, 8, 7, 13, 15)
+        delays = [self.prefetcher.next_delay({'USD': date(2025, 8, 6)}, now) for _ in range(7)]
+        self.assertEqual(delays, [30, 60, 120, 240, 480, 600, 600])
+
+        # Publicada: volta ao intervalo normal
+        self.assertEqual(self.prefetcher.next_delay({'USD': date(2025, 8, 7)}, now), 900)
+        self.assertEqual(self.prefetcher.next_delay({'USD': None}, now), 30)
+
+    def test_next_publication_skips_weekend(self):
+        """Testa que a próxima publicação depois de sexta à tarde é na segunda."""
+        self.assertEqual(self.prefetcher.next_publication(at(2025, 8, 8, 15)), at(2025, 8, 11, 13, 10))
+
+    def test_parse_publish_at(self):
+        """Testa o formato HH:MM."""
+        self.assertEqual(parse_publish_at("13:30"), time(13, 30))
+        with self.assertRaises(ValueError):
+            parse_publish_at("13h")
+
+
+class TestPrefetch(unittest.TestCase):
+    """Testes para a carga das cotações no cache."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_first_request_is_a_cache_hit(self, mock_get):
+        """Testa que a cotação padrão (ontem) sai do cache depois da pré-carga."""
+        yesterday = datetime.now() - timedelta(days=1)
+        today = datetime.now(BRASILIA)
+        mock_get.return_value = fake_range_response(
+            ((today - timedelta(days=9)).strftime("%d/%m/%Y"), "5.40"),
+            (yesterday.strftime("%d/%m/%Y"), "5.48"),
+        )
+        prefetcher = RatePrefetcher(currencies=["USD", "EUR"])
+
+        loaded = prefetcher.run_once()
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(loaded['USD'], yesterday.date())
+        params = mock_get.call_args[1]['params']
+        self.assertEqual(params['dataFinal'], today.strftime("%d/%m/%Y"))
+
+        rate, _, _ = get_ptax_rate(yesterday, currency="USD")
+        self.assertEqual(rate, 5.48)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("requests.Session.get")
+    def test_failure_is_reported(self, mock_get):
+        """Testa que uma falha do SGS não interrompe as outras moedas."""
+        mock_get.side_effect = [Exception("fora do ar"), fake_range_response(("06/08/2025", "6.36"))]
+
+        loaded = RatePrefetcher(currencies=["EUR", "USD"]).run_once()
+
+        self.assertEqual(loaded, {'EUR': None, 'USD': date(2025, 8, 6)})
+
+    def test_start_and_stop(self):
+        """Testa a thread de pré-carga."""
+        prefetcher = RatePrefetcher(currencies=["USD"])
+        with mock.patch.object(prefetcher, "run_once", return_value={'USD': None}) as run_once:
+            prefetcher.start()
+            prefetcher.stop(timeout=5)
+
+        run_once.assert_called()
+        self.assertIsNone(prefetcher._thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Testes para o snapshot de cotações e o modo offline
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import rate_cache
+import sgs_client
+from rate_cache import RateCache, SQLiteRateStore
+from rate_snapshot import RateSnapshot, export_snapshot, write_snapshot
+from invoice_description_generator import (
+    RateOutsideSnapshotError, get_bb_dollar_rate, get_bb_dollar_rates
+)
+
+
+class TestRateSnapshot(unittest.TestCase):
+    """Testes para RateSnapshot e write_snapshot."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "ptax.snap")
+        self.count = write_snapshot(self.path, {
+            1: {"2025-08-01": 5.5531, date(2025, 8, 4): 5.5080, datetime(2025, 8, 6): 5.4802},
+            21619: {"2025-08-06": 6.3866},
+        })
+        self.snapshot = RateSnapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        """Testa a leitura das cotações gravadas."""
+        self.assertEqual(self.count, 4)
+        self.assertEqual(self.snapshot.get(datetime(2025, 8, 6)), 5.4802)
+        self.assertEqual(self.snapshot.get("2025-08-01"), 5.5531)
+        self.assertEqual(self.snapshot.get(date(2025, 8, 6), 21619), 6.3866)
+
+    def test_gaps_and_out_of_range(self):
+        """Testa que dias sem cotação e datas fora do período retornam None."""
+        self.assertIsNone(self.snapshot.get("2025-08-02"))
+        self.assertTrue(self.snapshot.covers("2025-08-02"))
+        self.assertIsNone(self.snapshot.get("2025-07-31"))
+        self.assertFalse(self.snapshot.covers("2025-08-07"))
+        self.assertIsNone(self.snapshot.get("2025-08-06", 21623))
+
+    def test_series_and_range(self):
+        """Testa o período de cada série e a leitura de intervalos."""
+        self.assertEqual(self.snapshot.series(), {
+            1: (date(2025, 8, 1), date(2025, 8, 6)),
+            21619: (date(2025, 8, 6), date(2025, 8, 6)),
+        })
+        self.assertEqual(
+            self.snapshot.range(datetime(2025, 7, 1), datetime(2025, 8, 5)),
+            {date(2025, 8, 1): 5.5531, date(2025, 8, 4): 5.5080}
+        )
+
+    def test_invalid_file(self):
+        """Testa a rejeição de arquivos que não são snapshots."""
+        path = os.path.join(self.tmpdir.name, "invalido.snap")
+        with open(path, "wb") as fh:
+            fh.write(b"nao e um snapshot de cotacoes")
+        with self.assertRaises(ValueError):
+            RateSnapshot(path)
+
+    def test_cache_layer(self):
+        """Testa o snapshot como camada do cache antes do armazenamento."""
+        cache = RateCache(snapshot=self.snapshot)
+
+        self.assertEqual(cache.get("2025-08-06"), 5.4802)
+        self.assertEqual(cache.get("2025-08-06", 21619), 6.3866)
+        self.assertIsNone(cache.get("2025-08-05"))
+        self.assertEqual(cache.stats()['snapshot_hits'], 2)
+
+    def test_export_from_cache(self):
+        """Testa a exportação das cotações permanentes de um cache."""
+        store = SQLiteRateStore(os.path.join(self.tmpdir.name, "ptax.sqlite3"))
+        cache = RateCache(store=store)
+        cache.set("2025-08-06", 5.4802)
+        cache.set("2025-08-06", 6.3866, series=21619)
+
+        path = os.path.join(self.tmpdir.name, "export.snap")
+        count = export_snapshot(path, cache, extra={1: {date(2025, 8, 5): 5.5080}})
+        store.close()
+
+        snapshot = RateSnapshot(path)
+        try:
+            self.assertEqual(count, 3)
+            self.assertEqual(snapshot.get("2025-08-05"), 5.5080)
+            self.assertEqual(snapshot.get("2025-08-06"), 5.4802)
+            self.assertEqual(snapshot.get("2025-08-06", 21619), 6.3866)
+        finally:
+            snapshot.close()
+
+    def test_export_skips_recent_rates(self):
+        """Testa que cotações recentes (ainda revisáveis) não entram no snapshot."""
+        today = datetime.now().date()
+        path = os.path.join(self.tmpdir.name, "export.snap")
+        count = export_snapshot(path, RateCache(), extra={1: {date(2025, 8, 5): 5.5080, today: 5.0}})
+
+        snapshot = RateSnapshot(path)
+        try:
+            self.assertEqual(count, 1)
+            self.assertIsNone(snapshot.get(today))
+        finally:
+            snapshot.close()
+
+
+class TestOfflineMode(unittest.TestCase):
+    """Testes para o modo offline (SGS_OFFLINE) com snapshot."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "ptax.snap")
+        write_snapshot(path, {1: {"2025-08-01": 5.5531, "2025-08-04": 5.5080}})
+        rate_cache.configure_rate_cache(snapshot=RateSnapshot(path))
+        sgs_client.configure_sgs_client(offline=True)
+
+    def tearDown(self):
+        sgs_client.configure_sgs_client()
+        rate_cache.configure_rate_cache()
+        self.tmpdir.cleanup()
+
+    @mock.patch('requests.Session.get')
+    def test_rate_from_snapshot(self, mock_get):
+        """Testa cotações e fallback servidos só pelo snapshot."""
+        rate, date_str, _ = get_bb_dollar_rate(datetime(2025, 8, 4))
+        self.assertEqual((rate, date_str), (5.5080, "04/08/2025"))
+
+        rate, date_str, _ = get_bb_dollar_rate(datetime(2025, 8, 3), fallback=True)
+        self.assertEqual((rate, date_str), (5.5531, "01/08/2025"))
+
+        rates = get_bb_dollar_rates(datetime(2025, 8, 1), datetime(2025, 8, 4))
+        self.assertEqual(rates, {date(2025, 8, 1): 5.5531, date(2025, 8, 4): 5.5080})
+
+        mock_get.assert_not_called()
+
+    @mock.patch('requests.Session.get')
+    def test_fallback_stops_at_snapshot_end(self, mock_get):
+        """Testa que o fallback não recua para a última cotação do snapshot."""
+        # Terça e domingo depois do fim do snapshot (04/08)
+        for day in (datetime(2025, 8, 5), datetime(2025, 8, 10)):
+            with self.assertRaisesRegex(RateOutsideSnapshotError, "fora do snapshot"):
+                get_bb_dollar_rate(day, fallback=True)
+
+        with self.assertRaises(RateOutsideSnapshotError):
+            get_bb_dollar_rates(datetime(2025, 8, 1), datetime(2025, 8, 5))
+
+        # Domingo logo depois do snapshot: a sexta (01/08) está coberta
+        self.assertEqual(get_bb_dollar_rate(datetime(2025, 8, 3), fallback=True)[1], "01/08/2025")
+        mock_get.assert_not_called()
+
+    @mock.patch('requests.Session.get')
+    def test_missing_rate_offline(self, mock_get):
+        """Testa que datas fora do snapshot não acessam a rede."""
+        with self.assertRaises(Exception):
+            get_bb_dollar_rate(datetime(2025, 8, 6))
+
+        mock_get.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Testes para o cliente HTTP do SGS
+"""
+
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from sgs_client import CircuitBreaker, SGSClient, SGSUnavailableError
+
+
+def fake_response(status_code, payload=None):
+    """Cria uma resposta HTTP falsa."""
+    response = mock.Mock()
+    response.status_code = status_code
+    response.url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.1/dados"
+    response.json.return_value = payload
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"{status_code} Error")
+    return response
+
+
+@mock.patch("sgs_client.time.sleep")
+@mock.patch("requests.Session.get")
+class TestSGSClient(unittest.TestCase):
+    """Testes para SGSClient."""
+
+    def test_retries_transient_status(self, mock_get, mock_sleep):
+        """Testa nova tentativa após 503."""
+        mock_get.side_effect = [fake_response(503), fake_response(200, [{'valor': '5.48'}])]
+
+        data = SGSClient(backoff=0.01).get_json("https://example", {})
+
+        self.assertEqual(data, [{'valor': '5.48'}])
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    def test_retries_connection_errors_up_to_limit(self, mock_get, mock_sleep):
+        """Testa que as tentativas são limitadas por max_retries."""
+        mock_get.side_effect = requests.ConnectionError("falha")
+
+        with self.assertRaises(requests.ConnectionError):
+            SGSClient(max_retries=2, backoff=0.01).get_json("https://example")
+
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_does_not_retry_client_errors(self, mock_get, mock_sleep):
+        """Testa que erros 4xx não são repetidos."""
+        mock_get.return_value = fake_response(404)
+
+        with self.assertRaises(requests.HTTPError):
+            SGSClient().get_json("https://example")
+
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_deadline_limits_retries(self, mock_get, mock_sleep):
+        """Testa que não há espera além do prazo total."""
+        mock_get.side_effect = requests.Timeout("lento")
+
+        with mock.patch("sgs_client.random.uniform", side_effect=lambda low, high: high):
+            with self.assertRaises(requests.Timeout):
+                SGSClient(max_retries=10, backoff=100, deadline=0.5).get_json("https://example")
+
+        self.assertEqual(mock_get.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    def test_session_is_shared(self, mock_get, mock_sleep):
+        """Testa que a sessão e o pool são reutilizados."""
+        client = SGSClient(pool_size=4)
+        self.assertIs(client.session, client.session)
+        adapter = client.session.get_adapter("https://api.bcb.gov.br")
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_breaker_fails_fast(self, mock_get, mock_sleep):
+        """Testa que o disjuntor aberto evita novas requisições ao SGS."""
+        mock_get.side_effect = requests.Timeout("lento")
+        client = SGSClient(max_retries=1, backoff=0.01, breaker_threshold=2, breaker_reset=60)
+
+        with self.assertRaises(requests.Timeout):
+            client.get_json("https://example")
+        with self.assertRaises(SGSUnavailableError):
+            client.get_json("https://example")
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_breaker_ignores_not_found(self, mock_get, mock_sleep):
+        """Testa que respostas 404 contam como SGS disponível."""
+        mock_get.return_value = fake_response(404)
+        client = SGSClient(breaker_threshold=1)
+
+        for _ in range(3):
+            with self.assertRaises(requests.HTTPError):
+                client.get_json("https://example")
+
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Testes para CircuitBreaker."""
+
+    def test_half_open_probe(self):
+        """Testa a chamada de teste única após reset_timeout."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        with mock.patch("sgs_client.time.monotonic", return_value=time.monotonic() + 11):
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+
+            # Falha na chamada de teste reabre o disjuntor
+            breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with mock.patch("sgs_client.time.monotonic", return_value=time.monotonic() + 22):
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            self.assertTrue(breaker.allow())
+
+    def test_disabled(self):
+        """Testa que failure_threshold=0 nunca abre o disjuntor."""
+        breaker = CircuitBreaker(failure_threshold=0)
+        for _ in range(100):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Testes do cabeçalho Server-Timing e dos perfis por requisição (SGS simulado)
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import rate_cache
+import test_asgi
+import timing
+from api import app
+from api_core import configure_response_cache
+from asgi import ASGIApp
+from timing import RequestTimer, current_timer, span, timed
+
+
+def stages(header):
+    """Nomes das etapas de um cabeçalho Server-Timing."""
+    return [entry.split(";")[0] for entry in header.split(", ")]
+
+
+class TestRequestTimer(unittest.TestCase):
+    """Testes para RequestTimer e span."""
+
+    def test_header(self):
+        """Testa o formato do cabeçalho e a soma de etapas repetidas."""
+        timer = RequestTimer()
+        timer.add('rate', 0.010)
+        timer.add('rate', 0.005)
+        timer.add('render', 0.0012)
+
+        self.assertEqual(timer.header(total=False), 'rate;dur=15.00;desc="2x", render;dur=1.20')
+        self.assertEqual(stages(timer.header()), ['rate', 'render', 'total'])
+
+    def test_span_outside_request(self):
+        """Testa que span não faz nada fora de uma requisição."""
+        self.assertIsNone(current_timer())
+        with span('render'):
+            pass
+        self.assertIsNone(current_timer())
+
+    def test_timed(self):
+        """Testa a medição de um bloco com timed."""
+        with timed() as timer:
+            with span('render'):
+                pass
+            self.assertIs(current_timer(), timer)
+
+        self.assertIsNone(current_timer())
+        self.assertEqual(list(timer.spans()), ['render'])
+
+
+class TestServerTimingHeader(unittest.TestCase):
+    """Testes do cabeçalho Server-Timing nas APIs Flask e ASGI."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+        self.client = app.test_client()
+        self.asgi = ASGIApp()
+
+    def tearDown(self):
+        self.asgi.close()
+        rate_cache.configure_rate_cache()
+        configure_response_cache()
+
+    @mock.patch("requests.Session.get")
+    def test_flask_convert(self, mock_get):
+        """Testa as etapas de POST /api/convert na API Flask."""
+        mock_get.return_value = test_asgi.fake_sgs_response("5.4802")
+
+        response = self.client.post('/api/convert', json={'usd_amount': 100, 'date': '07082025'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stages(response.headers['Server-Timing']),
+                         ['json', 'validate', 'sgs', 'rate', 'render', 'serialize', 'total'])
+
+    @mock.patch("requests.Session.get")
+    def test_asgi_convert(self, mock_get):
+        """Testa as etapas de POST /api/convert na aplicação ASGI (busca em outra thread)."""
+        mock_get.return_value = test_asgi.fake_sgs_response("5.4802")
+
+        status, headers, _ = test_asgi.request(self.asgi, 'POST', '/api/convert',
+                                               {'usd_amount': 100, 'date': '07082025'})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(set(stages(headers[b"server-timing"].decode())),
+                         {'json', 'validate', 'sgs', 'rate', 'render', 'serialize', 'total'})
+
+    def test_disabled(self):
+        """Testa que PTAX_SERVER_TIMING=0 remove o cabeçalho."""
+        with mock.patch.object(timing, 'ENABLED', False):
+            response = self.client.get('/health')
+            _, headers, _ = test_asgi.request(self.asgi, 'GET', '/health')
+
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertNotIn(b"server-timing", headers)
+
+
+class TestProfiling(unittest.TestCase):
+    """Testes dos perfis por requisição."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {'PTAX_PROFILE_DIR': self.directory.name})
+        self.env.start()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.env.stop()
+        self.directory.cleanup()
+
+    def test_profile_header(self):
+        """Testa o perfil pedido pelo cabeçalho X-Profile."""
+        with mock.patch.object(timing, 'PROFILE_HEADER', False):
+            response = self.client.get('/health', headers={'X-Profile': '1'})
+        self.assertNotIn('profile', response.headers['Server-Timing'])
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+        with mock.patch.object(timing, 'PROFILE_HEADER', True):
+            response = self.client.get('/health', headers={'X-Profile': '1'})
+
+        files = os.listdir(self.directory.name)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('GET_health-'))
+        self.assertIn(f'profile;desc="{files[0]}"', response.headers['Server-Timing'])
+
+    def test_profile_sample(self):
+        """Testa o perfil por amostragem na aplicação ASGI."""
+        asgi = ASGIApp()
+        try:
+            with mock.patch.object(timing, 'PROFILE_SAMPLE', 1.0):
+                _, headers, _ = test_asgi.request(asgi, 'GET', '/health')
+        finally:
+            asgi.close()
+
+        files = os.listdir(self.directory.name)
+        self.assertEqual(len(files), 1)
+        self.assertIn(b"profile;desc=", headers[b"server-timing"])
+
+
+if __name__ == '__main__':
+    unittest.main()
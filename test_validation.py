@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Testes da validação das entradas (datas DDMMYYYY e valores)
+"""
+
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+import validation
+from invoice_description_generator import convert_rows
+from validation import (
+    default_quote_date, is_valid_amount, parse_amount, parse_quote_date, parse_reference_date
+)
+
+
+class TestDates(unittest.TestCase):
+    """Testes para parse_reference_date, parse_quote_date e default_quote_date."""
+
+    def test_quote_date(self):
+        """Testa a data da cotação (dia anterior à referência)."""
+        self.assertEqual(parse_reference_date("07082025"), datetime(2025, 8, 7))
+        self.assertEqual(parse_quote_date("07082025"), datetime(2025, 8, 6))
+        self.assertEqual(parse_quote_date("01032024"), datetime(2024, 2, 29))
+        self.assertEqual(default_quote_date(datetime(2025, 1, 1, 10)), datetime(2024, 12, 31, 10))
+
+    def test_invalid(self):
+        """Testa datas em formato inválido ou inexistentes."""
+        for value in ("2025-08-07", "7082025", "070820251", "", None, 7082025, ["07082025"]):
+            with self.assertRaisesRegex(ValueError, "DDMMYYYY"):
+                parse_quote_date(value)
+
+        with self.assertRaisesRegex(ValueError, "Data inválida"):
+            parse_quote_date("31022025")
+
+    def test_memoized(self):
+        """Testa que cada data distinta é convertida uma única vez."""
+        validation._quote_date.cache_clear()
+        validation._reference_date.cache_clear()
+
+        for _ in range(1000):
+            parse_quote_date("07082025")
+            parse_quote_date("08082025")
+
+        info = validation._quote_date.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 1998)
+        self.assertIs(parse_quote_date("07082025"), parse_quote_date("07082025"))
+
+
+class TestAmounts(unittest.TestCase):
+    """Testes para is_valid_amount e parse_amount."""
+
+    def test_is_valid_amount(self):
+        """Testa os valores aceitos pela API."""
+        self.assertTrue(is_valid_amount(10))
+        self.assertTrue(is_valid_amount(0.01))
+        for value in (0, -1, True, "10", None):
+            self.assertFalse(is_valid_amount(value))
+
+    def test_parse_amount(self):
+        """Testa a conversão de valores de texto (CSV)."""
+        self.assertEqual(parse_amount(" 2.675 ", exact=True), Decimal("2.675"))
+        self.assertEqual(parse_amount("2.675"), 2.675)
+        with self.assertRaises(ValueError):
+            parse_amount("abc")
+
+
+class TestBatchRows(unittest.TestCase):
+    """Testes do uso da validação no modo em lote."""
+
+    @mock.patch("invoice_description_generator.get_ptax_rate")
+    def test_convert_rows(self, mock_rate):
+        """Testa linhas válidas e inválidas no modo em lote."""
+        mock_rate.return_value = (5.0, "06/08/2025", "url")
+
+        rows = [{'usd_amount': '10', 'date': '07082025'}, {'usd_amount': '20', 'date': '07082025'},
+                {'usd_amount': '10', 'date': '7/8/2025'}]
+        results = list(convert_rows(rows))
+
+        self.assertEqual([r.get('brl_amount') for r in results[:2]], [50.0, 100.0])
+        self.assertIn('DDMMYYYY', results[2]['error'])
+        mock_rate.assert_called_once()
+        self.assertEqual(mock_rate.call_args[0][0], datetime(2025, 8, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Testes para a conversão vetorizada (requer numpy)
+"""
+
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import rate_cache
+
+try:
+    import numpy as np
+    import vector_rates
+    from vector_rates import convert_arrays
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy não instalado")
+class TestConvertArrays(unittest.TestCase):
+    """Testes para convert_arrays."""
+
+    def setUp(self):
+        rate_cache.configure_rate_cache()
+        cache = rate_cache.get_rate_cache()
+        cache.set("2025-08-05", 5.5080)
+        cache.set("2025-08-06", 5.4802)
+
+    def tearDown(self):
+        rate_cache.configure_rate_cache()
+
+    def test_vectorized_conversion(self):
+        """Testa a conversão de vários itens com datas repetidas."""
+        amounts = np.array([6774.0, 1000.0, 100.0])
+        dates = [datetime(2025, 8, 6), "2025-08-05", date(2025, 8, 6)]
+
+        result = convert_arrays(amounts, dates, fallback=False)
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(len(result.quote_dates), 2)
+        np.testing.assert_allclose(result.rates, [5.4802, 5.5080, 5.4802])
+        np.testing.assert_allclose(result.brl_amounts, amounts * result.rates)
+        self.assertTrue(result.ok.all())
+        self.assertEqual(result.errors, {})
+
+    def test_each_date_is_resolved_once(self):
+        """Testa que cada data distinta é resolvida uma única vez."""
+        dates = np.array(["2025-08-06"] * 1000 + ["2025-08-05"] * 1000, dtype="datetime64[D]")
+
+        with mock.patch("vector_rates.resolve_rates", wraps=vector_rates.resolve_rates) as resolve:
+            convert_arrays(np.ones(2000), dates, fallback=False)
+
+        self.assertEqual(len(resolve.call_args[0][0]), 2)
+
+    def test_missing_dates_are_nan(self):
+        """Testa que datas sem cotação ficam com NaN e erro por data."""
+        def fetcher(date, fallback, currency):
+            if date.day == 3:
+                raise Exception("sem cotação")
+            return 5.4802, date.strftime("%d/%m/%Y"), "https://example"
+
+        with mock.patch("invoice_description_generator.get_ptax_rate", fetcher):
+            result = convert_arrays([10.0, 20.0], ["2025-08-06", "2025-08-03"], fallback=False)
+
+        self.assertEqual(result.ok.tolist(), [True, False])
+        self.assertTrue(np.isnan(result.brl_amounts[1]))
+        self.assertIn("2025-08-03", result.errors)
+        self.assertIsNone(result.texts()[1])
+
+    def test_texts_on_demand(self):
+        """Testa que os textos são os mesmos da conversão individual."""
+        result = convert_arrays([6774.0], ["2025-08-06"], fallback=False)
+
+        text = result.texts()[0]
+
+        self.assertIn("USD 6.774,00", text)
+        self.assertIn("R$ 37.122,87", text)
+
+    def test_shape_mismatch(self):
+        """Testa a validação do tamanho dos arrays."""
+        with self.assertRaises(ValueError):
+            convert_arrays([1.0, 2.0], ["2025-08-06"])
+
+
+if __name__ == "__main__":
+    unittest.main()
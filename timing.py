@@ -0,0 +1,257 @@
+"""
+Tempo por etapa das requisições e perfis de execução sob demanda
+
+Cada requisição da API recebe um RequestTimer (em uma ContextVar, válido
+tanto para as threads do Flask quanto para as tarefas do ASGI). As etapas do
+processamento registram a própria duração com span(); no fim, o total por
+etapa é enviado no cabeçalho Server-Timing, visível nas ferramentas de
+desenvolvedor do navegador:
+
+    Server-Timing: json;dur=0.04, validate;dur=0.02, rate;dur=118.5,
+                   sgs;dur=117.9, render;dur=0.06, serialize;dur=0.03, total;dur=119.1
+
+Etapas registradas:
+
+- json: leitura e decodificação do corpo
+- validate: validação dos parâmetros (valor, data, moeda e modelo)
+- rate: busca de cotação (cache e SGS), por data distinta
+- sgs: requisições ao SGS (dentro de rate)
+- render: cálculo e texto da conversão
+- serialize: serialização da resposta
+- total: requisição inteira
+
+Fora de uma requisição (CLI e uso como módulo), span() não faz nada; use
+timed() para medir uma chamada.
+
+Uma amostra das requisições também pode ser perfilada com cProfile (um
+arquivo .prof por requisição, para pstats ou snakeviz). Um único perfil é
+gravado por vez em cada processo.
+
+Configuração por variáveis de ambiente:
+
+- PTAX_SERVER_TIMING: "0" para não medir nem enviar o cabeçalho (padrão: habilitado)
+- PTAX_PROFILE_SAMPLE: fração das requisições perfiladas, de 0 a 1 (padrão: 0)
+- PTAX_PROFILE_HEADER: "1" para perfilar as requisições com o cabeçalho X-Profile: 1 (padrão: desabilitado)
+- PTAX_PROFILE_DIR: diretório dos arquivos .prof (padrão: <tmp>/ptax-profiles)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# logging, random e re só são importados pelos perfis: a importação deste
+# módulo entra no tempo de partida da CLI e de cada worker
+
+ENABLED = os.environ.get('PTAX_SERVER_TIMING', '1') != '0'
+
+PROFILE_SAMPLE = float(os.environ.get('PTAX_PROFILE_SAMPLE', 0))
+PROFILE_HEADER = os.environ.get('PTAX_PROFILE_HEADER', '') == '1'
+
+# Cabeçalho que pede o perfil de uma requisição (com PTAX_PROFILE_HEADER=1)
+PROFILE_REQUEST_HEADER = 'X-Profile'
+
+_current = ContextVar("ptax_request_timer", default=None)
+
+_profile_lock = threading.Lock()
+
+
+class RequestTimer:
+    """
+    Duração acumulada de cada etapa de uma requisição.
+
+    Thread-safe: buscas de uma mesma requisição podem rodar em várias threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """
+        Soma uma duração à etapa.
+
+        Args:
+            name (str): Nome da etapa
+            seconds (float): Duração, em segundos
+        """
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                self._spans[name] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def spans(self):
+        """
+        Returns:
+            dict: Etapa -> (segundos, ocorrências), na ordem em que começaram a ser registradas
+        """
+        with self._lock:
+            return {name: (seconds, count) for name, (seconds, count) in self._spans.items()}
+
+    def header(self, total=True):
+        """
+        Monta o valor do cabeçalho Server-Timing.
+
+        Args:
+            total (bool): Se deve incluir a duração da requisição até agora
+
+        Returns:
+            str: Etapas com a duração em milissegundos
+        """
+        entries = []
+        for name, (seconds, count) in self.spans().items():
+            entry = f"{name};dur={seconds * 1000:.2f}"
+            if count > 1:
+                entry += f';desc="{count}x"'
+            entries.append(entry)
+        if total:
+            entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def current_timer():
+    """
+    Returns:
+        RequestTimer: Medição da requisição atual ou None fora de uma requisição
+    """
+    return _current.get()
+
+
+def start_timer():
+    """
+    Inicia a medição de uma requisição no contexto atual.
+
+    Returns:
+        tuple: (RequestTimer, token para stop_timer)
+    """
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def stop_timer(token):
+    """Encerra a medição iniciada por start_timer."""
+    _current.reset(token)
+
+
+@contextmanager
+def timed():
+    """
+    Mede as etapas executadas dentro do bloco.
+
+    Exemplo:
+        with timed() as timer:
+            generate_conversion_text(6774.00)
+        print(timer.header())
+
+    Yields:
+        RequestTimer: Medição do bloco
+    """
+    timer, token = start_timer()
+    try:
+        yield timer
+    finally:
+        stop_timer(token)
+
+
+@contextmanager
+def span(name):
+    """
+    Registra a duração do bloco como uma etapa da requisição atual.
+
+    Args:
+        name (str): Nome da etapa
+    """
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def should_profile(header_value=None):
+    """
+    Decide se a requisição deve ser perfilada.
+
+    Args:
+        header_value (str): Valor do cabeçalho X-Profile (opcional)
+
+    Returns:
+        bool: True se pedido pelo cabeçalho (com PTAX_PROFILE_HEADER=1) ou sorteado na amostra
+    """
+    if PROFILE_HEADER and header_value == '1':
+        return True
+    if PROFILE_SAMPLE <= 0:
+        return False
+
+    import random
+
+    return random.random() < PROFILE_SAMPLE
+
+
+def start_profile():
+    """
+    Inicia um perfil com cProfile.
+
+    Returns:
+        cProfile.Profile: Perfil em andamento ou None se outro já estiver ativo no processo
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+
+    try:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    except Exception as e:
+        import logging
+
+        # Outra ferramenta de perfil (ex: um depurador) já está ativa
+        _profile_lock.release()
+        logging.getLogger(__name__).warning(f"Perfil não iniciado: {str(e)}")
+        return None
+    return profiler
+
+
+def finish_profile(profiler, label):
+    """
+    Encerra o perfil e grava o arquivo .prof.
+
+    Args:
+        profiler (cProfile.Profile): Perfil de start_profile
+        label (str): Identificação da requisição no nome do arquivo (ex: a rota)
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    import logging
+    import re
+
+    try:
+        profiler.disable()
+    finally:
+        _profile_lock.release()
+
+    directory = os.environ.get('PTAX_PROFILE_DIR')
+    if not directory:
+        import tempfile
+
+        directory = os.path.join(tempfile.gettempdir(), 'ptax-profiles')
+    os.makedirs(directory, exist_ok=True)
+
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_') or 'request'
+    path = os.path.join(directory, f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+                                   f"{time.perf_counter_ns() % 1000000:06d}.prof")
+    profiler.dump_stats(path)
+    logging.getLogger(__name__).info(f"Perfil gravado: {path}")
+    return path
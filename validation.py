@@ -0,0 +1,109 @@
+"""
+Validação e normalização das entradas (CLI, API e modo em lote)
+
+As datas de referência chegam como texto DDMMYYYY e a cotação buscada é a
+do dia anterior. A conversão é memoizada por texto: em um lote com milhões
+de linhas e poucas centenas de datas, cada data distinta é convertida uma
+única vez e as demais linhas reutilizam o mesmo datetime.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+
+DATE_FORMAT_ERROR = 'date deve estar no formato DDMMYYYY (ex: 07082025)'
+
+# Datas distintas mantidas em memória (mais de 10 anos de dias)
+DATE_CACHE_SIZE = 4096
+
+
+def is_valid_amount(usd_amount):
+    """Verifica se o valor em USD é um número positivo."""
+    return (
+        isinstance(usd_amount, (int, float))
+        and not isinstance(usd_amount, bool)
+        and usd_amount > 0
+    )
+
+
+def parse_amount(value, exact=False):
+    """
+    Converte um valor de entrada (número ou texto, ex: coluna de CSV).
+
+    Args:
+        value (float | str): Valor na moeda estrangeira
+        exact (bool): Se deve retornar Decimal (centavos exatos) em vez de float
+
+    Returns:
+        float | Decimal: Valor convertido
+
+    Raises:
+        TypeError, ValueError, ArithmeticError: Se o valor não for numérico
+    """
+    return Decimal(str(value).strip()) if exact else float(value)
+
+
+def _check_date_format(date_str):
+    if not isinstance(date_str, str) or len(date_str) != 8 or not date_str.isdigit():
+        raise ValueError(DATE_FORMAT_ERROR)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _reference_date(date_str):
+    try:
+        return datetime(int(date_str[4:8]), int(date_str[2:4]), int(date_str[:2]))
+    except ValueError as e:
+        raise ValueError(f'Data inválida: {str(e)}')
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _quote_date(date_str):
+    return _reference_date(date_str) - timedelta(days=1)
+
+
+def parse_reference_date(date_str):
+    """
+    Converte uma data de referência DDMMYYYY.
+
+    Args:
+        date_str (str): Data no formato DDMMYYYY
+
+    Returns:
+        datetime: Data de referência
+
+    Raises:
+        ValueError: Se a data estiver em formato inválido
+    """
+    _check_date_format(date_str)
+    return _reference_date(date_str)
+
+
+def parse_quote_date(date_str):
+    """
+    Converte uma data de referência DDMMYYYY na data da cotação (dia anterior).
+
+    Args:
+        date_str (str): Data no formato DDMMYYYY
+
+    Returns:
+        datetime: Data para buscar a cotação
+
+    Raises:
+        ValueError: Se a data estiver em formato inválido
+    """
+    _check_date_format(date_str)
+    return _quote_date(date_str)
+
+
+def default_quote_date(reference_date=None):
+    """
+    Data da cotação quando nenhuma data é informada.
+
+    Args:
+        reference_date (datetime): Data de referência (padrão: agora)
+
+    Returns:
+        datetime: Dia anterior à data de referência
+    """
+    return (reference_date or datetime.now()) - timedelta(days=1)
@@ -0,0 +1,135 @@
+"""
+Conversão vetorizada com NumPy para grandes volumes de notas
+
+Recebe arrays de valores em dólares e de datas de cotação, resolve a
+cotação de cada data distinta uma única vez (com resolve_rates) e converte
+tudo em uma única multiplicação vetorizada. Os textos das notas só são
+montados sob demanda.
+
+Requer o extra numpy (pip install "invoice_description_generator[numpy]").
+
+Exemplo:
+
+    import numpy as np
+    from vector_rates import convert_arrays
+
+    result = convert_arrays(np.array([6774.0, 1000.0]), ["2025-08-06", "2025-08-06"])
+    result.brl_amounts    # array([37122.87, 5480.2])
+    result.texts()        # textos das notas, montados só quando pedidos
+"""
+
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        'vector_rates requer numpy: pip install "invoice_description_generator[numpy]"'
+    ) from e
+
+from currencies import DEFAULT_CURRENCY, get_currency
+from description_templates import get_template
+from invoice_description_generator import _render_conversion, resolve_rates
+
+
+class ConversionArrays:
+    """
+    Resultado de uma conversão vetorizada.
+
+    Itens cuja data não tem cotação ficam com NaN em rates e brl_amounts; o
+    erro de cada data está em errors.
+    """
+
+    def __init__(self, usd_amounts, rates, quote_dates, index, resolved, errors, currency=DEFAULT_CURRENCY):
+        """
+        Args:
+            usd_amounts (ndarray): Valores na moeda estrangeira
+            rates (ndarray): Cotação usada em cada item
+            quote_dates (ndarray): Datas de cotação distintas (datetime64[D])
+            index (ndarray): Posição da data de cada item em quote_dates
+            resolved (list): (cotação, data_formatada, url_completa) ou None por data distinta
+            errors (dict): Mapeamento data ISO -> Exception
+            currency (str): Código da moeda dos valores
+        """
+        self.currency = currency
+        self.usd_amounts = usd_amounts
+        self.rates = rates
+        self.brl_amounts = usd_amounts * rates
+        self.quote_dates = quote_dates
+        self.index = index
+        self.errors = errors
+        self._resolved = resolved
+
+    def __len__(self):
+        return len(self.usd_amounts)
+
+    @property
+    def ok(self):
+        """ndarray: Máscara dos itens convertidos com sucesso."""
+        return ~np.isnan(self.rates)
+
+    def texts(self, show_url=False, exact=False, template=None):
+        """
+        Monta o texto de cada nota.
+
+        Args:
+            show_url (bool): Se o texto deve mostrar a URL dos dados
+            exact (bool): Se deve calcular em centavos exatos
+            template (str): Nome do modelo do texto (opcional, padrão: "padrao")
+
+        Returns:
+            list: Texto de cada item, ou None quando a data não tem cotação
+        """
+        template = get_template(template)
+        texts = []
+        for usd_amount, position in zip(self.usd_amounts.tolist(), self.index.tolist()):
+            quote = self._resolved[position]
+            if quote is None:
+                texts.append(None)
+                continue
+            rate, date_str, url = quote
+            texts.append(_render_conversion(usd_amount, rate, date_str, url, show_url, exact, template,
+                                            self.currency)['text'])
+        return texts
+
+
+def convert_arrays(usd_amounts, dates, fallback=True, currency=DEFAULT_CURRENCY):
+    """
+    Converte arrays de valores em moeda estrangeira para reais.
+
+    Args:
+        usd_amounts (array_like): Valores na moeda estrangeira
+        dates (array_like): Datas de cotação (datetime, date, "YYYY-MM-DD" ou datetime64), do mesmo tamanho
+        fallback (bool): Se deve usar a última cotação publicada em ou antes de cada data
+        currency (str): Código da moeda (USD, EUR ou GBP)
+
+    Returns:
+        ConversionArrays: Valores em reais, cotações e erros por data
+    """
+    currency = get_currency(currency)
+    usd_amounts = np.asarray(usd_amounts, dtype=np.float64)
+    dates = np.asarray(dates, dtype="datetime64[D]")
+
+    if usd_amounts.shape != dates.shape or usd_amounts.ndim != 1:
+        raise ValueError("usd_amounts e dates devem ser arrays de uma dimensão com o mesmo tamanho")
+
+    # Índice pré-calculado: cada item aponta para a sua data distinta
+    quote_dates, index = np.unique(dates, return_inverse=True)
+    quote_datetimes = [datetime(day.year, day.month, day.day) for day in quote_dates.astype(object)]
+
+    resolved_by_key = resolve_rates(quote_datetimes, fallback, currency)
+
+    resolved = []
+    errors = {}
+    distinct_rates = np.full(len(quote_dates), np.nan)
+    for position, quote_date in enumerate(quote_datetimes):
+        key = quote_date.date().isoformat()
+        quote = resolved_by_key[key]
+        if isinstance(quote, Exception):
+            errors[key] = quote
+            resolved.append(None)
+        else:
+            distinct_rates[position] = quote[0]
+            resolved.append(quote)
+
+    return ConversionArrays(usd_amounts, distinct_rates[index], quote_dates, index, resolved, errors, currency.code)